@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Look-alike search over the appearance of every Mii in a set of saves.
+
+Each Mii's feature vector is its Mii Studio data (46 appearance fields, see
+studio_plan.STUDIO_FIELDS), decoded from the CFSD block with the compiled 3DS
+plan. The distance between two Miis adds a fixed penalty for every differing
+type (face, hair, eyes, ...) and a capped, weighted gap for every position,
+size and rotation, so it always fits in one byte.
+
+The index keeps one column per field and is sorted by (face type, hair type).
+A query turns every field into a 256-entry penalty table, translates the
+column with it and adds the columns up as big integers (one byte per Mii, no
+carries), then picks the k smallest bytes with bytes.find. The query's own
+bucket is searched first, then every Mii sharing its face type or its hair
+type; the whole index is only scanned when neither can prove that its matches
+are the exact nearest ones (every Mii left out is at least the type penalty away).
+
+Usage: python appearance_index.py build <index file> <save files or folders...> [--region EU] [--max-miis N] [--workers N]
+       python appearance_index.py similar <index file> <mii> [--top K] [--json FILE]
+       mii: slot or nickname (of the first save, or SAVE:slot / SAVE:nickname), or a 92-digit Studio code
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import json_output
+from cli_options import find_saves, pop_option
+from convert_all_miis import get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor
+from studio_plan import STUDIO_FIELDS, get_plan
+
+INDEX_VERSION = 1
+ROW_SIZE = len(STUDIO_FIELDS)
+
+# Types and colors: any difference costs the weight
+SAME = {
+    'face_type': 20, 'hair_type': 20, 'gender': 10, 'eye_type': 10, 'mouth_type': 8,
+    'face_color': 6, 'hair_color': 6, 'eyebrow_type': 6, 'nose_type': 6, 'glasses_type': 6,
+    'beard_mustache': 4, 'beard_goatee': 4, 'eye_color': 3, 'hair_flip': 2, 'face_makeup': 2,
+    'face_wrinkles': 2, 'mole_enable': 2
+}
+# Positions, sizes and rotations: weight per step, up to a cap
+NEAR = {
+    'eye_horizontal': (2, 8), 'eye_vertical': (2, 8), 'eye_size': (2, 8), 'eye_rotation': (1, 4),
+    'eye_stretch': (1, 4), 'eyebrow_horizontal': (1, 6), 'eyebrow_vertical': (1, 6), 'eyebrow_size': (1, 4),
+    'eyebrow_rotation': (1, 4), 'nose_vertical': (2, 8), 'nose_size': (2, 8), 'mouth_vertical': (2, 8),
+    'mouth_size': (2, 8), 'mouth_stretch': (1, 4)
+}
+MAX_DISTANCE = sum(SAME.values()) + sum(cap for _, cap in NEAR.values())
+assert MAX_DISTANCE <= 255, "distances are summed in one byte per Mii"
+
+FACE_TYPE = STUDIO_FIELDS.index('face_type')
+HAIR_TYPE = STUDIO_FIELDS.index('hair_type')
+DISTANCE_FIELDS = [STUDIO_FIELDS.index(field) for field in list(SAME) + list(NEAR)]
+# Lower bounds on the distance of every Mii outside the query's (face type, hair type)
+# bucket, and of every Mii with neither its face type nor its hair type
+BUCKET_BOUND = min(SAME['face_type'], SAME['hair_type'])
+NEIGHBOR_BOUND = SAME['face_type'] + SAME['hair_type']
+
+
+def appearance_vector(raw: bytes) -> bytes:
+    """Feature vector of a raw 3DS Mii block: its Mii Studio data"""
+    return get_plan("3ds").convert_cfsd(raw)
+
+
+def penalty_tables(query: bytes) -> List[Tuple[int, bytes]]:
+    """(field position, 256-entry penalty table) for every field the distance looks at"""
+    tables = []
+    for field, weight in SAME.items():
+        value = query[STUDIO_FIELDS.index(field)]
+        table = bytearray((weight,)) * 256
+        table[value] = 0
+        tables.append((STUDIO_FIELDS.index(field), bytes(table)))
+    for field, (weight, cap) in NEAR.items():
+        value = query[STUDIO_FIELDS.index(field)]
+        table = bytearray((cap,)) * 256
+        for v in range(max(0, value - cap // weight), min(256, value + cap // weight + 1)):
+            table[v] = min(abs(v - value) * weight, cap)
+        tables.append((STUDIO_FIELDS.index(field), bytes(table)))
+    return tables
+
+
+def distance(a: bytes, b: bytes) -> int:
+    """Distance between two feature vectors (0 = same appearance, at most MAX_DISTANCE)"""
+    return sum(table[b[position]] for position, table in penalty_tables(a))
+
+
+def _nearest(distances: bytes, k: int, offset: int = 0, exclude: Optional[int] = None) -> List[Tuple[int, int]]:
+    """(row, distance) of the k smallest distances, ties in row order"""
+    found = []
+    for value in range(MAX_DISTANCE + 1):
+        needle = bytes((value,))
+        position = distances.find(needle)
+        while position != -1:
+            if position + offset != exclude:
+                found.append((position + offset, value))
+                if len(found) == k:
+                    return found
+            position = distances.find(needle, position + 1)
+    return found
+
+
+def _save_vectors(save_file: str, region: str, max_miis: int) -> Tuple[List[bytes], List[Tuple[int, str]]]:
+    """Feature vectors and (slot, nickname) of every occupied slot of a save"""
+    extractor = CompleteMiiExtractor(save_file, region)
+    with open(save_file, 'rb') as f:
+        extractor.data = f.read()
+    names = extractor.read_mii_names()
+    vectors, miis = [], []
+    for slot in range(max_miis):
+        # Same occupancy test as CompleteMiiExtractor.iter_miis
+        if slot in names or extractor._read_byte(0x1D80 + slot * 0x660) != 0:
+            offset = get_mii_offset(slot, region)
+            vectors.append(appearance_vector(extractor.data[offset:offset + 0x60]))
+            miis.append((slot, names.get(slot, f"Mii {slot}")))
+    return vectors, miis
+
+
+def _signature(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class AppearanceIndex:
+    def __init__(self):
+        self.saves = []  # {'path', 'region', 'signature'}
+        self.miis = []  # [save number, slot, nickname] of every row
+        self.rows = b''  # feature vectors, ROW_SIZE bytes per row, sorted by (face type, hair type)
+        self.columns = []  # one bytes column per Studio field
+        self.buckets = {}  # (face type, hair type) -> (first row, end row)
+        self.faces = {}  # face type -> (first row, end row)
+        self.ranges = {}  # field position -> (lowest, highest) value in the index
+        self.groups = []  # (packed column, [(field position, lowest value, stride, span)])
+
+    def _finish(self, header: Optional[Dict] = None):
+        """Columns, value ranges, buckets and packed columns (ranges and buckets from a loaded header)"""
+        self.columns = [self.rows[position::ROW_SIZE] for position in range(ROW_SIZE)]
+        if header is not None:
+            self.ranges = {int(position): tuple(bounds) for position, bounds in header['ranges'].items()}
+            self.buckets = {(face_type, hair_type): (start, end)
+                            for face_type, hair_type, start, end in header['buckets']}
+        else:
+            self.ranges = {position: (min(self.columns[position], default=0),
+                                      max(self.columns[position], default=0)) for position in DISTANCE_FIELDS}
+            self.buckets = {}
+            keys = zip(self.columns[FACE_TYPE], self.columns[HAIR_TYPE])
+            for row, key in enumerate(keys):
+                start, _ = self.buckets.get(key, (row, row))
+                self.buckets[key] = (start, row + 1)
+        self._pack()
+        self.faces = {}
+        for (face_type, _), (start, end) in self.buckets.items():
+            self.faces[face_type] = (self.faces.get(face_type, (start, end))[0], end)
+
+    def _pack(self):
+        """
+        Pack fields with few distinct values into shared byte columns (value - lowest,
+        times the product of the spans before it), so a query translates fewer columns.
+        """
+        groups = []  # [span product, members], first fit on the widest fields first
+        fields = sorted(((high - low + 1, position, low) for position, (low, high) in self.ranges.items()),
+                        reverse=True)
+        for span, position, low in fields:
+            for group in groups:
+                if group[0] * span <= 256:
+                    group[1].append((position, low, group[0], span))
+                    group[0] *= span
+                    break
+            else:
+                groups.append([span, [(position, low, 1, span)]])
+        self.groups = []
+        for _, members in groups:
+            if len(members) == 1 and members[0][1] == 0:
+                self.groups.append((self.columns[members[0][0]], members))
+                continue
+            # Members never carry into each other, so the shifted columns add up as big integers
+            packed = 0
+            for position, low, stride, span in members:
+                table = bytes((value - low) * stride if low <= value < low + span else 0 for value in range(256))
+                packed += int.from_bytes(self.columns[position].translate(table), 'little')
+            self.groups.append((packed.to_bytes(len(self.miis), 'little'), members))
+
+    def group_tables(self, query: bytes) -> List[bytes]:
+        """Penalty table of every packed column, in self.groups order"""
+        penalties = dict(penalty_tables(query))
+        tables = []
+        for _, members in self.groups:
+            if len(members) == 1 and members[0][1] == 0:
+                tables.append(penalties[members[0][0]])
+                continue
+            size = members[-1][2] * members[-1][3]
+            table = 0
+            for position, low, stride, span in members:
+                # Each penalty repeated stride times, the whole run once per higher member value
+                run = b''.join(bytes((penalty,)) * stride for penalty in penalties[position][low:low + span])
+                table += int.from_bytes(run * (size // len(run)), 'little')
+            tables.append(table.to_bytes(size, 'little').ljust(256, b'\0'))
+        return tables
+
+    @classmethod
+    def load(cls, path: Path) -> "AppearanceIndex":
+        index = cls()
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != INDEX_VERSION or header.get('fields') != STUDIO_FIELDS:
+                raise ValueError(f"{path} was built by another version, build it again")
+            index.rows = f.read()
+        index.saves = header['saves']
+        index.miis = header['miis']
+        index._finish(header)
+        return index
+
+    def save(self, path: Path):
+        """Write the index atomically: one JSON header line, then the rows"""
+        header = {'version': INDEX_VERSION, 'fields': STUDIO_FIELDS, 'saves': self.saves, 'miis': self.miis,
+                  'ranges': self.ranges,
+                  'buckets': [[face_type, hair_type, start, end]
+                              for (face_type, hair_type), (start, end) in self.buckets.items()]}
+        tmp_file = path.with_name(path.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(json.dumps(header, ensure_ascii=True).encode('ascii') + b'\n')
+            f.write(self.rows)
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def build(cls, saves: List[Path], region: str = "EU", max_miis: int = 100, workers: int = 1,
+              previous: Optional["AppearanceIndex"] = None) -> Tuple["AppearanceIndex", int]:
+        """Index the saves, keeping the rows of saves unchanged since previous; returns (index, saves read)"""
+        kept = {}  # path -> (vectors, miis) carried over from previous
+        if previous is not None:
+            by_save = {}
+            for row, (number, slot, nickname) in enumerate(previous.miis):
+                vectors, miis = by_save.setdefault(number, ([], []))
+                vectors.append(previous.rows[row * ROW_SIZE:(row + 1) * ROW_SIZE])
+                miis.append((slot, nickname))
+            for number, save in enumerate(previous.saves):
+                kept[(save['path'], save['region'])] = (save['signature'], by_save.get(number, ([], [])))
+
+        entries = []  # [save entry, vectors, miis] in save order
+        todo = []  # entries whose save has to be read
+        for save in saves:
+            path = str(Path(save).resolve())
+            entry = {'path': path, 'region': region, 'signature': _signature(Path(save))}
+            old = kept.get((path, region))
+            if old is not None and old[0] == entry['signature']:
+                entries.append([entry, *old[1]])
+            else:
+                todo.append(len(entries))
+                entries.append([entry, None, None])
+
+        jobs = [(str(saves[i]), region, max_miis) for i in todo]
+        if workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_save_vectors, *zip(*jobs)))
+        else:
+            results = [_save_vectors(*job) for job in jobs]
+        for i, (vectors, miis) in zip(todo, results):
+            entries[i][1:] = vectors, miis
+
+        index = cls()
+        rows = []
+        for number, (entry, vectors, miis) in enumerate(entries):
+            index.saves.append(entry)
+            rows.extend((vector, [number, slot, nickname]) for vector, (slot, nickname) in zip(vectors, miis))
+        # Stable sort, so rows stay in save order within a bucket
+        rows.sort(key=lambda item: (item[0][FACE_TYPE], item[0][HAIR_TYPE]))
+        index.rows = b''.join(vector for vector, _ in rows)
+        index.miis = [mii for _, mii in rows]
+        index._finish()
+        return index, len(todo)
+
+    def __len__(self) -> int:
+        return len(self.miis)
+
+    def vector(self, row: int) -> bytes:
+        return self.rows[row * ROW_SIZE:(row + 1) * ROW_SIZE]
+
+    def describe(self, row: int) -> Dict:
+        number, slot, nickname = self.miis[row]
+        return {'save': Path(self.saves[number]['path']).name, 'mii_index': slot, 'nickname': nickname,
+                'studio_code': self.vector(row).hex()}
+
+    def find(self, value: str) -> int:
+        """Row of a Mii by slot or nickname, of the first save or of SAVE:..."""
+        save_name, _, mii = value.rpartition(':')
+        saves = [number for number, save in enumerate(self.saves)
+                 if not save_name or save_name in (Path(save['path']).name, Path(save['path']).stem)]
+        if not saves:
+            raise ValueError(f"no save {save_name} in the index")
+        number = saves[0]
+        for row, (save, slot, nickname) in enumerate(self.miis):
+            if save == number and (str(slot) == mii or nickname.lower() == mii.lower()):
+                return row
+        raise ValueError(f"no Mii {mii} in {Path(self.saves[number]['path']).name}")
+
+    def distances(self, query: bytes, start: int = 0, end: Optional[int] = None,
+                  tables: Optional[List[bytes]] = None) -> bytes:
+        """Distance from query to every row in [start, end), one byte per row"""
+        end = len(self.miis) if end is None else end
+        total = 0
+        for (column, _), table in zip(self.groups, tables or self.group_tables(query)):
+            total += int.from_bytes(column[start:end].translate(table), 'little')
+        return total.to_bytes(end - start, 'little')
+
+    def _search(self, query: bytes, ranges: List[Tuple[int, int]], k: int, exclude: Optional[int],
+                tables: List[bytes]) -> List[Tuple[int, int]]:
+        """k nearest (row, distance) within row ranges, ties in row order"""
+        found = []
+        for start, end in ranges:
+            found += _nearest(self.distances(query, start, end, tables), k, start, exclude)
+        return sorted(found, key=lambda match: (match[1], match[0]))[:k]
+
+    def similar(self, query: bytes, k: int = 10, exclude: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(row, distance) of the k Miis that look most like query, nearest first (exact)"""
+        face_type, hair_type = query[FACE_TYPE], query[HAIR_TYPE]
+        bucket = [self.buckets[(face_type, hair_type)]] if (face_type, hair_type) in self.buckets else []
+        neighbors = ([self.faces[face_type]] if face_type in self.faces else []) + [
+            self.buckets[(other, hair_type)] for other in self.faces
+            if other != face_type and (other, hair_type) in self.buckets]
+        tables = self.group_tables(query)
+        for ranges, bound in ((bucket, BUCKET_BOUND), (neighbors, NEIGHBOR_BOUND)):
+            found = self._search(query, ranges, k, exclude, tables)
+            # Strictly nearer than anything left out, so the same as a full scan
+            if len(found) == k and found[-1][1] < bound:
+                return found
+        return _nearest(self.distances(query, tables=tables), k, 0, exclude)
+
+
+def main():
+    argv = sys.argv[1:]
+    region = pop_option(argv, "--region", "EU")
+    max_miis = int(pop_option(argv, "--max-miis", "100"))
+    workers = int(pop_option(argv, "--workers", "1"))
+    top = int(pop_option(argv, "--top", "10"))
+    json_file = pop_option(argv, "--json", None)
+    command = argv[0] if argv else None
+    if command not in ('build', 'similar') or len(argv) < 3:
+        print("Usage: python appearance_index.py build <index file> <save files or folders...> [options]")
+        print("       python appearance_index.py similar <index file> <mii> [--top K] [--json FILE]")
+        print("  mii: Slot or nickname of a Mii of the first save (SAVE:slot or SAVE:nickname for")
+        print("       another save), or a 92-digit Mii Studio code")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --max-miis: Maximum number of Miis per save (default: 100)")
+        print("  --workers N: Processes decoding saves during build (default: 1)")
+        print("  --top K: Number of look-alikes to list (default: 10)")
+        print("  --json: Also write the matches to a JSON file")
+        sys.exit(1)
+
+    index_file = Path(argv[1])
+    if command == 'build':
+        started = time.perf_counter()
+        previous = None
+        if index_file.exists():
+            try:
+                previous = AppearanceIndex.load(index_file)
+            except ValueError as e:
+                print(f"⚠ {e}")
+        saves = find_saves(argv[2:])
+        index, read = AppearanceIndex.build(saves, region, max_miis, workers, previous)
+        index.save(index_file)
+        print(f"✓ {index_file}: {len(index)} Miis from {len(saves)} save(s) ({read} read), "
+              f"{len(index.buckets)} face/hair buckets, {os.path.getsize(index_file):,} bytes "
+              f"in {time.perf_counter() - started:.2f}s")
+        return
+
+    index = AppearanceIndex.load(index_file)
+    try:
+        if len(argv[2]) == ROW_SIZE * 2 and all(c in '0123456789abcdefABCDEF' for c in argv[2]):
+            query, row = bytes.fromhex(argv[2]), None
+            label = "Studio code"
+        else:
+            row = index.find(argv[2])
+            query = index.vector(row)
+            mii = index.describe(row)
+            label = f"{mii['save']}/Mii {mii['mii_index']} ({mii['nickname']})"
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    found = index.similar(query, top, exclude=row)
+    elapsed = time.perf_counter() - started
+    print(f"Looks most like {label} (distance 0-{MAX_DISTANCE}, {len(index):,} Miis searched "
+          f"in {elapsed * 1000:.1f} ms):")
+    matches = []
+    for match_row, match_distance in found:
+        mii = index.describe(match_row)
+        mii['distance'] = match_distance
+        matches.append(mii)
+        same = " - same appearance" if match_distance == 0 else ""
+        print(f"  {match_distance:>3}  {mii['save']}/Mii {mii['mii_index']} ({mii['nickname']}){same}")
+
+    if json_file:
+        json_output.dump({'query': label, 'studio_code': query.hex(), 'matches': matches}, json_file)
+        print(f"✓ Matches written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Asyncio orchestrator for extract -> convert -> render over many saves.
+
+CPU-bound work (decoding a save, converting its Miis) runs in a process pool,
+render fetches run as coroutines over a dedicated network thread pool, and file
+writes go through a small thread pool. Every stage has its own concurrency
+limit and queue, and the queue depths are reported while the runner works, so
+one long-lived process can keep both the cores and the network busy across
+hundreds of saves.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import json_output
+from cli_options import find_saves, pop_flag, pop_option
+from convert_all_miis import convert_mii_data, get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor, build_summary, mii_json_bytes, mii_json_name
+from mii_store import MiiStore, mii_key
+from output_backend import ARCHIVE_FORMATS, open_output
+from pipeline import MiiJob
+from render_cache import RenderCache
+from render_downloader import DEFAULT_CONCURRENCY, RenderDownloader
+from text_index import TEXT_INDEX_NAME, build_text_index
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = None
+
+
+def _decode_save(save_file: str, region: str, max_miis: int) -> Tuple[Dict, List[Tuple[int, Dict, bytes]], Dict]:
+    """Process pool worker: decode every Mii of a save, also returns the save's lookup tables"""
+    extractor = CompleteMiiExtractor(save_file, region)
+    with open(extractor.file_path, 'rb') as f:
+        extractor.data = f.read()
+    meta = {
+        'region': extractor.region,
+        'file_path': str(extractor.file_path),
+        'file_size': len(extractor.data),
+        'total_miis': 0,
+        'miis': {}
+    }
+    miis = []
+    # iter_miis reports each Mii it extracts; keep the workers quiet
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        for mii_index, mii_data in extractor.iter_miis(max_miis):
+            offset = get_mii_offset(mii_index, region)
+            miis.append((mii_index, mii_data, extractor.data[offset:offset + 0x60]))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return meta, miis, extractor.lookup_tables()
+
+
+def _convert_batch(raws: List[bytes]) -> List[Tuple[Optional[Tuple[bytes, str, str]], Optional[str]]]:
+    """Process pool worker: convert the raw Mii blocks of one save"""
+    results = []
+    for raw in raws:
+        try:
+            results.append((convert_mii_data(raw), None))
+        except Exception as e:
+            results.append((None, f"convert failed: {e}"))
+    return results
+
+
+class SaveState:
+    """Bookkeeping for one save while its Miis are in flight"""
+
+    def __init__(self, save_file: str, output_folder: Path, archive_format: Optional[str] = None):
+        self.save_file = save_file
+        self.output_folder = output_folder
+        self.archive_format = archive_format
+        self.output = None
+        self.lookup_tables = None
+        self.all_data = None
+        self.remaining = 0
+        self.total_size = 0
+        self.success_count = 0
+        self.fail_count = 0
+        self.error = None  # set when the whole save failed
+        self.done = asyncio.Event()
+
+
+class AsyncRunner:
+    def __init__(self, decode_workers: Optional[int] = None, convert_workers: Optional[int] = None,
+                 download_concurrency: int = DEFAULT_CONCURRENCY, write_workers: int = 4,
+                 cache: Optional[RenderCache] = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 report_interval: float = 5.0, pretty: bool = True, compact: bool = False,
+                 store: Optional[MiiStore] = None):
+        cpus = os.cpu_count() or 2
+        self.limits = {
+            'decode': decode_workers or cpus,
+            'convert': convert_workers or cpus,
+            'download': max(1, download_concurrency),
+            'write': max(1, write_workers)
+        }
+        self.cache = cache
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.pretty = pretty
+        self.compact = compact
+        self.store = store
+        # Pools live as long as the runner, so repeated run() calls reuse warm workers
+        self.cpu_pool = ProcessPoolExecutor(max_workers=max(self.limits['decode'], self.limits['convert']))
+        self.net_pool = ThreadPoolExecutor(max_workers=self.limits['download'], thread_name_prefix="download")
+        self.io_pool = ThreadPoolExecutor(max_workers=self.limits['write'], thread_name_prefix="write")
+        self.downloader = RenderDownloader(self.limits['download'], cache=cache)
+        self.queues = {}
+        self.max_depths = {}
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Current number of items waiting in front of each stage"""
+        return {name: q.qsize() for name, q in self.queues.items()}
+
+    def close(self):
+        self.cpu_pool.shutdown()
+        self.net_pool.shutdown()
+        self.io_pool.shutdown()
+        self.downloader.close()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            depths = self.queue_depths()
+            print("  Queue depth: " + ", ".join(f"{name} {depth}" for name, depth in depths.items()))
+
+    async def _stage(self, name: str, handler, workers: int):
+        """Run `workers` coroutines pulling from the stage's queue until it is closed"""
+        inbox = self.queues[name]
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    await inbox.put(_DONE)  # let sibling workers see it too
+                    return
+                depth = inbox.qsize()
+                if depth > self.max_depths.get(name, 0):
+                    self.max_depths[name] = depth
+                try:
+                    await handler(item)
+                except Exception as e:
+                    # One bad item must not take the worker (and every save waiting on it) down
+                    await self._item_failed(name, item, e)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    async def _decode(self, item):
+        loop = asyncio.get_running_loop()
+        save_file, region, max_miis, state = item
+        try:
+            meta, miis, state.lookup_tables = await loop.run_in_executor(self.cpu_pool, _decode_save, save_file,
+                                                                         region, max_miis)
+        except Exception as e:
+            state.error = f"decode failed: {e}"
+            print(f"  ✗ {save_file}: {state.error}")
+            state.all_data = None
+            state.done.set()
+            return
+        state.all_data = meta
+        state.output = await loop.run_in_executor(self.io_pool, open_output, state.output_folder,
+                                                  state.archive_format)
+        for mii_index, mii_data, _ in miis:
+            meta['miis'][str(mii_index)] = mii_data
+        meta['total_miis'] = len(miis)
+        state.remaining = len(miis)
+        if not miis:
+            await self._finish_save(state)
+            return
+        await self.queues['convert'].put((state, [MiiJob(i, data, raw) for i, data, raw in miis]))
+
+    async def _item_failed(self, stage: str, item, error: Exception):
+        """Count the Miis of an item whose handler raised as failed, finishing the save if they were its last"""
+        if stage == 'decode':
+            state = item[3]
+            state.error = f"{stage} failed: {error}"
+            print(f"  ✗ {state.save_file}: {state.error}")
+            state.done.set()
+            return
+        state, jobs = item
+        count = len(jobs) if isinstance(jobs, list) else 1
+        print(f"  ✗ {Path(state.save_file).name}: {stage} failed for {count} Mii(s): {error}")
+        state.fail_count += count
+        state.remaining -= count
+        if state.remaining == 0:
+            await self._finish_save(state)
+
+    async def _convert(self, item):
+        loop = asyncio.get_running_loop()
+        state, jobs = item
+        pending = jobs
+        if self.store is not None:
+            # Miis stored for an earlier save need no conversion at all
+            for job in jobs:
+                job.store_key = mii_key(job.raw, job.data.get('profile', {}))
+            pending = [job for job in jobs if not self.store.complete(job.store_key)]
+        results = await loop.run_in_executor(self.cpu_pool, _convert_batch,
+                                             [job.raw for job in pending]) if pending else []
+        for job, (converted, error) in zip(pending, results):
+            if error:
+                job.error = error
+            else:
+                job.studio_data, job.face_url, job.body_url = converted
+        for job in jobs:
+            await self.queues['download'].put((state, job))
+
+    def _fetch_render(self, state: SaveState, url: str, name: str) -> bool:
+        """Network thread: download one render into the save's output"""
+        path = state.output.path(name)
+        if path is not None:
+            return self.downloader.download(url, path)
+        content = self.downloader.fetch(url, Path(name).name)
+        if content is None:
+            return False
+        state.output.write(name, content)
+        return True
+
+    def _fetch_stored(self, state: SaveState, job: MiiJob) -> int:
+        """Network thread: fill the Mii's store entry if needed, then place it in the save's output"""
+        converted = (job.studio_data, job.face_url, job.body_url) if job.studio_data is not None else None
+        self.store.provide(job.store_key, job.raw, self.downloader, converted)
+        job.stored = True
+        self.store.record(job.store_key, job.data.get('profile', {}), state.save_file, job.mii_index)
+        return self.store.place(job.store_key, state.output, job.folder_name, job.mnms_name)
+
+    async def _download(self, item):
+        loop = asyncio.get_running_loop()
+        state, job = item
+        if job.error is None and self.store is not None:
+            job.images_ok = await loop.run_in_executor(self.net_pool, self._fetch_stored, state, job)
+        elif job.error is None:
+            face, body = await asyncio.gather(
+                loop.run_in_executor(self.net_pool, self._fetch_render, state, job.face_url,
+                                     f"{job.folder_name}/face.png"),
+                loop.run_in_executor(self.net_pool, self._fetch_render, state, job.body_url,
+                                     f"{job.folder_name}/body.png"))
+            job.images_ok = int(face) + int(body)
+        await self.queues['write'].put((state, job))
+
+    async def _write(self, item):
+        loop = asyncio.get_running_loop()
+        state, job = item
+
+        def write_files():
+            file_size = state.output.write(mii_json_name(job.mii_index, job.data),
+                                           mii_json_bytes(job.data, state.all_data, self.pretty, self.compact))
+            if job.studio_data is not None and not job.stored:
+                state.output.write(job.mnms_name, job.studio_data)
+            return file_size
+
+        try:
+            state.total_size += await loop.run_in_executor(self.io_pool, write_files)
+        except OSError as e:
+            job.error = f"write failed: {e}"
+        if job.error is None and job.images_ok > 0:
+            state.success_count += 1
+        else:
+            state.fail_count += 1
+        state.remaining -= 1
+        if state.remaining == 0:
+            await self._finish_save(state)
+
+    async def _finish_save(self, state: SaveState):
+        loop = asyncio.get_running_loop()
+
+        def write_summary():
+            try:
+                summary_data = build_summary(state.all_data, state.total_size,
+                                             state.lookup_tables if self.compact else None)
+                state.output.write("_summary.json", json_output.dumps(summary_data, self.pretty))
+                state.output.write(TEXT_INDEX_NAME, build_text_index(state.all_data))
+            finally:
+                state.output.close()
+
+        try:
+            await loop.run_in_executor(self.io_pool, write_summary)
+        except Exception as e:
+            state.error = f"summary write failed: {e}"
+            print(f"  ✗ {Path(state.save_file).name}: {state.error}")
+        else:
+            print(f"  ✓ {Path(state.save_file).name}: {state.success_count} converted, {state.fail_count} failed")
+        finally:
+            state.done.set()
+
+    async def run(self, saves: List[Tuple[str, Path, str]], max_miis: int = 100,
+                  archive_format: Optional[str] = None) -> List[SaveState]:
+        """
+        Process (save_file, output_folder, region) entries, returns their final states.
+        With archive_format ('zip' or 'tar') each save is written to one archive instead of a folder.
+        """
+        self.queues = {name: asyncio.Queue(self.queue_size) for name in ('decode', 'convert', 'download', 'write')}
+        self.max_depths = {}
+        stages = [
+            asyncio.ensure_future(self._stage('decode', self._decode, self.limits['decode'])),
+            asyncio.ensure_future(self._stage('convert', self._convert, self.limits['convert'])),
+            asyncio.ensure_future(self._stage('download', self._download, self.limits['download'])),
+            asyncio.ensure_future(self._stage('write', self._write, self.limits['write']))
+        ]
+        reporter = asyncio.ensure_future(self._report())
+
+        states = []
+        for save_file, output_folder, region in saves:
+            state = SaveState(save_file, Path(output_folder), archive_format)
+            states.append(state)
+            await self.queues['decode'].put((save_file, region, max_miis, state))
+
+        # Saves finish independently; once all are done every stage can be closed
+        await asyncio.gather(*(state.done.wait() for state in states))
+        for name in ('decode', 'convert', 'download', 'write'):
+            await self.queues[name].put(_DONE)
+        await asyncio.gather(*stages)
+        reporter.cancel()
+        if self.cache is not None:
+            self.cache.save_index()
+        if self.store is not None:
+            self.store.save_index()
+        return states
+
+
+def output_names(saves: List[Path]) -> List[str]:
+    """
+    One output folder name per save: the file name without suffix, with the parent folder
+    in front when several saves share it (a/savedataArc.txt -> a_savedataArc), then a counter.
+    """
+    stems = Counter(save.stem for save in saves)
+    names, taken = [], set()
+    for save in saves:
+        name = save.stem if stems[save.stem] == 1 else f"{save.parent.name}_{save.stem}"
+        unique, n = name, 2
+        while unique in taken:
+            unique, n = f"{name}_{n}", n + 1
+        taken.add(unique)
+        names.append(unique)
+    return names
+
+
+def main():
+    script_dir = Path(__file__).parent
+    argv = sys.argv[1:]
+    output_dir = Path(pop_option(argv, "--output", str(script_dir / "extracted_saves")))
+    region = pop_option(argv, "--region", "EU")
+    max_miis = int(pop_option(argv, "--max-miis", "100"))
+    decode_workers = int(pop_option(argv, "--decode-workers", "0")) or None
+    convert_workers = int(pop_option(argv, "--convert-workers", "0")) or None
+    downloads = int(pop_option(argv, "--downloads", str(DEFAULT_CONCURRENCY)))
+    write_workers = int(pop_option(argv, "--write-workers", "4"))
+    use_cache = not pop_flag(argv, "--no-cache")
+    use_store = not pop_flag(argv, "--no-store")
+    archive_format = pop_option(argv, "--archive", None)
+    pretty = not pop_flag(argv, "--minify")
+    compact = pop_flag(argv, "--compact")
+
+    if not argv or (archive_format is not None and archive_format not in ARCHIVE_FORMATS):
+        print("Usage: python async_runner.py <save files or folders...> [options]")
+        print("  --output DIR: Output folder, one subfolder per save (default: extracted_saves)")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --max-miis: Maximum number of Miis per save (default: 100)")
+        print("  --decode-workers / --convert-workers: Processes for decoding / converting (default: CPU count)")
+        print(f"  --downloads: Concurrent render downloads (default: {DEFAULT_CONCURRENCY})")
+        print("  --write-workers: Threads writing output files (default: 4)")
+        print("  --no-cache: Always download renders")
+        print("  --no-store: Convert and render every Mii, even ones already stored for another save")
+        print("  --archive zip|tar: Write each save to one archive instead of per-Mii folders")
+        print(f"  --minify: Write JSON without indentation (JSON backend: {json_output.BACKEND})")
+        print("  --compact: Leave out names derived from IDs (lookup tables go into each _summary.json)")
+        sys.exit(1)
+
+    saves = find_saves(argv)
+    print("=" * 70)
+    print("Tomodachi Life Data Extractor - Async Batch Runner")
+    print("=" * 70)
+    print(f"Saves: {len(saves)}")
+    print(f"Output folder: {output_dir}\n")
+
+    cache = RenderCache(script_dir / ".render_cache") if use_cache else None
+    store = MiiStore(script_dir / ".mii_store") if use_store else None
+    runner = AsyncRunner(decode_workers, convert_workers, downloads, write_workers, cache, pretty=pretty,
+                         compact=compact, store=store)
+    print("Stage limits: " + ", ".join(f"{name} {limit}" for name, limit in runner.limits.items()) + "\n")
+    started = time.perf_counter()
+    try:
+        states = asyncio.run(runner.run([(str(save), output_dir / name, region)
+                                         for save, name in zip(saves, output_names(saves))], max_miis,
+                                        archive_format))
+    finally:
+        runner.close()
+
+    print(f"\nProcessed {len(states)} saves in {time.perf_counter() - started:.2f}s")
+    print(f"Miis converted: {sum(s.success_count for s in states)}, failed: {sum(s.fail_count for s in states)}")
+    failed_saves = [s for s in states if s.error]
+    if failed_saves:
+        print(f"Saves failed: {len(failed_saves)}")
+    if store is not None:
+        print(f"Mii store: {store.hits} shared, {store.misses} converted and rendered")
+    print("Peak queue depth: " + ", ".join(f"{name} {runner.max_depths.get(name, 0)}" for name in runner.queues))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the extractor, converter and output path.
+
+Runs each benchmark on synthetic saves (see synthetic_save.py) of several
+sizes and prints the best and mean time per call. The download benchmarks
+fetch a face and a body render per Mii from a local stand-in server with
+DOWNLOAD_DELAY of latency (see render_stand_in.py), one at a time and with the
+pooled, concurrent downloader, so the throughput gain is measured offline. Results can be saved as
+JSON and compared against an earlier run, so a performance change comes with
+before/after numbers:
+
+    python benchmarks/bench.py --save before.json
+    ... change something ...
+    python benchmarks/bench.py --compare before.json
+
+Usage: python benchmarks/bench.py [name filter] [--sizes 10,50,100] [--repeat N]
+                                  [--save FILE] [--compare FILE]
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import json_output
+from cli_options import pop_option
+from convert_all_miis import get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor, build_summary, mii_json_bytes
+from mii2studio import parse_mii
+from render_downloader import DEFAULT_CONCURRENCY, RenderDownloader
+from render_stand_in import StandInServer
+from studio_plan import encode_studio_data, get_plan
+from synthetic_save import generate_save
+
+DEFAULT_SIZES = [10, 50, 100]
+DOWNLOAD_DELAY = 0.005
+
+_stand_in = None
+
+
+def _render_server() -> StandInServer:
+    """The stand-in render server, started on first use (daemon thread, ends with the process)"""
+    global _stand_in
+    if _stand_in is None:
+        _stand_in = StandInServer(DOWNLOAD_DELAY).start()
+    return _stand_in
+
+
+def _quiet(func: Callable) -> Callable:
+    """The extractor reports every Mii it extracts; keep that out of the timings"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def _extractor(save_file: Path, region: str = "EU") -> CompleteMiiExtractor:
+    extractor = CompleteMiiExtractor(str(save_file), region)
+    with open(save_file, 'rb') as f:
+        extractor.data = f.read()
+    return extractor
+
+
+def build_benchmarks(save_file: Path, slots: int) -> List[Tuple[str, Callable]]:
+    """(name, callable) pairs for one save size"""
+    extractor = _extractor(save_file)
+    data = extractor.data
+    blocks = [data[get_mii_offset(i):get_mii_offset(i) + 0x60] for i in range(slots)]
+    plan = get_plan("3ds")
+    parsed = [parse_mii(block, "3ds") for block in blocks]
+    studio = [plan.convert(mii) for mii in parsed]
+    columns = {source: [getattr(mii, source) for mii in parsed] for source in plan.sources}
+    all_data = _quiet(lambda: extractor.extract_all_miis(slots))()
+    miis = list(all_data['miis'].values())
+
+    def extract_single():
+        extractor.extract_single_mii(slots // 2)
+
+    def extract_all():
+        _extractor(save_file).extract_all_miis(slots)
+
+    def parse_cfsd():
+        for block in blocks:
+            parse_mii(block, "3ds")
+
+    def convert_cfsd():
+        for block in blocks:
+            plan.convert(parse_mii(block, "3ds"))
+
+    def convert_cfsd_direct():
+        for block in blocks:
+            plan.convert_cfsd(block)
+
+    def convert_columns():
+        plan.convert_batch(columns)
+
+    def encode_studio():
+        for studio_data in studio:
+            encode_studio_data(studio_data)
+
+    def download(concurrency: int) -> Callable:
+        urls = _render_server().render_urls(slots * 2)
+
+        def run():
+            with tempfile.TemporaryDirectory() as out, RenderDownloader(concurrency, rate=0) as downloader:
+                results = downloader.download_all([(url, Path(out) / f"{i}.png") for i, url in enumerate(urls)])
+            assert all(results.values())
+        return run
+
+    def json_pretty():
+        for mii_data in miis:
+            mii_json_bytes(mii_data, all_data)
+        json_output.dumps(build_summary(all_data, 0))
+
+    def json_minified():
+        for mii_data in miis:
+            mii_json_bytes(mii_data, all_data, pretty=False)
+
+    def json_compact_profile():
+        for mii_data in miis:
+            mii_json_bytes(mii_data, all_data, pretty=False, compact=True)
+
+    return [
+        ("extract_single_mii", extract_single),
+        ("extract_all_miis", _quiet(extract_all)),
+        ("cfsd_parse", parse_cfsd),
+        ("cfsd_to_studio", convert_cfsd),
+        ("cfsd_to_studio_direct", convert_cfsd_direct),
+        ("cfsd_to_studio_batch", convert_columns),
+        ("studio_encode", encode_studio),
+        ("download_serial", download(1)),
+        ("download_pooled", download(DEFAULT_CONCURRENCY)),
+        ("json_pretty", json_pretty),
+        ("json_minified", json_minified),
+        ("json_compact_profile", json_compact_profile),
+    ]
+
+
+def time_call(func: Callable, repeat: int) -> Dict:
+    """Best and mean seconds per call (autoranged so each sample takes at least ~0.2s)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'best': min(samples), 'mean': sum(samples) / len(samples), 'calls': number * repeat}
+
+
+def _format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
+
+
+def main():
+    argv = sys.argv[1:]
+    sizes = [int(size) for size in pop_option(argv, "--sizes", ",".join(map(str, DEFAULT_SIZES))).split(",")]
+    repeat = int(pop_option(argv, "--repeat", "5"))
+    save_to = pop_option(argv, "--save", None)
+    compare_to = pop_option(argv, "--compare", None)
+    name_filter = argv[0] if argv else ""
+
+    baseline = {}
+    if compare_to:
+        with open(compare_to, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    print("=" * 78)
+    print(f"Benchmarks (Python {sys.version.split()[0]}, JSON backend: {json_output.BACKEND})")
+    print("=" * 78)
+    header = f"{'benchmark':<28}{'miis':>6}{'best':>12}{'mean':>12}"
+    print(header + ("  vs baseline" if baseline else ""))
+    print("-" * 78)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for slots in sizes:
+            save_file = Path(tmp) / f"synthetic_{slots}.sav"
+            with open(save_file, 'wb') as f:
+                f.write(generate_save(slots, "EU", seed=slots))
+            for name, func in build_benchmarks(save_file, slots):
+                if name_filter not in name:
+                    continue
+                key = f"{name}[{slots}]"
+                result = time_call(func, repeat)
+                results[key] = result
+                line = f"{name:<28}{slots:>6}{_format_time(result['best']):>12}{_format_time(result['mean']):>12}"
+                if key in baseline:
+                    change = result['best'] / baseline[key]['best'] - 1
+                    line += f"  {change:+.1%}"
+                print(line)
+
+    if save_to:
+        with open(save_to, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'json_backend': json_output.BACKEND,
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+        print(f"\n✓ Results saved to {save_to}")
+
+
+if __name__ == "__main__":
+    main()
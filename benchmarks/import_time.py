@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Import-time check for the command-line entry points.
+
+Imports each entry point in a fresh interpreter under `python -X importtime`,
+reports the cumulative import time (best of several runs) and the slowest
+modules it pulls in, and fails when a module that should only be loaded on
+demand (requests, Crypto, pkg_resources, the profilers, ...) is imported at
+startup. With --compare, import times more than --max-regression percent
+slower than a saved run fail as well:
+
+    python benchmarks/import_time.py --save before.json
+    ... change something ...
+    python benchmarks/import_time.py --compare before.json
+
+Usage: python benchmarks/import_time.py [name filter] [--repeat N] [--save FILE]
+                                        [--compare FILE] [--max-regression PCT]
+"""
+
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cli_options import pop_option
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded only when they are used: network, crypto, profilers, Kaitai parsers, process pools
+ON_DEMAND = ('requests', 'urllib3', 'Crypto', 'pkg_resources', 'cProfile', 'pstats', 'tracemalloc',
+             'gen1_wii', 'gen1_ds', 'gen2_wiiu_3ds_miitomo', 'gen3_switch', 'gen3_switchgame', 'gen3_studio')
+
+# entry point -> modules it must not import at startup
+ENTRY_POINTS = {
+    'extract_full_mii_data': ON_DEMAND + ('concurrent.futures', 'zipfile', 'tarfile'),
+    'convert_all_miis': ON_DEMAND + ('concurrent.futures',),
+    'mii2studio': ON_DEMAND + ('concurrent.futures', 'kaitaistruct'),
+    'pipeline': ON_DEMAND,
+    'extract_and_convert_all': ON_DEMAND,
+    'async_runner': ON_DEMAND,
+    'compact_profile': ON_DEMAND + ('json_output', 'orjson', 'msgspec'),
+    'mii_service': ON_DEMAND + ('asyncio', 'concurrent.futures', 'async_runner'),
+    'relationship_graph': ON_DEMAND + ('asyncio', 'concurrent.futures', 'async_runner'),
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[int, Dict[str, int]]:
+    """(cumulative µs of module, self µs of every module its import pulled in, in import order)"""
+    code = f"import sys; sys.path[:0] = [{str(ROOT)!r}, {str(ROOT / 'mii2studio')!r}]; import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=str(ROOT))
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip()}")
+    # Lines come out as imports finish, so everything after the previous top-level
+    # import (site and friends at interpreter startup) belongs to this module
+    current = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        current[name] = int(self_us)
+        if not indent:
+            if name == module:
+                return int(cumulative_us), current
+            current = {}
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def _forbidden(imported: List[str], names: Tuple[str, ...]) -> List[str]:
+    """The entries of names that were imported (a package counts when any of its submodules was)"""
+    return [name for name in names if any(module == name or module.startswith(name + '.') for module in imported)]
+
+
+def main():
+    argv = sys.argv[1:]
+    repeat = int(pop_option(argv, "--repeat", "5"))
+    save_to = pop_option(argv, "--save", None)
+    compare_to = pop_option(argv, "--compare", None)
+    max_regression = float(pop_option(argv, "--max-regression", "25")) / 100
+    name_filter = argv[0] if argv else ""
+
+    baseline = {}
+    if compare_to:
+        with open(compare_to, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    print("=" * 78)
+    print(f"Import times (Python {sys.version.split()[0]}, best of {repeat})")
+    print("=" * 78)
+    print(f"{'entry point':<28}{'import':>10}  slowest modules" + ("  / vs baseline" if baseline else ""))
+    print("-" * 78)
+
+    results = {}
+    failures = []
+    for module, not_at_startup in ENTRY_POINTS.items():
+        if name_filter not in module:
+            continue
+        runs = [import_profile(module) for _ in range(repeat)]
+        total, self_times = min(runs, key=lambda run: run[0])
+        results[module] = {'us': total, 'modules': len(self_times)}
+
+        slowest = sorted((name for name in self_times if name != module), key=self_times.get, reverse=True)[:3]
+        line = f"{module:<28}{total / 1000:>8.1f}ms  " + ", ".join(f"{name} {self_times[name] / 1000:.1f}ms"
+                                                                  for name in slowest)
+        if module in baseline:
+            change = total / baseline[module]['us'] - 1
+            line += f"  / {change:+.1%}"
+            if change > max_regression:
+                failures.append(f"{module} imports {change:.0%} slower than {compare_to}")
+        print(line)
+
+        loaded = _forbidden(list(self_times), not_at_startup)
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} at startup")
+
+    if save_to:
+        with open(save_to, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'results': results}, f, indent=2)
+        print(f"\n✓ Results saved to {save_to}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print("\n✓ No on-demand modules imported at startup")
+
+
+if __name__ == "__main__":
+    main()
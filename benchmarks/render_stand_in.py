@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Mii Studio render server, for tests and offline benchmarks.
+
+Serves HTTP/1.1 with keep-alive on 127.0.0.1 from a background thread. The
+path picks the answer:
+    /render/<key>?delay=S&size=N        200 with N bytes after S seconds
+    /flaky/<key>?fail=K&status=429      the first K requests for <key> get the status,
+              &retry_after=S&delay=S    then 200 (Retry-After header only if given)
+    /status/<code>                      always that status
+Every answer can be delayed with delay=S (the server-wide default is `delay`).
+The server counts requests per path, new connections and the most requests in
+flight at once, and keeps the arrival time of every request.
+
+Usage: python benchmarks/render_stand_in.py [--port N] [--delay S]
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cli_options import pop_option
+
+DEFAULT_SIZE = 2048
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes; no 40 ms delayed-ACK stall
+    server: "_Server"
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in._connected()
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        stand_in._started(parts.path)
+        try:
+            time.sleep(float(query.get('delay', stand_in.delay)))
+            kind = parts.path.strip('/').split('/')[0]
+            status, headers = 200, {}
+            if kind == 'status':
+                status = int(parts.path.rstrip('/').rsplit('/', 1)[-1])
+            elif kind == 'flaky' and stand_in.requests[parts.path] <= int(query.get('fail', 1)):
+                status = int(query.get('status', 429))
+                if 'retry_after' in query:
+                    headers['Retry-After'] = query['retry_after']
+            elif kind not in ('render', 'flaky'):
+                status = 404
+            body = b'\x89PNG' + bytes(int(query.get('size', DEFAULT_SIZE)) - 4) if status == 200 else b'error'
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'image/png' if status == 200 else 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            stand_in._finished()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stand_in: "StandInServer"
+
+
+class StandInServer:
+    def __init__(self, delay: float = 0.0, port: int = 0):
+        self.delay = delay
+        self.requests = Counter()  # path -> requests so far
+        self.arrivals = []  # monotonic time of every request
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{path.lstrip('/')}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        """Forget the counters (not the delay)"""
+        with self._lock:
+            self.requests.clear()
+            self.arrivals = []
+            self.connections = self.peak_in_flight = 0
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _started(self, path: str):
+        with self._lock:
+            self.requests[path] += 1
+            self.arrivals.append(time.monotonic())
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def render_urls(self, count: int, delay: Optional[float] = None, size: int = DEFAULT_SIZE) -> List[str]:
+        """count distinct /render URLs"""
+        options = f"size={size}" + (f"&delay={delay}" if delay is not None else "")
+        return [self.url(f"render/{i}?{options}") for i in range(count)]
+
+
+def main():
+    argv = sys.argv[1:]
+    port = int(pop_option(argv, "--port", "8000"))
+    delay = float(pop_option(argv, "--delay", "0.05"))
+    with StandInServer(delay, port) as server:
+        print(f"Render stand-in on {server.url('')} (delay {delay * 1000:.0f} ms), Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\n{server.total_requests()} requests over {server.connections} connections, "
+                  f"at most {server.peak_in_flight} in flight")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic Tomodachi Life saves for benchmarks.
+
+Writes every field the extractor and converter read at the offsets they read
+it from: a CFSD Mii block (version 3, valid ranges, CRC-16 checksum) per slot,
+profile/status bytes, food IDs, personality and voice bytes, and a relationship
+matrix of the requested density. The same (slots, region, seed, density) always
+gives the same bytes.
+
+Usage: python benchmarks/synthetic_save.py <output_file> [slots] [EU|US|JP|KR] [--seed N] [--density F]
+"""
+
+import random
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cli_options import pop_option
+from extract_full_mii_data import FOOD_IDS
+
+SAVE_SIZE = 0x80000
+MAX_SLOTS = 100
+REGIONS = ("EU", "US", "JP", "KR")
+
+NAME_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzÄÖÜéèàçñ "
+FOOD_CHOICES = sorted(food_id for food_id in FOOD_IDS if food_id not in (0, 65535))
+
+
+def crc16(data: bytes) -> int:
+    """CRC-16/CCITT (poly 0x1021, init 0) as used for the Mii data checksum"""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+            crc &= 0xFFFF
+    return crc
+
+
+def _random_name(rng: random.Random, max_length: int) -> str:
+    return "".join(rng.choice(NAME_CHARS) for _ in range(rng.randint(3, max_length))).strip() or "Mii"
+
+
+def _utf16(text: str, size: int) -> bytes:
+    return text.encode('utf-16-le')[:size].ljust(size, b'\0')
+
+
+def make_cfsd(rng: random.Random, name: str) -> bytes:
+    """One 0x60-byte 3DS Mii block with every field inside its valid range"""
+    block = bytearray(0x60)
+    block[0x00] = 3  # version
+    block[0x01] = rng.randrange(0x100) & 0x01  # copying allowed
+    block[0x02] = rng.randrange(10)  # slot index / page index
+    block[0x03] = 0x30 | rng.randrange(4)  # device origin
+    block[0x04:0x0C] = bytes(rng.randrange(0x100) for _ in range(8))  # system ID
+    block[0x0C:0x10] = struct.pack('>I', 0x80000000 | rng.randrange(0x10000000))  # avatar ID
+    block[0x10:0x16] = bytes(rng.randrange(0x100) for _ in range(6))  # client ID
+    gender = rng.randrange(2)
+    data_1 = (gender | (rng.randint(1, 12) << 1) | (rng.randint(1, 28) << 5) |
+              (rng.randrange(12) << 10) | (rng.randrange(2) << 14))
+    block[0x18:0x1A] = struct.pack('<H', data_1)
+    block[0x1A:0x2E] = _utf16(name, 20)
+    block[0x2E] = rng.randrange(128)  # height
+    block[0x2F] = rng.randrange(128)  # build
+    block[0x30] = (rng.randrange(12) << 1) | (rng.randrange(6) << 5)  # face type / skin color
+    block[0x31] = rng.randrange(12) | (rng.randrange(12) << 4)  # makeup / wrinkles
+    block[0x32] = rng.randrange(132)  # hair style
+    block[0x33] = rng.randrange(8) | (rng.randrange(2) << 3)  # hair color / flip
+    eye = (rng.randrange(60) | (rng.randrange(6) << 6) | (rng.randrange(8) << 9) | (rng.randrange(7) << 13) |
+           (rng.randrange(8) << 16) | (rng.randrange(12) << 20) | (rng.randrange(19) << 25))
+    eyebrow = (rng.randrange(25) | (rng.randrange(8) << 5) | (rng.randrange(9) << 9) | (rng.randrange(7) << 13) |
+               (rng.randrange(12) << 16) | (rng.randrange(10) << 21) | (rng.randrange(16) << 26))
+    block[0x34:0x38] = struct.pack('<I', eye)
+    block[0x38:0x3C] = struct.pack('<I', eyebrow)
+    block[0x3C:0x3E] = struct.pack('<H', rng.randrange(18) | (rng.randrange(9) << 5) | (rng.randrange(19) << 9))
+    block[0x3E:0x40] = struct.pack('<H', rng.randrange(36) | (rng.randrange(5) << 6) | (rng.randrange(9) << 9) |
+                                   (rng.randrange(7) << 13))
+    block[0x40:0x42] = struct.pack('<H', rng.randrange(19) | (rng.randrange(6) << 5) | (rng.randrange(6) << 8))
+    block[0x42:0x44] = struct.pack('<H', rng.randrange(6) | (rng.randrange(8) << 3) | (rng.randrange(9) << 6) |
+                                   (rng.randrange(17) << 10))
+    block[0x44:0x46] = struct.pack('<H', rng.randrange(9) | (rng.randrange(6) << 4) | (rng.randrange(8) << 7) |
+                                   (rng.randrange(21) << 11))
+    block[0x46:0x48] = struct.pack('<H', rng.randrange(2) | (rng.randrange(9) << 1) | (rng.randrange(17) << 5) |
+                                   (rng.randrange(31) << 10))
+    block[0x48:0x5C] = _utf16(_random_name(rng, 10), 20)  # creator
+    block[0x5E:0x60] = struct.pack('>H', crc16(bytes(block[:0x5E])))
+    return bytes(block)
+
+
+def generate_save(slots: int = MAX_SLOTS, region: str = "EU", seed: int = 0, density: float = 0.8) -> bytes:
+    """Build a save with `slots` occupied Mii slots and a relationship matrix of the given density"""
+    if not 0 <= slots <= MAX_SLOTS:
+        raise ValueError(f"slots must be between 0 and {MAX_SLOTS}")
+    rng = random.Random(seed)
+    data = bytearray(SAVE_SIZE)
+    jp = region.upper() == "JP"
+
+    for i in range(slots):
+        name = _random_name(rng, 10)
+        profile_base = 0x1C8A + i * 0x660
+
+        # Profile / status bytes, relative to the name offset like the extractor reads them
+        data[profile_base - 0x19] = rng.randrange(2)  # copying
+        data[profile_base + 0x16] = rng.randrange(2)  # sharing
+        data[profile_base + 0x46:profile_base + 0x64] = _utf16(_random_name(rng, 15), 30)
+        data[profile_base + 0x66:profile_base + 0x84] = _utf16(_random_name(rng, 15), 30)
+        data[profile_base + 0x89] = rng.randrange(8)  # hair color
+        data[profile_base + 0x8C:profile_base + 0x91] = bytes(rng.randrange(5) for _ in range(5))  # gestures
+        data[profile_base + 0x98] = rng.randrange(100)  # experience
+        data[profile_base + 0x99] = rng.randrange(1, 100)  # level
+        data[profile_base + 0x9A:profile_base + 0x9E] = struct.pack('<I', rng.randrange(100))
+        data[profile_base + 0xBE] = rng.randrange(4)
+        data[profile_base + 0xCE] = rng.randrange(4)
+        data[profile_base + 0xDE:profile_base + 0xE2] = bytes(rng.randrange(0x100) for _ in range(4))
+        for phrase in (0x13A, 0x15C, 0x17E, 0x1A0):
+            data[profile_base + phrase:profile_base + phrase + 0x20] = _utf16(_random_name(rng, 16), 32)
+        data[profile_base + 0x2A3] = rng.randrange(8)
+        data[profile_base + 0x624] = rng.randrange(2)
+        data[profile_base + 0x626:profile_base + 0x62A] = struct.pack('<I', rng.randrange(100))
+
+        # Food IDs (all-time favorites, worst, current favorites), fullness and tummy
+        food_base = (0x2198 + i * 0x590) if jp else (profile_base + 0x5D0 + i * 0x660)
+        for slot in range(7):
+            struct.pack_into('<H', data, food_base + slot * 2, rng.choice(FOOD_CHOICES))
+        data[food_base - 0x26] = rng.randrange(4)
+        data[food_base - 0x5] = rng.randrange(100)
+
+        # Voice (pitch, speed, quality, tone, accent, intonation) and personality sliders
+        personality_base = 0x1D80 + i * 0x660
+        data[personality_base - 6:personality_base] = bytes(rng.randrange(51) for _ in range(6))
+        data[personality_base:personality_base + 5] = bytes([rng.randint(1, 8), rng.randint(1, 8),
+                                                             rng.randint(1, 8), rng.randint(1, 8),
+                                                             rng.randrange(9)])
+
+        # Relationship row: values at +target, types at +0x64+target
+        rel_base = 0x299F0 + i * 0x100
+        for target in range(slots):
+            if target != i and rng.random() < density:
+                data[rel_base + target] = rng.randint(1, 255)
+                data[rel_base + 0x64 + target] = rng.randint(1, 12)
+
+        # The CFSD block goes in last: in JP saves it overlaps the EU-style profile offsets
+        cfsd_offset = (0x1C40 + i * 0x590) if jp else (0x1C70 + i * 0x660)
+        data[cfsd_offset:cfsd_offset + 0x60] = make_cfsd(rng, name)
+
+    return bytes(data)
+
+
+def write_save(path, slots: int = MAX_SLOTS, region: str = "EU", seed: int = 0, density: float = 0.8) -> Path:
+    """Write a synthetic save to path, returns the path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(generate_save(slots, region, seed, density))
+    return path
+
+
+def _usage(error: str = ""):
+    if error:
+        print(f"✗ {error}")
+    print(__doc__.strip().splitlines()[-1])
+    sys.exit(1)
+
+
+def main():
+    argv = sys.argv[1:]
+    seed = pop_option(argv, "--seed", "0")
+    density = pop_option(argv, "--density", "0.8")
+    # -h/--help and unknown options land here too, rather than becoming the output file
+    if not argv or len(argv) > 3 or any(arg.startswith('-') for arg in argv):
+        _usage()
+    try:
+        seed, density = int(seed), float(density)
+        slots = int(argv[1]) if len(argv) > 1 else MAX_SLOTS
+    except ValueError as e:
+        _usage(str(e))
+    region = argv[2].upper() if len(argv) > 2 else "EU"
+    if not 1 <= slots <= MAX_SLOTS:
+        _usage(f"slots must be between 1 and {MAX_SLOTS}, not {slots}")
+    if region not in REGIONS:
+        _usage(f"unknown region {argv[2]} (use {', '.join(REGIONS)})")
+    if not 0 <= density <= 1:
+        _usage(f"density must be between 0 and 1, not {density}")
+    path = write_save(argv[0], slots, region, seed, density)
+    print(f"✓ Wrote {region} save with {slots} Miis to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal so interrupted batch runs can resume.
+
+Each completed unit of work (save, Mii, stage) is appended as one JSON line
+together with the SHA-256 of every output file it produced. A run without
+resume ignores earlier entries. On resume a unit only counts as done if all
+of its outputs still exist with the same hashes; anything else is redone.
+Once a save is finished (and when the journal is closed) the file is
+rewritten with only the latest entry of each unit of that save, so it does
+not grow with every run.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+from compact_profile import COMPACT, rehydrate_mii
+
+JOURNAL_NAME = "_journal.jsonl"
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_id(save_file: Union[str, Path]) -> str:
+    """Identify a save by its contents, so a changed save is never resumed from stale outputs"""
+    return file_hash(save_file)[:16]
+
+
+class CheckpointJournal:
+    def __init__(self, path: Union[str, Path], resume: bool = False):
+        self.path = Path(path)
+        self.base = self.path.parent
+        self.units = {}  # (save, mii, stage) -> {relative output path: sha256}
+        self._entries = {}  # (save, mii, stage) -> latest journal line, kept for compact()
+        self._recorded = set()  # saves recorded by this run
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self._load(resume)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self, resume: bool):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                # Later entries win, so a unit redone by a later run replaces the old record
+                key = (entry['save'], entry['mii'], entry['stage'])
+                self._entries[key] = entry
+                if resume:
+                    self.units[key] = entry['outputs']
+
+    def is_done(self, save: str, mii: int, stage: str) -> bool:
+        """True if the unit was completed and all of its outputs are still intact"""
+        outputs = self.units.get((save, mii, stage))
+        if outputs is None:
+            return False
+        for relative, digest in outputs.items():
+            path = self.base / relative
+            if not path.exists() or file_hash(path) != digest:
+                return False
+        return True
+
+    def outputs(self, save: str, mii: int, stage: str) -> List[Path]:
+        """Output files recorded for a unit"""
+        return [self.base / relative for relative in self.units.get((save, mii, stage), {})]
+
+    def record(self, save: str, mii: int, stage: str, outputs: List[Path]):
+        """Append a completed unit and make sure it reaches the disk"""
+        hashes = {}
+        for path in outputs:
+            path = Path(path).resolve()
+            try:
+                relative = str(path.relative_to(self.base.resolve()))
+            except ValueError:
+                relative = str(path)
+            hashes[relative] = file_hash(path)
+        entry = {'save': save, 'mii': mii, 'stage': stage, 'outputs': hashes,
+                 'time': datetime.now().isoformat()}
+        with self._lock:
+            self.units[(save, mii, stage)] = hashes
+            self._entries[(save, mii, stage)] = entry
+            self._recorded.add(save)
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def compact(self, saves: Set[str]):
+        """
+        Rewrite the journal with one line per unit of the given saves and forget all other saves.
+        Called once a save is finished: the output folder now holds that save's files, so
+        entries of other saves (and older entries of the same unit) are dead weight.
+        """
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items() if key[0] in saves}
+            self.units = {key: outputs for key, outputs in self.units.items() if key[0] in saves}
+            self._file.close()
+            temp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Compact the journal down to the saves this run recorded, then close it"""
+        if self._recorded:
+            self.compact(self._recorded)
+        self._file.close()
+
+
+def load_mii_json(path: Path, lookup_tables: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Read back a per-Mii JSON file written by the extractor, without the save metadata.
+    Compact files are rehydrated with lookup_tables (None if no tables are given).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for key in ('region', 'save_file_path', 'save_file_size'):
+        data.pop(key, None)
+    if data.get('output_profile') == COMPACT:
+        if lookup_tables is None:
+            return None
+        data = rehydrate_mii(data, lookup_tables)
+    return data
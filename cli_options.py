@@ -0,0 +1,40 @@
+"""
+Tiny helpers for the optional --flags accepted by the command-line scripts.
+The scripts keep their positional arguments; flags are pulled out of argv first,
+and find_saves turns the remaining save files and folders into a list of saves.
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+
+def pop_flag(argv: List[str], name: str) -> bool:
+    """Remove a boolean --flag from argv, returns whether it was present"""
+    if name in argv:
+        argv.remove(name)
+        return True
+    return False
+
+
+def pop_option(argv: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Remove '--name value' or '--name=value' from argv, returns the value (or default)"""
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        if arg.startswith(name + "="):
+            del argv[i]
+            return arg[len(name) + 1:]
+    return default
+
+
+def find_saves(paths: List[str]) -> List[Path]:
+    """Expand folders into the save files they contain"""
+    saves = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            saves.extend(sorted(list(path.glob("*.txt")) + list(path.glob("*.sav"))))
+        else:
+            saves.append(path)
+    return saves
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compact output profile and the loader that turns it back into the verbose form.
+
+The compact profile leaves out every string that can be derived from an ID:
+relationship type names and target names, food names and the favorite color
+name (plus the duplicated top-level personality_type). Relationships become
+[value, type] pairs and food slots plain IDs. The ID -> name tables are written
+once per save into _summary.json under 'lookup_tables'; rehydrate_mii() uses
+them to rebuild exactly the verbose data.
+
+Usage: python compact_profile.py <compact_output_folder> [verbose_output_folder]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+COMPACT = 'compact'
+
+FOOD_GROUPS = ('all_time_favorites', 'current_favorites', 'worst_foods')
+
+
+def compact_mii(mii_data: Dict) -> Dict:
+    """Compact form of one Mii's data (IDs only, names come from the lookup tables)"""
+    compact = {'output_profile': COMPACT}
+    for key, value in mii_data.items():
+        if key == 'personality_type':
+            continue
+        if key == 'profile':
+            value = {k: v for k, v in value.items() if k != 'favorite_color_name'}
+        elif key == 'food_preferences':
+            value = {group: ({slot: entry['id'] for slot, entry in slots.items()} if group in FOOD_GROUPS else slots)
+                     for group, slots in value.items()}
+        elif key == 'relationships':
+            value = {target: [rel['value'], rel['type']] for target, rel in value.items()}
+        compact[key] = value
+    return compact
+
+
+def _name(table: Dict, key: int, default: str) -> str:
+    # Tables read back from JSON have string keys, tables straight from the extractor int keys
+    return table.get(str(key), table.get(key, default))
+
+
+def rehydrate_mii(mii_data: Dict, tables: Dict) -> Dict:
+    """Rebuild the verbose form of a compact Mii (same keys, same order as the extractor writes)"""
+    if mii_data.get('output_profile') != COMPACT:
+        return mii_data
+    food_ids = tables['food_ids']
+    verbose = {}
+    for key, value in mii_data.items():
+        if key == 'output_profile':
+            continue
+        if key == 'profile':
+            profile = {}
+            for k, v in value.items():
+                profile[k] = v
+                if k == 'favorite_color':
+                    profile['favorite_color_name'] = _name(tables['favorite_colors'], v, f"Unknown ({v})")
+            value = profile
+        elif key == 'food_preferences':
+            value = {group: ({slot: {'id': food_id, 'name': _name(food_ids, food_id, f"Unknown ({food_id})")}
+                              for slot, food_id in slots.items()} if group in FOOD_GROUPS else slots)
+                     for group, slots in value.items()}
+        elif key == 'relationships':
+            value = {target: {'value': rel_value,
+                              'type': rel_type,
+                              'type_name': _name(tables['relationship_types'], rel_type, f"Unknown ({rel_type})"),
+                              'target_name': _name(tables['mii_names'], int(target), f"Mii {target}")}
+                     for target, (rel_value, rel_type) in value.items()}
+        verbose[key] = value
+        if key == 'relationships' and 'personality' in mii_data:
+            verbose['personality_type'] = mii_data['personality'].get('type')
+    return verbose
+
+
+def load_summary(summary_file: Union[str, Path]) -> Dict:
+    """Read a _summary.json (the lookup tables of a compact output are under 'lookup_tables')"""
+    with open(summary_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_mii(json_file: Union[str, Path], tables: Optional[Dict] = None) -> Dict:
+    """
+    Load one per-Mii JSON file in its verbose form, whichever profile it was written with.
+    Without tables, the lookup tables are read from the _summary.json next to the Mii folders.
+    """
+    json_file = Path(json_file)
+    with open(json_file, 'r', encoding='utf-8') as f:
+        mii_data = json.load(f)
+    if mii_data.get('output_profile') != COMPACT:
+        return mii_data
+    if tables is None:
+        tables = load_summary(json_file.parent.parent / "_summary.json")['lookup_tables']
+    return rehydrate_mii(mii_data, tables)
+
+
+def main():
+    import json_output  # load_mii() needs only json, so the encoder is imported here
+
+    if len(sys.argv) < 2:
+        print("Usage: python compact_profile.py <compact_output_folder> [verbose_output_folder]")
+        print("  Rewrites the per-Mii JSON files of a --compact extraction in the verbose form")
+        print("  (in place unless a separate output folder is given)")
+        sys.exit(1)
+
+    source = Path(sys.argv[1])
+    target = Path(sys.argv[2]) if len(sys.argv) > 2 else source
+    summary = load_summary(source / "_summary.json")
+    tables = summary.pop('lookup_tables', None)
+    if summary.pop('output_profile', None) != COMPACT or tables is None:
+        print(f"✗ {source} is not a compact extraction (no lookup tables in _summary.json)")
+        sys.exit(1)
+
+    total_size = 0
+    for entry in summary['miis'].values():
+        mii_data = load_mii(source / entry['filename'], tables)
+        (target / entry['filename']).parent.mkdir(parents=True, exist_ok=True)
+        total_size += json_output.dump(mii_data, target / entry['filename'])
+    summary['total_json_size'] = total_size
+    json_output.dump(summary, target / "_summary.json")
+    print(f"✓ Rehydrated {len(summary['miis'])} Miis into {target} ({total_size:,} bytes of JSON)")
+
+
+if __name__ == "__main__":
+    main()
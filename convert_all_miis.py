@@ -5,22 +5,32 @@ Convert all Tomodachi Life Miis to Mii Studio format and download render images
 
 import sys
 import json
-import subprocess
 import re
-import requests
+import threading
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Tuple
 
-# Add parent directory to path to import mii2studio modules
-sys.path.insert(0, str(Path(__file__).parent.parent / "mii2studio"))
+import profiling
+from checkpoint_journal import JOURNAL_NAME, CheckpointJournal, save_id
+from cli_options import pop_flag, pop_option
+from extract_full_mii_data import CompleteMiiExtractor
+from fetch_scheduler import DEFAULT_RATE, DEFAULT_RETRIES
+from render_cache import DEFAULT_MAX_BYTES, RenderCache
+from render_downloader import DEFAULT_CONCURRENCY, RenderDownloader
+
+# mii2studio sits next to this script (older layouts had it one level up)
+MII2STUDIO_DIR = Path(__file__).parent / "mii2studio"
+if not MII2STUDIO_DIR.exists():
+    MII2STUDIO_DIR = Path(__file__).parent.parent / "mii2studio"
+sys.path.insert(0, str(MII2STUDIO_DIR))
+
+from mii2studio import render_urls
+from studio_plan import get_plan
 
 
 def get_mii_offset(mii_index: int, region: str = "EU") -> int:
-    """Get the offset for a Mii in the save file"""
-    if region == "JP":
-        return 0x1C40 + (mii_index * 0x590)
-    else:
-        return 0x1C70 + (mii_index * 0x660)
+    """Get the offset for a Mii in the save file (the extractor owns the save layout)"""
+    return CompleteMiiExtractor("", region).get_cfsd_offset(mii_index)
 
 
 def extract_mii_raw(save_file: str, mii_index: int, region: str = "EU") -> bytes:
@@ -37,83 +47,63 @@ def extract_mii_raw(save_file: str, mii_index: int, region: str = "EU") -> bytes
     return mii_data
 
 
-def convert_mii_to_studio(mii_data: bytes, output_file: str) -> Tuple[Optional[str], Optional[str]]:
+def convert_mii_data(mii_data: bytes) -> Tuple[bytes, str, str]:
     """
-    Convert Mii data to Mii Studio format and return Face and Body URLs
-    Returns: (face_url, body_url)
+    Convert a raw 3DS Mii block to Mii Studio data in-process
+    Returns: (studio_data, face_url, body_url)
     """
-    # Save temporary Mii file
-    temp_mii_file = Path(output_file).parent / "temp_mii.cfsd"
-    with open(temp_mii_file, 'wb') as f:
-        f.write(mii_data)
-    
-    try:
-        # Run mii2studio conversion
-        mii2studio_path = Path(__file__).parent.parent / "mii2studio" / "mii2studio.py"
-        
-        result = subprocess.run(
-            [sys.executable, str(mii2studio_path), str(temp_mii_file), output_file, "3ds"],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
-        if result.returncode != 0:
-            print(f"  ✗ Conversion failed: {result.stderr}")
-            return None, None
-        
-        # Parse output to extract URLs
-        output = result.stdout
-        face_url = None
-        body_url = None
-        
-        # Look for "Face: " and "Body: " lines
-        for line in output.split('\n'):
-            if line.startswith('Face: '):
-                face_url = line.replace('Face: ', '').strip()
-            elif line.startswith('Body: '):
-                body_url = line.replace('Body: ', '').strip()
-        
-        return face_url, body_url
-    
-    finally:
-        # Clean up temporary file
-        if temp_mii_file.exists():
-            temp_mii_file.unlink()
+    studio_data = get_plan("3ds").convert_cfsd(mii_data)
+    urls = render_urls(studio_data)
+    return studio_data, urls["face"], urls["body"]
+
+
+_downloader = None
 
 
 def download_image(url: str, output_path: Path) -> bool:
-    """Download an image from URL and save to file"""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        
-        return True
-    except Exception as e:
-        print(f"    ✗ Failed to download {output_path.name}: {e}")
-        return False
+    """Download an image from URL and save to file (reuses one pooled session)"""
+    global _downloader
+    if _downloader is None:
+        _downloader = RenderDownloader()
+    return _downloader.download(url, output_path)
 
 
 def main():
     script_dir = Path(__file__).parent
+    argv = sys.argv[1:]
+    concurrency = int(pop_option(argv, "--concurrency", str(DEFAULT_CONCURRENCY)))
+    cache_dir = Path(pop_option(argv, "--cache-dir", str(script_dir / ".render_cache")))
+    cache_max_mb = int(pop_option(argv, "--cache-max-mb", str(DEFAULT_MAX_BYTES // (1024 * 1024))))
+    use_cache = not pop_flag(argv, "--no-cache")
+    rate = float(pop_option(argv, "--rate", str(DEFAULT_RATE)))
+    max_retries = int(pop_option(argv, "--retries", str(DEFAULT_RETRIES)))
+    fetch_stats_file = pop_option(argv, "--fetch-stats")
+    resume = pop_flag(argv, "--resume")
 
     # Argument handling:
     # - 0 args: auto-detect save file in ./SaveFile (fallback ../SaveFile), output to ./extracted_miis, region EU
     # - 1+ args: keep backward compatibility (save_file, extracted_miis_folder, [region])
-    if len(sys.argv) < 3:
+    if len(argv) < 2:
         # Auto-detect SaveFile
         save_dir = script_dir / "SaveFile"
         if not save_dir.exists():
             save_dir = script_dir.parent / "SaveFile"
         save_files = list(save_dir.glob("*.txt")) + list(save_dir.glob("*.sav"))
         if not save_files:
-            print("Usage: python convert_all_miis.py <save_file> <extracted_miis_folder> [region]")
+            print("Usage: python convert_all_miis.py <save_file> <extracted_miis_folder> [region] [--concurrency N]")
             print("  save_file: Path to Tomodachi Life save file")
             print("  extracted_miis_folder: Path to extracted_miis folder")
             print("  region: Optional - EU, US, JP, or KR (default: EU)")
+            print(f"  --concurrency: Optional - Parallel image downloads (default: {DEFAULT_CONCURRENCY})")
+            print("  --cache-dir: Optional - Render cache folder (default: .render_cache next to this script)")
+            print(f"  --cache-max-mb: Optional - Render cache size limit in MB (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})")
+            print("  --no-cache: Optional - Always download renders")
+            print(f"  --rate: Optional - Max render requests per second, 0 = unlimited (default: {DEFAULT_RATE:g})")
+            print(f"  --retries: Optional - Retries per render on 429/5xx/network errors (default: {DEFAULT_RETRIES})")
+            print("  --fetch-stats: Optional - Write download counters and latency histogram to this JSON file")
+            print("  --resume: Optional - Skip Miis already converted and rendered by an interrupted run")
+            print("  --profile-out: Optional - Profile the run and write the pstats to this file")
+            print("  --trace-memory: Optional - Report peak memory and top allocation sites per stage (tracemalloc)")
             print("\nAuto-detect failed: place your save in:")
             print(f"  {save_dir}")
             sys.exit(1)
@@ -121,9 +111,9 @@ def main():
         extracted_miis_folder = script_dir / "extracted_miis"
         region = "EU"
     else:
-        save_file = sys.argv[1]
-        extracted_miis_folder = Path(sys.argv[2])
-        region = sys.argv[3] if len(sys.argv) > 3 else "EU"
+        save_file = argv[0]
+        extracted_miis_folder = Path(argv[1])
+        region = argv[2] if len(argv) > 2 else "EU"
 
     if not Path(save_file).exists():
         print(f"Error: Save file not found: {save_file}")
@@ -148,14 +138,26 @@ def main():
     print(f"Region: {region}")
     print(f"Total Miis: {summary['total_miis']}\n")
     
+    # Completed Miis are journaled so an interrupted run can resume
+    journal = CheckpointJournal(extracted_miis_folder / JOURNAL_NAME, resume)
+    save = save_id(save_file)
+    
     # Process each Mii
     success_count = 0
     fail_count = 0
+    skipped_count = 0
+    downloads = []  # (mii_index, nickname, face_url, body_url, face_file, body_file, mnms_file)
+    profiling.stage('convert')
     
     for mii_id, mii_info in summary['miis'].items():
         mii_index = mii_info['index']
         nickname = mii_info['nickname']
         
+        if resume and journal.is_done(save, mii_index, 'render'):
+            skipped_count += 1
+            success_count += 1
+            continue
+        
         print(f"Processing Mii {mii_index} ({nickname})...")
         
         # Get Mii's folder
@@ -177,30 +179,70 @@ def main():
             fail_count += 1
             continue
         
-        # Convert to Mii Studio format
+        # Convert to Mii Studio format (the URLs of an already converted Mii come from its .mnms)
         output_file = mii_folder / f"{safe_nickname.lower()}.mnms"
-        face_url, body_url = convert_mii_to_studio(mii_data, str(output_file))
-        
-        if face_url is None or body_url is None:
-            print(f"  ✗ Conversion failed")
-            fail_count += 1
-            continue
-        
-        print(f"  ✓ Converted to: {output_file.name}")
-        
-        # Download images
-        face_file = mii_folder / "face.png"
-        body_file = mii_folder / "body.png"
-        
-        print(f"  Downloading images...")
-        face_success = download_image(face_url, face_file)
-        body_success = download_image(body_url, body_file)
+        if resume and journal.is_done(save, mii_index, 'convert'):
+            urls = render_urls(output_file.read_bytes())
+            face_url, body_url = urls["face"], urls["body"]
+            print(f"  ✓ Already converted: {output_file.name}")
+        else:
+            try:
+                studio_data, face_url, body_url = convert_mii_data(mii_data)
+                output_file.write_bytes(studio_data)
+            except Exception as e:
+                print(f"  ✗ Conversion failed: {e}")
+                fail_count += 1
+                continue
+            
+            journal.record(save, mii_index, 'convert', [output_file])
+            print(f"  ✓ Converted to: {output_file.name}")
+        downloads.append((mii_index, nickname, face_url, body_url, mii_folder / "face.png", mii_folder / "body.png", output_file))
+    
+    # Download all images at once over a shared session
+    profiling.stage('download')
+    jobs = []
+    for _, _, face_url, body_url, face_file, body_file, _ in downloads:
+        jobs.append((face_url, face_file))
+        jobs.append((body_url, body_file))
+    
+    # A Mii is journaled as rendered as soon as both of its images are in place
+    pending = {}
+    pending_lock = threading.Lock()
+    for mii_index, _, _, _, face_file, body_file, mnms_file in downloads:
+        entry = {'mii_index': mii_index, 'files': [mnms_file, face_file, body_file], 'left': 2}
+        pending[face_file] = pending[body_file] = entry
+    
+    def on_done(path: Path, ok: bool):
+        entry = pending[path]
+        with pending_lock:
+            entry['left'] = entry['left'] - 1 if ok else -1
+            finished = entry['left'] == 0
+        if finished:
+            journal.record(save, entry['mii_index'], 'render', entry['files'])
+    
+    cache = RenderCache(cache_dir, cache_max_mb * 1024 * 1024) if use_cache else None
+    print(f"\nDownloading {len(jobs)} images ({concurrency} at a time)...")
+    with RenderDownloader(concurrency, cache=cache, rate=rate, max_retries=max_retries) as downloader:
+        results = downloader.download_all(jobs, on_done=on_done)
+    journal.close()
+    stats = downloader.stats.to_dict()
+    print(f"  Requests: {stats['attempts']} ({stats['retries']} retries), "
+          f"{stats['bytes'] / 1024:.1f} KB downloaded, {stats['failures']} failed")
+    if fetch_stats_file:
+        with open(fetch_stats_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+    if cache is not None:
+        print(f"  Render cache: {cache.hits} hits, {cache.misses} downloads ({cache.total_bytes / (1024 * 1024):.1f} MB cached)")
+    
+    for mii_index, nickname, _, _, face_file, body_file, _ in downloads:
+        face_success = results[face_file]
+        body_success = results[body_file]
         
         if face_success and body_success:
-            print(f"  ✓ Downloaded face.png and body.png")
+            print(f"  ✓ Mii {mii_index} ({nickname}): downloaded face.png and body.png")
             success_count += 1
         else:
-            print(f"  ⚠ Some images failed to download")
+            print(f"  ⚠ Mii {mii_index} ({nickname}): some images failed to download")
             if face_success or body_success:
                 success_count += 1  # Partial success
             else:
@@ -211,9 +253,11 @@ def main():
     print("=" * 60)
     print(f"Successfully converted: {success_count}")
     print(f"Failed: {fail_count}")
+    if skipped_count:
+        print(f"Skipped (already done): {skipped_count}")
     print(f"Total: {summary['total_miis']}")
 
 
 if __name__ == "__main__":
-    main()
+    profiling.run_main(main)
 
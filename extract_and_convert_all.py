@@ -5,13 +5,74 @@ Extracts all Mii data and converts to Mii Studio format in one go
 """
 
 import sys
-import subprocess
+import time
 from pathlib import Path
+from typing import Callable
+
+import profiling
+from checkpoint_journal import JOURNAL_NAME, CheckpointJournal
+from cli_options import pop_flag, pop_option
+from mii_store import MiiStore
+from output_backend import ARCHIVE_FORMATS
+from pipeline import run_pipeline
+from render_cache import RenderCache
+from render_downloader import DEFAULT_CONCURRENCY
+from save_watcher import SaveSnapshot, SaveWatcher
+
+
+def watch_saves(save_file_dir: Path, snapshot: SaveSnapshot, region: str, max_miis: int,
+                process: Callable, poll: bool = False):
+    """Process every save that lands in save_file_dir again, redoing only the Miis that changed"""
+    with SaveWatcher(save_file_dir, poll=poll) as watcher:
+        print(f"\nWatching {save_file_dir} for updated saves ({watcher.method}), Ctrl+C to stop")
+        try:
+            for save_file in watcher.changes():
+                started = time.perf_counter()
+                try:
+                    current = SaveSnapshot(save_file, region, max_miis)
+                except OSError as e:
+                    print(f"\n✗ Could not read {save_file.name}: {e}")
+                    continue
+                if current.save == snapshot.save:
+                    print(f"\n✓ {save_file.name} written again without changes, nothing to do")
+                    continue
+                unchanged = current.unchanged_since(snapshot)
+                print("\n" + "=" * 70)
+                print(f"{save_file.name} changed: redoing {max_miis - len(unchanged)} of {max_miis} Mii slots")
+                print("=" * 70)
+                try:
+                    process(save_file, (snapshot.save, unchanged))
+                except Exception as e:
+                    print(f"\n✗ Pipeline failed: {e}")
+                    continue
+                snapshot = current
+                print(f"✓ Outputs updated in {time.perf_counter() - started:.2f}s")
+        except KeyboardInterrupt:
+            print("\nStopped watching")
 
 
 def main():
     # Get script directory and SaveFile folder
     script_dir = Path(__file__).parent
+    argv = sys.argv[1:]
+    concurrency = int(pop_option(argv, "--concurrency", str(DEFAULT_CONCURRENCY)))
+    use_cache = not pop_flag(argv, "--no-cache")
+    use_store = not pop_flag(argv, "--no-store")
+    resume = pop_flag(argv, "--resume")
+    archive_format = pop_option(argv, "--archive", None)
+    pretty = not pop_flag(argv, "--minify")
+    compact = pop_flag(argv, "--compact")
+    watch = pop_flag(argv, "--watch")
+    poll = pop_flag(argv, "--poll")
+    if archive_format is not None and archive_format not in ARCHIVE_FORMATS:
+        print(f"✗ Unknown archive format: {archive_format} (use {', '.join(ARCHIVE_FORMATS)})")
+        sys.exit(1)
+    if archive_format is not None and resume:
+        print("✗ --resume only works with the default folder output, not with --archive")
+        sys.exit(1)
+    if archive_format is not None and watch:
+        print("✗ --watch only works with the default folder output, not with --archive")
+        sys.exit(1)
     
     # Prefer SaveFile in the same directory as this script; fallback to parent for robustness
     save_file_dir = script_dir / "SaveFile"
@@ -39,11 +100,8 @@ def main():
         print()
     
     save_file = save_files[0]
-    region = sys.argv[1] if len(sys.argv) > 1 else "EU"
-    max_miis = sys.argv[2] if len(sys.argv) > 2 else "100"
-    
-    extract_script = script_dir / "extract_full_mii_data.py"
-    convert_script = script_dir / "convert_all_miis.py"
+    region = argv[0] if len(argv) > 0 else "EU"
+    max_miis = int(argv[1]) if len(argv) > 1 else 100
     
     # Determine output folder (extracted_miis will be created in script_dir)
     output_folder = script_dir / "extracted_miis"
@@ -53,54 +111,44 @@ def main():
     print("=" * 70)
     print(f"Save file: {save_file.name} (from SaveFile folder)")
     print(f"Region: {region}")
-    print(f"Output folder: {output_folder}\n")
+    if archive_format is not None:
+        print(f"Output archive: {output_folder}{ARCHIVE_FORMATS[archive_format]}\n")
+    else:
+        print(f"Output folder: {output_folder}\n")
     
-    # Step 1: Extract all Mii data
+    # Extract, convert and download in one streaming pass: each Mii moves on
+    # to conversion and rendering as soon as it has been decoded
     print("=" * 70)
-    print("STEP 1: Extracting Mii Data")
+    print("Extracting Mii Data and Converting to Mii Studio Format")
     print("=" * 70)
     print()
     
-    extract_cmd = [
-        sys.executable,
-        str(extract_script),
-        str(save_file),
-        "all",
-        region,
-        max_miis
-    ]
-    
-    extract_result = subprocess.run(extract_cmd, cwd=str(script_dir))
-    
-    if extract_result.returncode != 0:
-        print("\n✗ Extraction failed!")
-        sys.exit(1)
-    
-    print("\n✓ Extraction complete!\n")
-    
-    # Step 2: Convert all Miis to Mii Studio format
-    print("=" * 70)
-    print("STEP 2: Converting to Mii Studio Format")
-    print("=" * 70)
-    print()
-    
-    convert_cmd = [
-        sys.executable,
-        str(convert_script),
-        str(save_file),
-        str(output_folder),
-        region
-    ]
-    
-    convert_result = subprocess.run(convert_cmd, cwd=str(script_dir))
-    
-    if convert_result.returncode != 0:
-        print("\n✗ Conversion failed!")
+    cache = RenderCache(script_dir / ".render_cache") if use_cache else None
+    store = MiiStore(script_dir / ".mii_store") if use_store else None
+    journal = CheckpointJournal(output_folder / JOURNAL_NAME, resume) if archive_format is None else None
+
+    def process(save, previous=None):
+        run_pipeline(str(save), output_folder, region, max_miis, concurrency, cache,
+                     journal=journal, resume=resume and previous is None, archive_format=archive_format,
+                     pretty=pretty, compact=compact, previous=previous, store=store)
+
+    snapshot = SaveSnapshot(save_file, region, max_miis) if watch else None
+    try:
+        process(save_file)
+    except Exception as e:
+        print(f"\n✗ Pipeline failed: {e}")
         sys.exit(1)
+    finally:
+        if journal is not None and not watch:
+            journal.close()
     
     print("\n" + "=" * 70)
     print("✓ COMPLETE! All Miis extracted and converted!")
     print("=" * 70)
+    if archive_format is not None:
+        print(f"\nOutput archive: {output_folder}{ARCHIVE_FORMATS[archive_format]}")
+        print("\nThe archive holds one folder per Mii plus _summary.json")
+        return
     print(f"\nOutput folder: {output_folder}")
     print("\nEach Mii folder contains:")
     print("  - [name].json - Complete Mii data")
@@ -109,7 +157,13 @@ def main():
     print("  - body.png - Body render image")
     print("  - _summary.json - Overview of all Miis")
 
+    if watch:
+        try:
+            watch_saves(save_file_dir, snapshot, region, max_miis, process, poll)
+        finally:
+            journal.close()
+
 
 if __name__ == "__main__":
-    main()
+    profiling.run_main(main)
 
@@ -9,7 +9,23 @@ import struct
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import json_output
+import profiling
+from checkpoint_journal import JOURNAL_NAME, CheckpointJournal, load_mii_json, save_id
+from cli_options import pop_flag, pop_option
+from compact_profile import COMPACT, compact_mii
+from timings import Timings, no_lap, no_section, timings_from_env
+
+# studio_plan sits in mii2studio next to this script (set up here too, convert_all_miis pulls in the downloader)
+MII2STUDIO_DIR = Path(__file__).parent / "mii2studio"
+if not MII2STUDIO_DIR.exists():
+    MII2STUDIO_DIR = Path(__file__).parent.parent / "mii2studio"
+if str(MII2STUDIO_DIR) not in sys.path:
+    sys.path.insert(0, str(MII2STUDIO_DIR))
+
+from studio_plan import STUDIO_FIELDS, encode_studio_data, get_plan
 
 # Relationship type mappings
 RELATIONSHIP_TYPES = {
@@ -127,11 +143,21 @@ for food_id in range(len(FOOD_NAMES)):
 FOOD_IDS[0] = "Nothing"
 FOOD_IDS[65535] = "Nothing"
 
+# Low-level readers that are counted and timed when timings are enabled
+READ_HELPERS = ('_read_byte', '_read_uint16', '_read_uint32', '_read_unicode_string', '_read_hex_string')
+
 class CompleteMiiExtractor:
-    def __init__(self, file_path: str, region: Optional[str] = None):
+    def __init__(self, file_path: str, region: Optional[str] = None, timings: Optional[Timings] = None):
         self.file_path = Path(file_path)
         self.region = region or "EU"  # Default to EU/US/KR
         self.data = None
+        self._mii_names = (None, {})  # (data they were read from, names)
+        # Optional per-section / per-helper instrumentation; when off, _lap is an empty function
+        self.timings = timings
+        self._lap = timings.lap if timings is not None else no_lap
+        if timings is not None:
+            for helper in READ_HELPERS:
+                setattr(self, helper, timings.wrap(helper, getattr(self, helper)))
         
     def read_file(self):
         """Read the save file into memory"""
@@ -199,6 +225,18 @@ class CompleteMiiExtractor:
         # Each mii block is 0x660 bytes
         return 0x1C8A + (mii_index * 0x660)
     
+    def get_food_offset(self, mii_index: int) -> int:
+        """Get the offset of a mii's food IDs (EU/US/KR estimated, JP documented)"""
+        if self.region in ['EU', 'US', 'KR']:
+            return self.get_base_offset(mii_index) + 0x5D0 + (mii_index * 0x660)
+        return 0x2198 + (mii_index * 0x590)
+    
+    def get_cfsd_offset(self, mii_index: int) -> int:
+        """Get the offset of a mii's 0x60 CFSD block (convert_all_miis.get_mii_offset and save_diff use this too)"""
+        if self.region == "JP":
+            return 0x1C40 + (mii_index * 0x590)
+        return 0x1C70 + (mii_index * 0x660)
+    
     def calculate_personality_type(self, traits: Dict[str, int]) -> str:
         """
         Calculate personality type from trait values using the official Tomodachi Life grid chart.
@@ -321,30 +359,41 @@ class CompleteMiiExtractor:
             else:  # horizontal >= 12
                 return "Confident Go-getter"
     
-    def extract_single_mii(self, mii_index: int) -> Dict:
-        """Extract ALL data for a single Mii"""
+    def read_mii_names(self) -> Dict[int, str]:
+        """Nicknames of all named Mii slots, used as relationship target names (read once per save)"""
+        if self._mii_names[0] is not self.data:
+            mii_names = {}
+            for i in range(100):
+                try:
+                    name_offset = 0x1C8A + (i * 0x660)
+                    name = self._read_unicode_string(name_offset, 10)
+                    if name and name.strip():
+                        mii_names[i] = name
+                except:
+                    pass
+            self._mii_names = (self.data, mii_names)
+        return self._mii_names[1]
+    
+    def lookup_tables(self) -> Dict:
+        """ID -> name tables for the compact output profile (stored once per save in the summary)"""
         if not self.data:
             self.read_file()
-        
-        base = self.get_base_offset(mii_index)
-        
-        result = {
-            'mii_index': mii_index,
-            'profile': {},
-            'status': {},
-            'personality': {},
-            'relationships': {},
-            'personality_type': None,
-            'total_size': 0  # Will be calculated after extraction
+        return {
+            'relationship_types': RELATIONSHIP_TYPES,
+            'food_ids': FOOD_IDS,
+            'favorite_colors': FAVORITE_COLORS,
+            'mii_names': self.read_mii_names()
         }
-        
+    
+    def read_profile(self, mii_index: int) -> Dict:
+        """Names, creator, colors, sharing flags, IDs and islands of a Mii"""
         # ===== PROFILE DATA =====
         # Offsets from TLSE_miiprofile.vb (EU/US/KR)
         # Base: 0x1C8A for mii 0, each mii is 0x660 bytes apart
-        profile_base = base  # 0x1C8A for mii 0
+        profile_base = self.get_base_offset(mii_index)  # 0x1C8A for mii 0
         
         # Calculate relative offsets from profile_base (0x1C8A for mii 0)
-        result['profile'] = {
+        return {
             'nickname': self._read_unicode_string(profile_base, 10),
             'firstname': self._read_unicode_string(profile_base + 0x46, 15),  # 0x1CD0 - 0x1C8A = 0x46
             'lastname': self._read_unicode_string(profile_base + 0x66, 15),    # 0x1CF0 - 0x1C8A = 0x66
@@ -368,13 +417,27 @@ class CompleteMiiExtractor:
             'origin_island': self._read_byte(profile_base + 0xCE),            # 0x1D58 - 0x1C8A = 0xCE
             'actual_island': self._read_byte(profile_base + 0xBE)             # 0x1D48 - 0x1C8A = 0xBE
         }
-        
+    
+    def read_appearance(self, mii_index: int) -> Dict:
+        """Mii Studio appearance fields decoded from the Mii's 0x60 CFSD block, with its Studio data and render code"""
+        offset = self.get_cfsd_offset(mii_index)
+        # Padded like graph_export/relationship_graph, so a save cut short still yields the rest of the Mii
+        studio_data = get_plan("3ds").convert_cfsd(self.data[offset:offset + 0x60].ljust(0x60, b'\0'))
+        return {
+            'studio_code': studio_data.hex(),  # contents of the .mnms file, as mii_service and appearance_index
+            'render_data': encode_studio_data(studio_data),  # obfuscated ?data= value of the render API
+            **dict(zip(STUDIO_FIELDS, studio_data))
+        }
+    
+    def read_status(self, mii_index: int) -> Dict:
+        """Level, experience, rankings, catchphrases and gestures of a Mii"""
         # ===== STATUS DATA =====
         # Offsets from TLSE_miistatus.vb (EU/US/KR), Else clause starting at line 2919
         # Base: 0x1C8A for mii 0, each mii is 0x660 bytes apart
         # Calculate relative offsets from profile_base (0x1C8A for mii 0)
         # Catchphrase order: 1=Regular, 2=Happy, 3=Sad, 4=Mad/Angry, 5=Worried
-        result['status'] = {
+        profile_base = self.get_base_offset(mii_index)
+        return {
             'level': self._read_byte(profile_base + 0x99),           # 0x1F23 - 0x1C8A = 0x99
             'experience': self._read_byte(profile_base + 0x98),      # 0x1F22 - 0x1C8A = 0x98
             'hair_color': self._read_byte(profile_base + 0x89),      # 0x1D13 - 0x1C8A = 0x89
@@ -395,7 +458,9 @@ class CompleteMiiExtractor:
                 'gesture_5': self._read_byte(profile_base + 0x90)    # 0x1F1A - 0x1C8A = 0x90
             }
         }
-        
+    
+    def read_food_preferences(self, mii_index: int) -> Dict:
+        """Favorite, current favorite and worst foods of a Mii, plus tummy and fullness"""
         # ===== FOOD PREFERENCES =====
         # Estimated EU offsets based on relative position from profile base
         # JP: Profile base=0x1C5A, Food base=0x2198, relative=0x53E
@@ -414,7 +479,7 @@ class CompleteMiiExtractor:
             # Estimated EU/US/KR offsets - found through pattern matching
             # Food data appears to be at profile_base + 0x5D0 for Mii 0
             # EU uses 0x660 spacing between miis
-            food_base_eu = profile_base + 0x5D0 + (mii_index * 0x660)
+            food_base_eu = self.get_food_offset(mii_index)
             
             # Read food IDs (all UInt16) - same relative pattern as JP
             allfav_1_id = self._read_uint16(food_base_eu + 0x0)  # Base
@@ -431,7 +496,7 @@ class CompleteMiiExtractor:
             fullness = self._read_byte(food_base_eu - 0x5)       # Estimated
         else:
             # JP offsets (documented)
-            food_base_jp = 0x2198 + (mii_index * 0x590)  # JP uses 0x590 spacing
+            food_base_jp = self.get_food_offset(mii_index)  # JP uses 0x590 spacing
             
             allfav_1_id = self._read_uint16(food_base_jp + 0x0)
             worst_2_id = self._read_uint16(food_base_jp + 0x2)
@@ -443,7 +508,7 @@ class CompleteMiiExtractor:
             checktummy = self._read_byte(food_base_jp - 0x26)
             fullness = self._read_byte(food_base_jp - 0x5)
         
-        result['food_preferences'] = {
+        return {
             'all_time_favorites': {
                 'favorite_1': {
                     'id': allfav_1_id,
@@ -481,7 +546,9 @@ class CompleteMiiExtractor:
             'checktummy': checktummy,
             'fullness': fullness
         }
-        
+    
+    def read_personality(self, mii_index: int) -> Dict:
+        """Personality sliders, voice settings and the resulting personality type of a Mii"""
         # ===== PERSONALITY DATA =====
         # Base offset for personality: 0x1D80 for mii 0
         personality_base = 0x1D80 + (mii_index * 0x660)
@@ -515,27 +582,20 @@ class CompleteMiiExtractor:
             'Intonation': self._read_byte(personality_base - 0x1)
         }
         
-        result['personality'] = {
+        return {
             'traits': personality_traits,
             'type': self.calculate_personality_type(personality_traits)
         }
-        result['personality_type'] = result['personality']['type']
-        
+    
+    def read_relationships(self, mii_index: int) -> Dict[int, Dict]:
+        """Non-empty relationships of a Mii, keyed by target Mii index"""
         # ===== RELATIONSHIPS =====
         # Extract relationships with all other miis
         relationships = {}
         rel_base = 0x299F0 + (mii_index * 0x100)
         
         # First, get all mii names for relationship display
-        mii_names = {}
-        for i in range(100):
-            try:
-                name_offset = 0x1C8A + (i * 0x660)
-                name = self._read_unicode_string(name_offset, 10)
-                if name and name.strip():
-                    mii_names[i] = name
-            except:
-                pass
+        mii_names = self.read_mii_names()
         
         # Extract relationships
         for target_mii in range(100):
@@ -557,30 +617,58 @@ class CompleteMiiExtractor:
             except:
                 continue
         
-        result['relationships'] = relationships
-        result['relationship_count'] = len(relationships)
+        return relationships
+    
+    def extract_single_mii(self, mii_index: int) -> Dict:
+        """Extract ALL data for a single Mii"""
+        if not self.data:
+            self.read_file()
+        
+        lap = self._lap  # no-op unless timings are enabled
+        lap()
+        
+        result = {
+            'mii_index': mii_index,
+            'profile': {},
+            'appearance': {},
+            'status': {},
+            'personality': {},
+            'relationships': {},
+            'personality_type': None,
+            'total_size': 0  # Will be calculated after extraction
+        }
+        
+        result['profile'] = self.read_profile(mii_index)
+        lap('profile')
+        result['appearance'] = self.read_appearance(mii_index)
+        lap('appearance')
+        result['status'] = self.read_status(mii_index)
+        lap('status')
+        result['food_preferences'] = self.read_food_preferences(mii_index)
+        lap('food')
+        result['personality'] = self.read_personality(mii_index)
+        result['personality_type'] = result['personality']['type']
+        lap('personality')
+        result['relationships'] = self.read_relationships(mii_index)
+        result['relationship_count'] = len(result['relationships'])
+        lap('relationships')
         
         # Calculate total size (approximate JSON size)
         json_str = json.dumps(result, ensure_ascii=False)
         result['total_size'] = len(json_str.encode('utf-8'))
+        lap('total_size (json)')
         
         return result
     
-    def extract_all_miis(self, max_miis: int = 100) -> Dict:
-        """Extract data for all Miis"""
+    def iter_miis(self, max_miis: int = 100,
+                  reuse: Optional[Callable[[int], Optional[Dict]]] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Yield (mii_index, data) for every occupied Mii slot, one Mii at a time.
+        reuse(mii_index) may return previously extracted data to skip decoding that Mii.
+        """
         if not self.data:
             self.read_file()
         
-        print(f"Extracting data for up to {max_miis} Miis...\n")
-        
-        all_data = {
-            'region': self.region,
-            'file_path': str(self.file_path),
-            'file_size': len(self.data),
-            'total_miis': 0,
-            'miis': {}
-        }
-        
         # First, collect all Mii names for relationship lookups
         mii_names = {}
         for i in range(max_miis):
@@ -592,8 +680,6 @@ class CompleteMiiExtractor:
             except:
                 pass
         
-        # Extract data for each Mii
-        extracted_count = 0
         for mii_index in range(max_miis):
             try:
                 # Check if Mii exists by checking if name exists or personality data exists
@@ -606,34 +692,155 @@ class CompleteMiiExtractor:
                         continue  # Skip empty Mii slots
                     name = f"Mii {mii_index}"
                 
-                print(f"Extracting Mii {mii_index}: {name}")
-                mii_data = self.extract_single_mii(mii_index)
-                all_data['miis'][str(mii_index)] = mii_data
-                extracted_count += 1
+                mii_data = reuse(mii_index) if reuse else None
+                if mii_data is not None:
+                    print(f"Skipping Mii {mii_index}: {name} (already extracted)")
+                else:
+                    print(f"Extracting Mii {mii_index}: {name}")
+                    mii_data = self.extract_single_mii(mii_index)
                 
             except Exception as e:
                 print(f"Error extracting mii {mii_index}: {e}")
                 continue
+            
+            yield mii_index, mii_data
+    
+    def extract_all_miis(self, max_miis: int = 100,
+                         reuse: Optional[Callable[[int], Optional[Dict]]] = None) -> Dict:
+        """Extract data for all Miis"""
+        if not self.data:
+            self.read_file()
+        
+        print(f"Extracting data for up to {max_miis} Miis...\n")
         
-        all_data['total_miis'] = extracted_count
+        all_data = {
+            'region': self.region,
+            'file_path': str(self.file_path),
+            'file_size': len(self.data),
+            'total_miis': 0,
+            'miis': {}
+        }
+        
+        # Extract data for each Mii
+        for mii_index, mii_data in self.iter_miis(max_miis, reuse):
+            all_data['miis'][str(mii_index)] = mii_data
+        
+        all_data['total_miis'] = len(all_data['miis'])
         return all_data
 
 
+def safe_folder_name(nickname: str, mii_id) -> str:
+    """Folder name for a Mii (sanitized nickname, Mii_<id> if nothing is left)"""
+    safe_nickname = "".join(c for c in nickname if c.isalnum() or c in (' ', '-', '_')).strip()
+    if not safe_nickname:
+        safe_nickname = f"Mii_{mii_id}"
+    return safe_nickname
+
+
+def mii_json_name(mii_id, mii_data: Dict) -> str:
+    """Relative path of a Mii's JSON file (folder uses display name, file uses lowercase name.json)"""
+    nickname = mii_data.get('profile', {}).get('nickname', f'Mii_{mii_id}')
+    safe_nickname = safe_folder_name(nickname, mii_id)
+    return f"{safe_nickname}/{safe_nickname.lower()}.json"
+
+
+def mii_json_bytes(mii_data: Dict, all_data: Dict, pretty: bool = True, compact: bool = False) -> bytes:
+    """Encode one Mii's JSON file contents, with the save metadata added"""
+    if compact:
+        mii_data = compact_mii(mii_data)
+    mii_output = {
+        'region': all_data['region'],
+        'save_file_path': all_data['file_path'],
+        'save_file_size': all_data['file_size'],
+        **mii_data  # Include all the Mii data
+    }
+    return json_output.dumps(mii_output, pretty)
+
+
+def write_mii_json(miis_folder: Path, mii_id, mii_data: Dict, all_data: Dict,
+                   pretty: bool = True, compact: bool = False) -> Tuple[Path, int]:
+    """Write one Mii's JSON into its own subfolder, returns (json_file, file size)"""
+    json_file = miis_folder / mii_json_name(mii_id, mii_data)
+    json_file.parent.mkdir(exist_ok=True)
+    data = mii_json_bytes(mii_data, all_data, pretty, compact)
+    with open(json_file, 'wb') as f:
+        f.write(data)
+    return json_file, len(data)
+
+
+def build_summary(all_data: Dict, total_size: int, lookup_tables: Optional[Dict] = None) -> Dict:
+    """
+    Build the _summary.json overview (referencing each Mii's subfolder path).
+    For the compact profile, pass the extractor's lookup_tables to store them once here.
+    """
+    summary_data = {
+        'region': all_data['region'],
+        'save_file_path': all_data['file_path'],
+        'save_file_size': all_data['file_size'],
+        'total_miis': all_data['total_miis'],
+        'total_json_size': total_size,
+        'extraction_date': datetime.now().isoformat(),
+        'miis': {}
+    }
+    
+    for mii_id, mii_data in all_data['miis'].items():
+        summary_data['miis'][mii_id] = {
+            'index': int(mii_id),
+            'nickname': mii_data.get('profile', {}).get('nickname', f'Mii_{mii_id}'),
+            'filename': mii_json_name(mii_id, mii_data),
+            'personality_type': mii_data.get('personality_type', 'Unknown'),
+            'relationship_count': mii_data.get('relationship_count', 0),
+            'total_size': mii_data.get('total_size', 0)
+        }
+    
+    if lookup_tables is not None:
+        summary_data['output_profile'] = COMPACT
+        summary_data['lookup_tables'] = lookup_tables
+    
+    return summary_data
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python extract_full_mii_data.py <save_file> [mii_index|all] [region] [max_miis]")
+    argv = sys.argv[1:]
+    resume = pop_flag(argv, "--resume")
+    pretty = not pop_flag(argv, "--minify")
+    compact = pop_flag(argv, "--compact")
+    timings_json = pop_option(argv, "--timings-json", None)
+    show_timings = pop_flag(argv, "--timings")
+    graph_format = pop_option(argv, "--graph", None)
+    env_timings = timings_from_env()
+    if env_timings is not None and env_timings.endswith(".json"):
+        timings_json = timings_json or env_timings
+    elif env_timings is not None:
+        show_timings = True
+    timings = Timings() if show_timings or timings_json else None
+    section = timings.section if timings is not None else no_section
+    
+    if graph_format is not None:
+        from graph_export import GRAPH_FORMATS, export_graph  # imports this module
+    
+    if len(argv) < 1 or (graph_format is not None and graph_format not in GRAPH_FORMATS):
+        print("Usage: python extract_full_mii_data.py <save_file> [mii_index|all] [region] [max_miis] [--resume] [--minify] [--compact]")
         print("  save_file: Path to the save file")
         print("  mii_index: Index of the Mii to extract (0-based) OR 'all' to extract all Miis")
         print("  region: Optional - EU, US, JP, or KR (default: EU)")
         print("  max_miis: Optional - Maximum number of Miis to extract when using 'all' (default: 100)")
+        print("  --resume: Optional - Skip Miis already extracted by an interrupted 'all' run")
+        print(f"  --minify: Optional - Write JSON without indentation (JSON backend: {json_output.BACKEND})")
+        print("  --compact: Optional - Leave out names derived from IDs (tables go into _summary.json once)")
+        print("  --graph: Optional - With 'all', also write the relationship network (graphml, dot or edges)")
+        print("  --timings: Optional - Print wall time and call counts per extraction section and read helper")
+        print("  --timings-json: Optional - Write those timings to a JSON file (or set MII_TIMINGS=1 / =file.json)")
+        print("  --profile-out: Optional - Profile the run with cProfile and write the pstats to this file")
+        print("  --trace-memory: Optional - Report peak memory and top allocation sites per stage (tracemalloc)")
         sys.exit(1)
     
-    save_file = sys.argv[1]
-    mii_arg = sys.argv[2] if len(sys.argv) > 2 else "all"
-    region = sys.argv[3] if len(sys.argv) > 3 else "EU"
-    max_miis = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+    save_file = argv[0]
+    mii_arg = argv[1] if len(argv) > 1 else "all"
+    region = argv[2] if len(argv) > 2 else "EU"
+    max_miis = int(argv[3]) if len(argv) > 3 else 100
     
-    extractor = CompleteMiiExtractor(save_file, region)
+    extractor = CompleteMiiExtractor(save_file, region, timings)
     
     print("=" * 60)
     print("Tomodachi Life - Complete Mii Data Extractor")
@@ -645,74 +852,71 @@ def main():
         if mii_arg.lower() == "all":
             # Extract all Miis
             print("Extracting ALL Miis...\n")
-            all_data = extractor.extract_all_miis(max_miis)
             
             # Create output folder for individual Mii files
             output_dir = Path(__file__).parent
             miis_folder = output_dir / "extracted_miis"
             miis_folder.mkdir(exist_ok=True)
             
-            # Save each Mii to its own JSON file (inside a per-Mii subfolder)
-            print(f"\nSaving individual Mii files to: {miis_folder} (one subfolder per Mii)\n")
+            # Every Mii written is journaled, so an interrupted run can pick up where it stopped
+            journal = CheckpointJournal(miis_folder / JOURNAL_NAME, resume)
+            save = save_id(save_file)
+            stage = 'extract:compact' if compact else 'extract'  # a Mii written in the other profile is redone
+            reused = set()
+            
+            def reuse(mii_index: int) -> Optional[Dict]:
+                if not journal.is_done(save, mii_index, stage):
+                    return None
+                mii_data = load_mii_json(journal.outputs(save, mii_index, stage)[0], extractor.lookup_tables())
+                if mii_data is not None:
+                    reused.add(str(mii_index))
+                return mii_data
+            
+            extractor.read_file()
+            all_data = {
+                'region': extractor.region,
+                'file_path': str(extractor.file_path),
+                'file_size': len(extractor.data),
+                'total_miis': 0,
+                'miis': {}
+            }
+            
+            # Save each Mii to its own JSON file (inside a per-Mii subfolder) as soon as it is extracted
+            print(f"Extracting data for up to {max_miis} Miis into: {miis_folder} (one subfolder per Mii)\n")
+            profiling.stage('extract')
             total_size = 0
-            for mii_id, mii_data in all_data['miis'].items():
-                # Create a safe filename from the Mii's nickname
+            for mii_index, mii_data in extractor.iter_miis(max_miis, reuse if resume else None):
+                mii_id = str(mii_index)
+                all_data['miis'][mii_id] = mii_data
                 nickname = mii_data.get('profile', {}).get('nickname', f'Mii_{mii_id}')
-                # Sanitize filename (remove invalid characters)
-                safe_nickname = "".join(c for c in nickname if c.isalnum() or c in (' ', '-', '_')).strip()
-                if not safe_nickname:
-                    safe_nickname = f"Mii_{mii_id}"
-                # Create subfolder per Mii (folder uses display name, file uses lowercase name.json)
-                mii_subfolder = miis_folder / safe_nickname
-                mii_subfolder.mkdir(exist_ok=True)
-                json_filename = f"{safe_nickname.lower()}.json"
-                json_file = mii_subfolder / json_filename
-                
-                # Add metadata to each Mii's data
-                mii_output = {
-                    'region': all_data['region'],
-                    'save_file_path': all_data['file_path'],
-                    'save_file_size': all_data['file_size'],
-                    **mii_data  # Include all the Mii data
-                }
-                
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(mii_output, f, indent=2, ensure_ascii=False)
-                
-                file_size = json_file.stat().st_size
+                if mii_id in reused:
+                    json_file = journal.outputs(save, mii_index, stage)[0]
+                    file_size = json_file.stat().st_size
+                    total_size += file_size
+                    continue
+                with section('write_json'):
+                    json_file, file_size = write_mii_json(miis_folder, mii_id, mii_data, all_data, pretty, compact)
+                journal.record(save, mii_index, stage, [json_file])
                 total_size += file_size
-                print(f"  ✓ Saved Mii {mii_id} ({nickname}): {safe_nickname}/{json_filename} ({file_size:,} bytes)")
+                print(f"  ✓ Saved Mii {mii_id} ({nickname}): {json_file.parent.name}/{json_file.name} ({file_size:,} bytes)")
+            all_data['total_miis'] = len(all_data['miis'])
+            journal.close()
             
             # Also create a summary file with overview
+            profiling.stage('summary')
             summary_file = miis_folder / "_summary.json"
-            summary_data = {
-                'region': all_data['region'],
-                'save_file_path': all_data['file_path'],
-                'save_file_size': all_data['file_size'],
-                'total_miis': all_data['total_miis'],
-                'total_json_size': total_size,
-                'extraction_date': datetime.now().isoformat(),
-                'miis': {}
-            }
+            summary_data = build_summary(all_data, total_size, extractor.lookup_tables() if compact else None)
             
-            # Add summary info for each Mii (referencing subfolder path)
-            for mii_id, mii_data in all_data['miis'].items():
-                nickname = mii_data.get('profile', {}).get('nickname', f'Mii_{mii_id}')
-                safe_nickname = "".join(c for c in nickname if c.isalnum() or c in (' ', '-', '_')).strip()
-                if not safe_nickname:
-                    safe_nickname = f"Mii_{mii_id}"
-                json_filename = f"{safe_nickname}/{safe_nickname.lower()}.json"
-                summary_data['miis'][mii_id] = {
-                    'index': int(mii_id),
-                    'nickname': nickname,
-                    'filename': json_filename,
-                    'personality_type': mii_data.get('personality_type', 'Unknown'),
-                    'relationship_count': mii_data.get('relationship_count', 0),
-                    'total_size': mii_data.get('total_size', 0)
-                }
+            with section('write_summary'):
+                json_output.dump(summary_data, summary_file, pretty)
+            
+            from text_index import TEXT_INDEX_NAME, build_text_index  # only 'all' runs write the index
+            with section('write_text_index'):
+                (miis_folder / TEXT_INDEX_NAME).write_bytes(build_text_index(all_data))
             
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary_data, f, indent=2, ensure_ascii=False)
+            if graph_format is not None:
+                graph_file = miis_folder / f"_relationships{GRAPH_FORMATS[graph_format]}"
+                graph_nodes, graph_edges = export_graph(extractor, graph_file, graph_format, max_miis)
             
             print(f"\n{'=' * 60}")
             print("Extraction Complete!")
@@ -721,6 +925,9 @@ def main():
             print(f"Output folder: {miis_folder}")
             print(f"Total size of all JSON files: {total_size:,} bytes ({total_size / 1024:.2f} KB)")
             print(f"Summary file: {summary_file}")
+            print(f"Text search index: {miis_folder / TEXT_INDEX_NAME}")
+            if graph_format is not None:
+                print(f"Relationship graph: {graph_file} ({graph_nodes} Miis, {graph_edges} relationships)")
             
             # Show personality type summary
             personality_types = {}
@@ -750,6 +957,7 @@ def main():
             # Extract single Mii
             mii_index = int(mii_arg)
             print(f"Extracting Mii {mii_index}...\n")
+            profiling.stage('extract')
             
             result = extractor.extract_single_mii(mii_index)
             
@@ -757,8 +965,8 @@ def main():
             output_dir = Path(__file__).parent
             output_file = output_dir / f"mii_{mii_index}_complete_data.json"
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+            with section('write_json'):
+                json_output.dump(result, output_file, pretty)
             
             print(f"\nSaved complete data to: {output_file}")
             print("\n" + "=" * 60)
@@ -779,6 +987,13 @@ def main():
                 print(f"\nPersonality type detected: {personality_type}")
                 print("(Requested types: 'Easygoing Softie', 'Independent Free Spirit')")
         
+        if timings is not None:
+            if show_timings:
+                print("\n" + timings.report("Extraction timings"))
+            if timings_json:
+                timings.write_json(timings_json)
+                print(f"\nTimings written to: {timings_json}")
+        
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -787,5 +1002,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    profiling.run_main(main)
 
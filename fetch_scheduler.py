@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Rate-limited, retrying HTTP fetcher for render downloads.
+
+Every request waits for a token from a shared token bucket, transient failures
+(connection errors, timeouts, 429 and 5xx responses) are retried with
+exponential backoff and full jitter within a per-request deadline, and the
+number of requests in flight is capped. Counters and a latency histogram are
+kept in FetchStats.
+
+requests is imported when the first scheduler is created, not with the module.
+"""
+
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_RATE = 20.0
+DEFAULT_RETRIES = 4
+DEFAULT_DEADLINE = 120.0
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A fetch that failed for good (non-retryable error, retries exhausted or deadline passed)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `burst` saved up"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take one token, waiting if needed. Returns False if the deadline would pass first."""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class FetchStats:
+    """Counters for a FetchScheduler"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self.successes = 0
+        self.failures = 0
+        self.bytes = 0
+        self.status_counts = {}
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def record_attempt(self, latency: float, status: Optional[int], size: int = 0):
+        bucket = len(LATENCY_BUCKETS_MS)
+        latency_ms = latency * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                bucket = i
+                break
+        key = str(status) if status is not None else "error"
+        with self._lock:
+            self.attempts += 1
+            self.bytes += size
+            self.latency_histogram[bucket] += 1
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_result(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'successes': self.successes,
+                'failures': self.failures,
+                'bytes': self.bytes,
+                'status_counts': dict(self.status_counts),
+                'latency_histogram': dict(zip(labels, self.latency_histogram))
+            }
+
+
+class FetchScheduler:
+    def __init__(self, session: "requests.Session", rate: float = DEFAULT_RATE, burst: Optional[float] = None,
+                 max_retries: int = DEFAULT_RETRIES, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 deadline: float = DEFAULT_DEADLINE, timeout: float = 30, max_in_flight: int = 8):
+        import requests
+        self.session = session
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.timeout = timeout
+        self.in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self.stats = FetchStats()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Exponential backoff with full jitter, never shorter than a Retry-After header"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def fetch(self, url: str) -> bytes:
+        """Fetch url, retrying transient failures. Raises FetchError when it gives up."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(deadline):
+                self.stats.record_result(False)
+                raise FetchError(f"deadline passed waiting for rate limit ({url})")
+
+            remaining = deadline - time.monotonic()
+            retry_after = None
+            start = time.monotonic()
+            with self.in_flight:
+                try:
+                    response = self.session.get(url, timeout=max(0.001, min(self.timeout, remaining)))
+                except self.transient_errors as e:
+                    self.stats.record_attempt(time.monotonic() - start, None)
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    content = response.content
+                    self.stats.record_attempt(time.monotonic() - start, response.status_code, len(content))
+                    if response.ok:
+                        self.stats.record_result(True)
+                        return content
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code not in RETRYABLE_STATUS:
+                        self.stats.record_result(False)
+                        raise FetchError(error)
+                    retry_after = response.headers.get('Retry-After')
+
+            if attempt >= self.max_retries:
+                self.stats.record_result(False)
+                raise FetchError(f"{error} (gave up after {attempt + 1} attempts)")
+
+            delay = self._backoff(attempt, retry_after)
+            if time.monotonic() + delay > deadline:
+                self.stats.record_result(False)
+                raise FetchError(f"{error} (deadline passed)")
+            self.stats.record_retry()
+            attempt += 1
+            time.sleep(delay)
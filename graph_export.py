@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Stream each island's relationship network to GraphML, DOT or an edge list.
+
+Nodes are the occupied Mii slots with nickname, personality type and level as
+properties; edges come straight from the raw relationship rows at 0x299F0
+(value and type per cell) and are written as they are read, so no per-Mii
+dicts are built and memory stays flat however many saves are exported.
+Cells pointing at empty slots are skipped, since they have no node.
+
+Formats: graphml (.graphml), dot (.dot) and edges (.tsv edge list, plus a
+.nodes.tsv file with the node properties).
+
+Usage: python graph_export.py <save files or folders...> [--format graphml|dot|edges]
+                              [--output DIR] [--region EU] [--max-miis N]
+"""
+
+import operator
+import sys
+import time
+from itertools import compress
+from pathlib import Path
+from typing import Iterator, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from cli_options import find_saves, pop_option
+from extract_full_mii_data import RELATIONSHIP_TYPES, CompleteMiiExtractor
+from relationship_graph import RELATIONSHIP_BASE, ROW_SIZE, SLOTS, TYPES_OFFSET
+
+GRAPH_FORMATS = {'graphml': '.graphml', 'dot': '.dot', 'edges': '.tsv'}
+
+Node = Tuple[int, str, str, int]  # slot, nickname, personality type, level
+Edge = Tuple[int, int, int, int]  # source slot, target slot, value, type
+
+
+def occupied_slots(extractor: CompleteMiiExtractor, max_miis: int = 100) -> bytearray:
+    """1 for every occupied slot (same test as CompleteMiiExtractor.iter_miis)"""
+    names = extractor.read_mii_names()
+    occupied = bytearray(SLOTS)
+    for slot in range(min(max_miis, SLOTS)):
+        occupied[slot] = slot in names or extractor._read_byte(0x1D80 + slot * 0x660) != 0
+    return occupied
+
+
+def iter_nodes(extractor: CompleteMiiExtractor, occupied: bytearray) -> Iterator[Node]:
+    names = extractor.read_mii_names()
+    for slot in compress(range(SLOTS), occupied):
+        yield (slot, names.get(slot, f"Mii {slot}"), extractor.read_personality(slot)['type'],
+               extractor.read_status(slot)['level'])
+
+
+def iter_edges(data: bytes, occupied: bytearray) -> Iterator[Edge]:
+    """Relationship cells with a value or a type, read off the raw rows"""
+    for source in compress(range(SLOTS), occupied):
+        row = RELATIONSHIP_BASE + source * ROW_SIZE
+        values = data[row:row + SLOTS].ljust(SLOTS, b'\0')
+        types = data[row + TYPES_OFFSET:row + TYPES_OFFSET + SLOTS].ljust(SLOTS, b'\0')
+        for target in compress(range(SLOTS), map(operator.or_, values, types)):
+            if occupied[target]:
+                yield source, target, values[target], types[target]
+
+
+def _type_name(rel_type: int) -> str:
+    return RELATIONSHIP_TYPES.get(rel_type, f"Unknown ({rel_type})")
+
+
+def write_graphml(out: TextIO, name: str, nodes: Iterator[Node], edges: Iterator[Edge]) -> Tuple[int, int]:
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+              '  <key id="nickname" for="node" attr.name="nickname" attr.type="string"/>\n'
+              '  <key id="personality_type" for="node" attr.name="personality_type" attr.type="string"/>\n'
+              '  <key id="level" for="node" attr.name="level" attr.type="int"/>\n'
+              '  <key id="value" for="edge" attr.name="value" attr.type="int"/>\n'
+              '  <key id="type" for="edge" attr.name="type" attr.type="int"/>\n'
+              '  <key id="type_name" for="edge" attr.name="type_name" attr.type="string"/>\n'
+              f'  <graph id={quoteattr(name)} edgedefault="directed">\n')
+    node_count = edge_count = 0
+    for slot, nickname, personality, level in nodes:
+        out.write(f'    <node id="n{slot}"><data key="nickname">{escape(nickname)}</data>'
+                  f'<data key="personality_type">{escape(personality)}</data>'
+                  f'<data key="level">{level}</data></node>\n')
+        node_count += 1
+    for source, target, value, rel_type in edges:
+        out.write(f'    <edge source="n{source}" target="n{target}"><data key="value">{value}</data>'
+                  f'<data key="type">{rel_type}</data>'
+                  f'<data key="type_name">{escape(_type_name(rel_type))}</data></edge>\n')
+        edge_count += 1
+    out.write('  </graph>\n</graphml>\n')
+    return node_count, edge_count
+
+
+def _dot_string(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def write_dot(out: TextIO, name: str, nodes: Iterator[Node], edges: Iterator[Edge]) -> Tuple[int, int]:
+    out.write(f"digraph {_dot_string(name)} {{\n")
+    node_count = edge_count = 0
+    for slot, nickname, personality, level in nodes:
+        out.write(f"  n{slot} [label={_dot_string(nickname)}, personality_type={_dot_string(personality)}, "
+                  f"level={level}];\n")
+        node_count += 1
+    for source, target, value, rel_type in edges:
+        out.write(f"  n{source} -> n{target} [value={value}, type={rel_type}, "
+                  f"type_name={_dot_string(_type_name(rel_type))}];\n")
+        edge_count += 1
+    out.write("}\n")
+    return node_count, edge_count
+
+
+def _tsv_field(text: str) -> str:
+    return text.replace('\t', ' ').replace('\n', ' ')
+
+
+def write_edge_list(out: TextIO, nodes_out: TextIO, nodes: Iterator[Node],
+                    edges: Iterator[Edge]) -> Tuple[int, int]:
+    nodes_out.write("id\tnickname\tpersonality_type\tlevel\n")
+    node_count = edge_count = 0
+    for slot, nickname, personality, level in nodes:
+        nodes_out.write(f"{slot}\t{_tsv_field(nickname)}\t{personality}\t{level}\n")
+        node_count += 1
+    out.write("source\ttarget\tvalue\ttype\ttype_name\n")
+    for source, target, value, rel_type in edges:
+        out.write(f"{source}\t{target}\t{value}\t{rel_type}\t{_type_name(rel_type)}\n")
+        edge_count += 1
+    return node_count, edge_count
+
+
+def export_graph(extractor: CompleteMiiExtractor, path: Path, graph_format: str = 'graphml',
+                 max_miis: int = 100, name: str = None) -> Tuple[int, int]:
+    """Stream the relationship network of a loaded save to path, returns (nodes, edges)"""
+    if not extractor.data:
+        extractor.read_file()
+    path = Path(path)
+    name = name or Path(extractor.file_path).stem
+    occupied = occupied_slots(extractor, max_miis)
+    nodes, edges = iter_nodes(extractor, occupied), iter_edges(extractor.data, occupied)
+    with open(path, 'w', encoding='utf-8', newline='\n') as out:
+        if graph_format == 'graphml':
+            return write_graphml(out, name, nodes, edges)
+        if graph_format == 'dot':
+            return write_dot(out, name, nodes, edges)
+        with open(path.with_suffix('.nodes.tsv'), 'w', encoding='utf-8', newline='\n') as nodes_out:
+            return write_edge_list(out, nodes_out, nodes, edges)
+
+
+def main():
+    argv = sys.argv[1:]
+    graph_format = pop_option(argv, "--format", "graphml")
+    output_dir = Path(pop_option(argv, "--output", "graphs"))
+    region = pop_option(argv, "--region", "EU")
+    max_miis = int(pop_option(argv, "--max-miis", "100"))
+
+    if not argv or graph_format not in GRAPH_FORMATS:
+        print("Usage: python graph_export.py <save files or folders...> [options]")
+        print(f"  --format: {', '.join(GRAPH_FORMATS)} (default: graphml)")
+        print("  --output DIR: Folder for the graph files, one per save (default: graphs)")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --max-miis: Maximum number of Miis per save (default: 100)")
+        sys.exit(1)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    total_nodes = total_edges = 0
+    saves = find_saves(argv)
+    for save in saves:
+        extractor = CompleteMiiExtractor(str(save), region)
+        with open(save, 'rb') as f:
+            extractor.data = f.read()
+        path = output_dir / (save.stem + GRAPH_FORMATS[graph_format])
+        nodes, edges = export_graph(extractor, path, graph_format, max_miis)
+        total_nodes += nodes
+        total_edges += edges
+        print(f"  ✓ {save.name} -> {path} ({nodes} Miis, {edges} relationships)")
+    print(f"\nExported {len(saves)} graph(s), {total_nodes} Miis and {total_edges} relationships "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+JSON encoding for the extractor's output files.
+
+Uses orjson or msgspec when one of them is installed (several times faster than
+the json module) and falls back to the standard library otherwise. Pretty
+output is the same bytes as json.dump(..., indent=2, ensure_ascii=False) for
+everything the extractor writes (orjson and msgspec only differ on floats in
+exponent form, which Mii data never contains). Compact output has no
+whitespace at all.
+
+Set MII_JSON_BACKEND=orjson, msgspec or stdlib to force a backend.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Tuple, Union
+
+BACKENDS = ('orjson', 'msgspec', 'stdlib')
+
+
+def _stdlib() -> Tuple[Callable[[Any], bytes], Callable[[Any], bytes]]:
+    def pretty(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def compact(obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    return pretty, compact
+
+
+def _orjson() -> Tuple[Callable[[Any], bytes], Callable[[Any], bytes]]:
+    import orjson
+    # Integer dict keys become strings, like the json module does
+    option = orjson.OPT_NON_STR_KEYS
+
+    def pretty(obj):
+        return orjson.dumps(obj, option=option | orjson.OPT_INDENT_2)
+
+    def compact(obj):
+        return orjson.dumps(obj, option=option)
+
+    return pretty, compact
+
+
+def _msgspec() -> Tuple[Callable[[Any], bytes], Callable[[Any], bytes]]:
+    import msgspec
+    encoder = msgspec.json.Encoder()
+
+    def pretty(obj):
+        return msgspec.json.format(encoder.encode(obj), indent=2)
+
+    return pretty, encoder.encode
+
+
+_LOADERS = {'orjson': _orjson, 'msgspec': _msgspec, 'stdlib': _stdlib}
+
+
+def set_backend(name: str = None) -> str:
+    """Switch to a backend (None = fastest installed one), returns the backend in use"""
+    global BACKEND, _pretty, _compact
+    if name is not None and name not in _LOADERS:
+        raise ValueError(f"Unknown JSON backend: {name} (use {', '.join(BACKENDS)})")
+    for candidate in ([name] if name is not None else BACKENDS):
+        try:
+            _pretty, _compact = _LOADERS[candidate]()
+        except ImportError:
+            if name is not None:
+                raise
+            continue
+        BACKEND = candidate
+        return BACKEND
+
+
+BACKEND = None
+_pretty = _compact = None
+set_backend(os.environ.get('MII_JSON_BACKEND') or None)
+
+
+def dumps(obj: Any, pretty: bool = True) -> bytes:
+    """Encode obj as UTF-8 JSON, indented by 2 spaces or compact"""
+    return _pretty(obj) if pretty else _compact(obj)
+
+
+def dump(obj: Any, path: Union[str, Path], pretty: bool = True) -> int:
+    """Write obj to a JSON file, returns the number of bytes written"""
+    data = dumps(obj, pretty)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
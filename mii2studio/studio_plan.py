@@ -0,0 +1,193 @@
+"""
+Compiled conversion plans from every supported Mii format to Mii Studio data.
+
+Each input type is compiled once into a plan: for every Mii Studio field (in
+Studio byte order) the plan holds the source attribute to read and a 256-entry
+lookup table that already folds in any offset or remap. Converting a Mii is then
+a flat loop of table lookups with no per-field format branching, and a batch of
+decoded columns can be converted with bytes.translate().
+
+3DS/Wii U/Miitomo plans can also convert a raw 0x60 CFSD block directly: its
+appearance words are unpacked with one struct call and every field is a shift
+and mask away, so no Kaitai object is built (same bits as gen2_wiiu_3ds_miitomo.ksy).
+"""
+
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Mii Studio fields in the order they are stored in a .mnms file
+STUDIO_FIELDS = [
+    "facial_hair_color", "beard_goatee", "body_weight", "eye_stretch", "eye_color",
+    "eye_rotation", "eye_size", "eye_type", "eye_horizontal", "eye_vertical",
+    "eyebrow_stretch", "eyebrow_color", "eyebrow_rotation", "eyebrow_size", "eyebrow_type",
+    "eyebrow_horizontal", "eyebrow_vertical", "face_color", "face_makeup", "face_type",
+    "face_wrinkles", "favorite_color", "gender", "glasses_color", "glasses_size",
+    "glasses_type", "glasses_vertical", "hair_color", "hair_flip", "hair_type",
+    "body_height", "mole_size", "mole_enable", "mole_horizontal", "mole_vertical",
+    "mouth_stretch", "mouth_color", "mouth_size", "mouth_type", "mouth_vertical",
+    "beard_size", "beard_mustache", "beard_vertical", "nose_size", "nose_type",
+    "nose_vertical"
+]
+
+# Studio fields whose source attribute has a different name in the Kaitai structs
+SOURCE_NAMES = {
+    "beard_goatee": "facial_hair_beard",
+    "beard_size": "facial_hair_size",
+    "beard_mustache": "facial_hair_mustache",
+    "beard_vertical": "facial_hair_vertical"
+}
+
+# Wii/DS store makeup and wrinkles in a single "facial_feature" value
+MAKEUP = {1: 1, 2: 6, 3: 9, 9: 10}
+WRINKLES = {4: 5, 5: 2, 6: 3, 7: 7, 8: 8, 10: 9, 11: 11}
+
+INPUT_TYPES = ["wii", "ds", "3ds", "wiiu", "miitomo", "switchdb", "switch"]
+
+# (source attribute or None for a constant, lookup table or constant value)
+FieldPlan = Tuple[Optional[str], object]
+
+# Input types stored as a 0x60 CFSD block
+CFSD_TYPES = ("3ds", "wiiu", "miitomo")
+
+# data_1, body height/weight, face, makeup, hair type, hair, eye, eyebrow, nose, mouth, mouth2,
+# beard, glasses and mole words, starting at 0x18 of the block (the Mii name is skipped)
+CFSD_WORDS = struct.Struct("<H20xBBBBBBIIHHHHHH")
+CFSD_WORDS_OFFSET = 0x18
+
+# source attribute -> (word, shift, mask)
+CFSD_BITS = {
+    "gender": (0, 0, 1), "favorite_color": (0, 10, 15),
+    "body_height": (1, 0, 255), "body_weight": (2, 0, 255),
+    "face_color": (3, 5, 7), "face_type": (3, 1, 15), "face_makeup": (4, 4, 15), "face_wrinkles": (4, 0, 15),
+    "hair_type": (5, 0, 255), "hair_flip": (6, 3, 1), "hair_color": (6, 0, 7),
+    "eye_type": (7, 0, 63), "eye_color": (7, 6, 7), "eye_size": (7, 9, 7), "eye_stretch": (7, 13, 7),
+    "eye_rotation": (7, 16, 31), "eye_horizontal": (7, 21, 15), "eye_vertical": (7, 25, 31),
+    "eyebrow_type": (8, 0, 31), "eyebrow_color": (8, 5, 7), "eyebrow_size": (8, 8, 15),
+    "eyebrow_stretch": (8, 12, 7), "eyebrow_rotation": (8, 16, 15), "eyebrow_horizontal": (8, 21, 15),
+    "eyebrow_vertical": (8, 25, 31),
+    "nose_type": (9, 0, 31), "nose_size": (9, 5, 15), "nose_vertical": (9, 9, 31),
+    "mouth_type": (10, 0, 63), "mouth_color": (10, 6, 7), "mouth_size": (10, 9, 15), "mouth_stretch": (10, 13, 7),
+    "mouth_vertical": (11, 0, 31), "facial_hair_mustache": (11, 5, 7),
+    "facial_hair_beard": (12, 0, 7), "facial_hair_color": (12, 3, 7), "facial_hair_size": (12, 6, 15),
+    "facial_hair_vertical": (12, 10, 31),
+    "glasses_type": (13, 0, 15), "glasses_color": (13, 4, 7), "glasses_size": (13, 7, 15),
+    "glasses_vertical": (13, 11, 15),
+    "mole_enable": (14, 0, 1), "mole_size": (14, 1, 15), "mole_horizontal": (14, 5, 31), "mole_vertical": (14, 10, 31),
+}
+
+
+def _table(mapping: Optional[Dict[int, int]] = None, offset: int = 0, default: Optional[int] = None) -> bytes:
+    """Build a 256-entry lookup table: mapping first, then value + offset (or default)"""
+    table = bytearray(256)
+    for value in range(256):
+        if mapping and value in mapping:
+            table[value] = mapping[value]
+        elif default is not None:
+            table[value] = default
+        else:
+            table[value] = (value + offset) % 256
+    return bytes(table)
+
+
+IDENTITY = _table()
+
+
+def _compile(input_type: str) -> List[FieldPlan]:
+    """Compile the field plan for one input type"""
+    console = "switch" not in input_type
+    gen1 = input_type in ("wii", "ds")
+
+    overrides = {}
+    if console:
+        # 3DS-era colors map onto the Studio common color palette
+        overrides["facial_hair_color"] = ("facial_hair_color", _table({0: 8}))
+        overrides["eye_color"] = ("eye_color", _table(offset=8))
+        overrides["eyebrow_color"] = ("eyebrow_color", _table({0: 8}))
+        overrides["glasses_color"] = ("glasses_color", _table({0: 8, 1: 14, 2: 15, 3: 16, 4: 17, 5: 18}, default=0))
+        overrides["hair_color"] = ("hair_color", _table({0: 8}))
+        overrides["mouth_color"] = ("mouth_color", _table({0: 19, 1: 20, 2: 21, 3: 22}, default=0))
+    if gen1:
+        overrides["eye_stretch"] = (None, 3)
+        overrides["eyebrow_stretch"] = (None, 3)
+        overrides["mouth_stretch"] = (None, 3)
+        overrides["face_makeup"] = ("facial_feature", _table(MAKEUP, default=0))
+        overrides["face_wrinkles"] = ("facial_feature", _table(WRINKLES, default=0))
+    if input_type == "switchdb":
+        overrides["eyebrow_vertical"] = ("eyebrow_vertical", _table(offset=3))
+
+    plan = []
+    for field in STUDIO_FIELDS:
+        plan.append(overrides.get(field, (SOURCE_NAMES.get(field, field), IDENTITY)))
+    return plan
+
+
+class ConversionPlan:
+    """A compiled conversion from one input type to Mii Studio data"""
+
+    def __init__(self, input_type: str):
+        self.input_type = input_type
+        self.fields = _compile(input_type)
+        # distinct source attributes needed to feed the plan (for columnar decoders)
+        self.sources = sorted({source for source, _ in self.fields if source is not None})
+        # (word, shift, mask, table) per Studio field, for convert_cfsd; constants read nothing
+        self.cfsd_fields = None
+        if input_type in CFSD_TYPES:
+            self.cfsd_fields = [(0, 0, 0, bytes([table])) if source is None else CFSD_BITS[source] + (table,)
+                                for source, table in self.fields]
+
+    def convert(self, mii) -> bytes:
+        """Convert a single decoded Mii (any object exposing the source attributes)"""
+        out = bytearray(len(self.fields))
+        for i, (source, table) in enumerate(self.fields):
+            out[i] = table if source is None else table[getattr(mii, source)]
+        return bytes(out)
+
+    def convert_cfsd(self, raw: bytes) -> bytes:
+        """Convert a raw 0x60 CFSD block without parsing it (3DS, Wii U and Miitomo plans)"""
+        if self.cfsd_fields is None:
+            raise ValueError(f"{self.input_type} Miis are not stored as CFSD blocks")
+        words = CFSD_WORDS.unpack_from(raw, CFSD_WORDS_OFFSET)
+        return bytes([table[(words[word] >> shift) & mask] for word, shift, mask, table in self.cfsd_fields])
+
+    def convert_dict(self, mii) -> Dict[str, int]:
+        """Convert a single decoded Mii to a {studio field: value} dict"""
+        return dict(zip(STUDIO_FIELDS, self.convert(mii)))
+
+    def convert_columns(self, columns: Dict[str, Sequence[int]]) -> List[bytes]:
+        """
+        Convert a batch of decoded Miis given as columns ({source attribute: values}).
+        Returns one bytes column per Studio field, in Studio field order.
+        """
+        count = len(next(iter(columns.values()))) if columns else 0
+        out = []
+        for source, table in self.fields:
+            if source is None:
+                out.append(bytes([table]) * count)
+            else:
+                out.append(bytes(columns[source]).translate(table))
+        return out
+
+    def convert_batch(self, columns: Dict[str, Sequence[int]]) -> List[bytes]:
+        """Convert a batch of decoded columns to one Studio data row per Mii"""
+        return [bytes(row) for row in zip(*self.convert_columns(columns))]
+
+
+PLANS = {input_type: ConversionPlan(input_type) for input_type in INPUT_TYPES}
+
+
+def get_plan(input_type: str) -> ConversionPlan:
+    """Return the compiled plan for an input type"""
+    if input_type not in PLANS:
+        raise ValueError(f"Unsupported input type: {input_type}")
+    return PLANS[input_type]
+
+
+def encode_studio_data(studio_data: bytes) -> str:
+    """Obfuscate Studio data for the render API (hex string, as used in ?data=)"""
+    encoded = bytearray(len(studio_data) + 1)
+    n = 256
+    for i, v in enumerate(studio_data):
+        # Nintendo randomizes the seed in JS, we always start from 0
+        n = (7 + (v ^ n)) % 256
+        encoded[i + 1] = n
+    return encoded.hex()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Secondary indexes over an extraction, and queries that don't open per-Mii files.
+
+build reads every per-Mii JSON file once and writes _index.json next to
+_summary.json: inverted indexes (value -> Mii indexes) on personality type,
+every food slot, favorite color, relationship type, level and origin island,
+plus the values each Mii contributed. Running build again only reads the Mii
+files whose size or mtime changed. query evaluates a boolean expression by
+intersecting the postings and brings the index up to date first if
+_summary.json changed since it was built.
+
+    python mii_index.py query extracted_miis 'worst_foods="Banana skin"'
+    python mii_index.py query extracted_saves 'relationship_type=Spouse and not level<5'
+
+Terms are field=value (also !=, <, <=, >, >= on level and origin_island),
+combined with and, or, not and parentheses. Values match case-insensitively.
+A folder without _summary.json stands for each of its subfolders that has one.
+
+Usage: python mii_index.py build <folders...>
+       python mii_index.py query <folder> <expression> [--json FILE]
+       python mii_index.py values <folder> [field]
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import json_output
+from cli_options import pop_option
+from compact_profile import FOOD_GROUPS, load_mii, load_summary
+
+INDEX_NAME = "_index.json"
+INDEX_VERSION = 1
+
+NUMERIC_FIELDS = ('level', 'origin_island')
+
+
+def _signature(path: Path) -> Optional[List[int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def mii_values(mii_data: Dict) -> Tuple[Dict[str, List], Dict[str, List[int]]]:
+    """
+    Indexed values of one Mii (field -> values) and its relationship targets by type name.
+    Each food slot is a field of its own ('worst_foods.worst_1'), and its group
+    ('worst_foods') holds the foods of all of its slots.
+    """
+    profile = mii_data.get('profile', {})
+    values = {
+        'personality_type': [mii_data.get('personality_type') or mii_data.get('personality', {}).get('type')],
+        'favorite_color': [profile.get('favorite_color_name')],
+        'level': [mii_data.get('status', {}).get('level')],
+        'origin_island': [profile.get('origin_island')],
+    }
+    food = mii_data.get('food_preferences', {})
+    for group in FOOD_GROUPS:
+        names = []
+        for slot, entry in food.get(group, {}).items():
+            values[f"{group}.{slot}"] = [entry['name']]
+            if entry['name'] not in names:
+                names.append(entry['name'])
+        values[group] = names
+    relationships = {}
+    for target, rel in mii_data.get('relationships', {}).items():
+        relationships.setdefault(rel['type_name'], []).append(int(target))
+    values['relationship_type'] = list(relationships)
+    return {field: [value for value in field_values if value is not None] for field, field_values in values.items()}, \
+        relationships
+
+
+def _postings(miis: Dict[str, Dict]) -> Dict[str, Dict[str, List[int]]]:
+    """Invert the per-Mii values: field -> value -> sorted Mii indexes"""
+    fields = {}
+    for mii_index in sorted(miis, key=int):
+        for field, values in miis[mii_index]['values'].items():
+            for value in values:
+                fields.setdefault(field, {}).setdefault(str(value), []).append(int(mii_index))
+    return fields
+
+
+def load_index(folder: Path) -> Optional[Dict]:
+    try:
+        index = load_summary(folder / INDEX_NAME)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def build_index(folder: Path, index: Optional[Dict] = None) -> Tuple[Dict, int]:
+    """
+    Bring the index of one extraction folder up to date and write it.
+    Only Mii files whose size or mtime changed are read. Returns (index, Miis read).
+    """
+    summary_file = folder / "_summary.json"
+    summary = load_summary(summary_file)
+    if index is None:
+        index = load_index(folder)
+    previous = index['miis'] if index is not None else {}
+    tables = summary.get('lookup_tables')
+
+    miis = {}
+    read = 0
+    for mii_index, entry in summary['miis'].items():
+        path = folder / entry['filename']
+        signature = _signature(path)
+        if signature is None:
+            print(f"  ⚠ {entry['filename']} is missing, not indexed")
+            continue
+        known = previous.get(mii_index)
+        if known is not None and known['filename'] == entry['filename'] and known['signature'] == signature:
+            miis[mii_index] = known
+            continue
+        try:
+            values, relationships = mii_values(load_mii(path, tables))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  ⚠ {entry['filename']} could not be read, not indexed: {e}")
+            continue
+        read += 1
+        miis[mii_index] = {'nickname': entry['nickname'], 'filename': entry['filename'], 'signature': signature,
+                           'values': values, 'relationships': relationships}
+
+    index = {
+        'version': INDEX_VERSION,
+        'summary_signature': _signature(summary_file),
+        'miis': miis,
+        'fields': _postings(miis),
+    }
+    json_output.dump(index, folder / INDEX_NAME, pretty=False)
+    return index, read
+
+
+def current_index(folder: Path) -> Dict:
+    """The index of a folder, updated first if _summary.json changed since it was built"""
+    index = load_index(folder)
+    if index is None or index['summary_signature'] != _signature(folder / "_summary.json"):
+        index, _ = build_index(folder, index)
+    return index
+
+
+def extraction_folders(folder: Path) -> List[Path]:
+    """The folder itself if it is an extraction, otherwise its subfolders that are"""
+    if (folder / "_summary.json").exists():
+        return [folder]
+    return sorted(path for path in folder.iterdir() if (path / "_summary.json").exists())
+
+
+# ===== QUERIES =====
+
+TOKEN = re.compile(r"""\s*(?:(?P<paren>[()])
+                         |(?P<field>[A-Za-z_][\w.]*)\s*(?P<op>>=|<=|!=|=|<|>)\s*
+                          (?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\s()]+))
+                         |(?P<word>and|or|not)\b)""", re.X | re.I)
+
+
+def tokenize(expression: str) -> List[Tuple]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"can't parse the query at: {expression[position:]!r}")
+        if match['paren']:
+            tokens.append((match['paren'],))
+        elif match['field']:
+            value = next(v for v in (match['dq'], match['sq'], match['bare']) if v is not None)
+            tokens.append(('term', match['field'], match['op'], value))
+        else:
+            tokens.append((match['word'].lower(),))
+        position = match.end()
+    return tokens
+
+
+class Query:
+    """A parsed boolean expression, evaluated against the postings of an index"""
+
+    def __init__(self, expression: str):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.tree = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"unexpected {self.tokens[self.position][0]!r} in the query")
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _or(self):
+        node = self._and()
+        while self._peek() == 'or':
+            self.position += 1
+            node = ('or', node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() in ('and', 'not', '(', 'term'):  # adjacent terms mean and
+            if self._peek() == 'and':
+                self.position += 1
+            node = ('and', node, self._not())
+        return node
+
+    def _not(self):
+        if self._peek() == 'not':
+            self.position += 1
+            return ('not', self._not())
+        if self._peek() == '(':
+            self.position += 1
+            node = self._or()
+            if self._peek() != ')':
+                raise ValueError("missing ) in the query")
+            self.position += 1
+            return node
+        if self._peek() == 'term':
+            token = self.tokens[self.position]
+            self.position += 1
+            return token
+        raise ValueError("query ends too early" if self._peek() is None else f"unexpected {self._peek()!r}")
+
+    def terms(self, node=None) -> Iterator[Tuple]:
+        node = self.tree if node is None else node
+        if node[0] == 'term':
+            yield node
+        else:
+            for child in node[1:]:
+                yield from self.terms(child)
+
+    def evaluate(self, index: Dict) -> Set[int]:
+        universe = {int(mii_index) for mii_index in index['miis']}
+        return self._evaluate(self.tree, index['fields'], universe)
+
+    def _evaluate(self, node, fields: Dict, universe: Set[int]) -> Set[int]:
+        if node[0] == 'and':
+            left = self._evaluate(node[1], fields, universe)
+            return left & self._evaluate(node[2], fields, universe) if left else left
+        if node[0] == 'or':
+            return self._evaluate(node[1], fields, universe) | self._evaluate(node[2], fields, universe)
+        if node[0] == 'not':
+            return universe - self._evaluate(node[1], fields, universe)
+        _, field, op, value = node
+        if field not in fields and not any(name.startswith(field + '.') for name in fields):
+            raise ValueError(f"unknown field {field} (indexed: {', '.join(sorted(fields))})")
+        postings = fields.get(field, {})
+        if op in ('=', '!='):
+            matches = set()
+            for key, miis in postings.items():
+                if key.lower() == value.lower():
+                    matches.update(miis)
+            return matches if op == '=' else universe - matches
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"{op} only works on {' and '.join(NUMERIC_FIELDS)}")
+        limit = int(value)
+        compare = {'<': int.__lt__, '<=': int.__le__, '>': int.__gt__, '>=': int.__ge__}[op]
+        matches = set()
+        for key, miis in postings.items():
+            if compare(int(key), limit):
+                matches.update(miis)
+        return matches
+
+
+def query_index(index: Dict, query: Query) -> List[Dict]:
+    """Matching Miis in save order, with their targets for the relationship types asked about"""
+    types = [value.lower() for _, field, op, value in query.terms() if field == 'relationship_type' and op == '=']
+    nicknames = {int(mii_index): mii['nickname'] for mii_index, mii in index['miis'].items()}
+    results = []
+    for mii_index in sorted(query.evaluate(index)):
+        mii = index['miis'][str(mii_index)]
+        result = {'mii_index': mii_index, 'nickname': mii['nickname'], 'filename': mii['filename'],
+                  'personality_type': (mii['values']['personality_type'] or [None])[0]}
+        if types:
+            result['relationships'] = {type_name: [nicknames.get(target, f"Mii {target}") for target in targets]
+                                       for type_name, targets in mii['relationships'].items()
+                                       if type_name.lower() in types}
+        results.append(result)
+    return results
+
+
+def main():
+    argv = sys.argv[1:]
+    json_file = pop_option(argv, "--json", None)
+    command = argv[0] if argv else None
+    if command not in ('build', 'query', 'values') or len(argv) < (3 if command == 'query' else 2):
+        print("Usage: python mii_index.py build <folders...>")
+        print("       python mii_index.py query <folder> <expression> [--json FILE]")
+        print("       python mii_index.py values <folder> [field]")
+        print("  folder: An extraction output folder, or a folder of them (e.g. extracted_saves)")
+        print("  expression: e.g. 'worst_foods=\"Banana skin\" and (level>=10 or not personality_type=\"Independent Artist\")'")
+        print("  fields: personality_type, favorite_color, level, origin_island, relationship_type,")
+        print("          all_time_favorites, current_favorites, worst_foods and each food slot (worst_foods.worst_1, ...)")
+        print("  --json: Also write the query results to a JSON file")
+        sys.exit(1)
+
+    if command == 'build':
+        for folder in [folder for path in argv[1:] for folder in extraction_folders(Path(path))]:
+            index, read = build_index(folder)
+            print(f"✓ {folder / INDEX_NAME}: {len(index['miis'])} Miis, {read} read, "
+                  f"{os.path.getsize(folder / INDEX_NAME):,} bytes")
+        return
+
+    folders = extraction_folders(Path(argv[1]))
+    if not folders:
+        print(f"✗ No extraction (_summary.json) found in {argv[1]}")
+        sys.exit(1)
+
+    if command == 'values':
+        field = argv[2] if len(argv) > 2 else None
+        counts = {}
+        for folder in folders:
+            for name, postings in current_index(folder)['fields'].items():
+                if field is None or name == field:
+                    for value, miis in postings.items():
+                        counts.setdefault(name, {}).setdefault(value, 0)
+                        counts[name][value] += len(miis)
+        for name in sorted(counts):
+            print(f"{name}:")
+            for value, count in sorted(counts[name].items(), key=lambda item: -item[1]):
+                print(f"  {value}: {count}")
+        return
+
+    try:
+        query = Query(argv[2])
+        results = {folder.name: query_index(current_index(folder), query) for folder in folders}
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    total = 0
+    for island, matches in results.items():
+        total += len(matches)
+        for match in matches:
+            prefix = f"{island}/" if len(folders) > 1 else ""
+            line = f"  {prefix}Mii {match['mii_index']} ({match['nickname']}): {match['personality_type']}"
+            for type_name, targets in match.get('relationships', {}).items():
+                line += f" - {type_name} of {', '.join(targets)}"
+            print(line)
+    print(f"\n{total} matching Mii(s) in {len(folders)} extraction(s)")
+
+    if json_file:
+        json_output.dump(results, json_file)
+        print(f"✓ Results written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
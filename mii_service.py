@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Long-running extraction service: saves are decoded once and kept in memory.
+
+Serves JSON over local HTTP (or a Unix socket with --socket). Decoded saves
+("islands") are kept in an LRU of --max-islands entries and decoded again
+when their file changes on disk, so internal tools can query Miis without
+starting Python and parsing the save on every call.
+
+Endpoints (save = file name of one of the served saves, default: the first):
+    GET /saves                               served saves and whether they are loaded
+    GET /miis?save=NAME[&personality=TYPE]   Mii list, optionally one personality type
+    GET /miis/<index>?save=NAME              complete data of one Mii
+    GET /miis/<index>/relationships          relationships of one Mii
+    GET /miis/<index>/studio                 Mii Studio code and render URLs
+    GET /stats                               cache hits, misses and loaded islands
+
+Usage: python mii_service.py <save files or folders...> [--port N] [--host HOST] [--socket PATH]
+                             [--region EU] [--max-miis N] [--max-islands N] [--preload]
+"""
+
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import json_output
+from cli_options import find_saves, pop_flag, pop_option
+from convert_all_miis import convert_mii_data, get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_ISLANDS = 8
+
+
+class Island:
+    """One decoded save: every occupied Mii slot, Studio codes converted on first use"""
+
+    def __init__(self, path: Path, region: str, max_miis: int):
+        started = time.perf_counter()
+        self.path = path
+        self.signature = _signature(path)
+        extractor = CompleteMiiExtractor(str(path), region)
+        with open(path, 'rb') as f:
+            extractor.data = f.read()
+        self.region = extractor.region
+        self.data = extractor.data
+        names = extractor.read_mii_names()
+        self.miis = {}  # mii index -> extracted data, in save order
+        for mii_index in range(max_miis):
+            # Same occupancy test as CompleteMiiExtractor.iter_miis, without its progress output
+            if mii_index in names or extractor._read_byte(0x1D80 + mii_index * 0x660) != 0:
+                self.miis[mii_index] = extractor.extract_single_mii(mii_index)
+        self._studio = {}
+        self.seconds = time.perf_counter() - started
+
+    def studio(self, mii_index: int) -> Dict:
+        """Mii Studio code and render URLs of a Mii (converted once)"""
+        if mii_index not in self._studio:
+            offset = get_mii_offset(mii_index, self.region)
+            studio_data, face_url, body_url = convert_mii_data(self.data[offset:offset + 0x60])
+            self._studio[mii_index] = {'mii_index': mii_index, 'studio_code': studio_data.hex(),
+                                       'face_url': face_url, 'body_url': body_url}
+        return self._studio[mii_index]
+
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+class IslandCache:
+    """LRU of decoded islands, keyed by save path and region"""
+
+    def __init__(self, max_islands: int = DEFAULT_MAX_ISLANDS, region: str = "EU", max_miis: int = 100):
+        self.max_islands = max_islands
+        self.region = region
+        self.max_miis = max_miis
+        self.islands = OrderedDict()  # (path, region) -> Island
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Island:
+        """The decoded island of a save, decoded again if the file changed since"""
+        key = (str(path), self.region)
+        with self._lock:
+            island = self.islands.get(key)
+            if island is not None and island.signature == _signature(path):
+                self.islands.move_to_end(key)
+                self.hits += 1
+                return island
+            self.misses += 1
+        # Decode outside the lock so requests for loaded islands are not held up
+        island = Island(path, self.region, self.max_miis)
+        print(f"✓ Loaded {path.name} ({island.region}): {len(island.miis)} Miis in {island.seconds * 1000:.0f} ms")
+        with self._lock:
+            self.islands[key] = island
+            self.islands.move_to_end(key)
+            while len(self.islands) > self.max_islands:
+                self.islands.popitem(last=False)
+        return island
+
+    def loaded(self, path: Path) -> bool:
+        return (str(path), self.region) in self.islands
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'max_islands': self.max_islands,
+                'islands': [{'save': Path(path).name, 'region': region, 'miis': len(island.miis)}
+                            for (path, region), island in list(self.islands.items())]}
+
+
+class NotFound(Exception):
+    pass
+
+
+class MiiService:
+    """Answers the endpoints from the island cache"""
+
+    def __init__(self, paths: List[str], cache: IslandCache):
+        self.paths = [Path(path) for path in paths]
+        self.cache = cache
+
+    def saves(self) -> List[Path]:
+        return find_saves([str(path) for path in self.paths])
+
+    def find_save(self, name: Optional[str]) -> Path:
+        """A served save by file name (the first one when name is None)"""
+        for path in self.saves():
+            if name is None or path.name == name:
+                return path
+        raise NotFound(f"no save named {name}" if name else "no saves to serve")
+
+    def handle(self, path: str, query: Dict[str, str]) -> object:
+        parts = [part for part in path.split('/') if part]
+        if parts == ['saves']:
+            return [{'save': save.name, 'loaded': self.cache.loaded(save)} for save in self.saves()]
+        if parts == ['stats']:
+            return self.cache.stats()
+        if not parts or parts[0] != 'miis' or len(parts) > 3:
+            raise NotFound(f"unknown endpoint {path}")
+
+        island = self.cache.get(self.find_save(query.get('save')))
+        if len(parts) == 1:
+            personality = query.get('personality', '').lower()
+            return [{'mii_index': mii_index, 'nickname': mii['profile']['nickname'],
+                     'personality_type': mii['personality_type'], 'relationship_count': mii['relationship_count']}
+                    for mii_index, mii in island.miis.items()
+                    if not personality or mii['personality_type'].lower() == personality]
+
+        try:
+            mii_index = int(parts[1])
+        except ValueError:
+            raise ValueError(f"Mii index must be a number, not {parts[1]}")
+        if mii_index not in island.miis:
+            raise NotFound(f"no Mii {mii_index} in {island.path.name}")
+        if len(parts) == 2:
+            return island.miis[mii_index]
+        if parts[2] == 'relationships':
+            return island.miis[mii_index]['relationships']
+        if parts[2] == 'studio':
+            return island.studio(mii_index)
+        raise NotFound(f"unknown endpoint {path}")
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so tools can reuse one connection
+    service = None  # MiiService, set by serve()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, body = 200, self.service.handle(url.path, query)
+        except NotFound as e:
+            status, body = 404, {'error': str(e)}
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': f"{type(e).__name__}: {e}"}
+        data = json_output.dumps(body, pretty=False)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the cost of a cached request
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)  # handlers expect a (host, port) client address
+
+
+def serve(service: MiiService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+          socket_path: Optional[str] = None):
+    """Serve until interrupted"""
+    # Headers and body go out in separate writes: without TCP_NODELAY every
+    # keep-alive request waits for the client's delayed ACK (~40 ms)
+    handler = type("Handler", (ServiceHandler,), {'service': service,
+                                                  'disable_nagle_algorithm': socket_path is None})
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        location = f"unix socket {socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        location = f"http://{host}:{server.server_port}"
+    print(f"Serving {len(service.saves())} save(s) on {location}, Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    argv = sys.argv[1:]
+    port = int(pop_option(argv, "--port", str(DEFAULT_PORT)))
+    host = pop_option(argv, "--host", "127.0.0.1")
+    socket_path = pop_option(argv, "--socket", None)
+    region = pop_option(argv, "--region", "EU")
+    max_miis = int(pop_option(argv, "--max-miis", "100"))
+    max_islands = int(pop_option(argv, "--max-islands", str(DEFAULT_MAX_ISLANDS)))
+    preload = pop_flag(argv, "--preload")
+
+    if not argv:
+        print("Usage: python mii_service.py <save files or folders...> [options]")
+        print(f"  --port / --host: Address to listen on (default: 127.0.0.1:{DEFAULT_PORT})")
+        print("  --socket PATH: Listen on a Unix socket instead")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --max-miis: Maximum number of Miis per save (default: 100)")
+        print(f"  --max-islands: Decoded saves kept in memory (default: {DEFAULT_MAX_ISLANDS})")
+        print("  --preload: Decode the saves at startup instead of on first request")
+        sys.exit(1)
+
+    cache = IslandCache(max_islands, region, max_miis)
+    service = MiiService(argv, cache)
+    print("=" * 70)
+    print("Tomodachi Life Data Extractor - Mii Service")
+    print("=" * 70)
+    if preload:
+        for save in service.saves()[:max_islands]:
+            cache.get(save)
+    serve(service, host, port, socket_path)
+
+
+if __name__ == "__main__":
+    main()
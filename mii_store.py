@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store of converted Miis, shared by every save.
+
+The same Mii turns up in many saves (QR Miis, transferred islands). Its Studio
+data and renders depend only on its 0x60 CFSD block, so each distinct Mii is
+converted and rendered once, stored under its mii_sysid, tomodachi_life_mii_sysid
+and a hash of that block:
+    <store>/<mii_sysid>/<key>/mii.mnms, face.png, body.png
+and hardlinked (or copied) into every Mii folder that needs it. index.json
+records which saves each stored Mii was seen in.
+
+Usage: python mii_store.py <save files or folders...> [--store DIR] [--region EU] [--max-miis N]
+       reports how many of the Miis in the saves are unique and how many are stored already
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
+
+from cli_options import find_saves, pop_option
+from convert_all_miis import convert_mii_data, get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor
+from render_cache import link_or_copy
+
+if TYPE_CHECKING:
+    from render_downloader import RenderDownloader
+
+MNMS_NAME = "mii.mnms"
+RENDER_NAMES = ("face.png", "body.png")
+
+
+def mii_key(raw: bytes, profile: Dict) -> str:
+    """Store key of a Mii: both system IDs plus a hash of its CFSD block"""
+    digest = hashlib.sha256(raw).hexdigest()[:24]
+    return f"{profile.get('mii_sysid', '')}-{profile.get('tomodachi_life_mii_sysid', '')}-{digest}"
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_file = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+
+class MiiStore:
+    def __init__(self, store_dir: Union[str, Path]):
+        self.store_dir = Path(store_dir)
+        self.index_file = self.store_dir / "index.json"
+        self.index = {}  # key -> {mii_sysid, tomodachi_life_mii_sysid, nickname, saves: [[save, mii index]]}
+        self.hits = 0  # Miis placed from an entry converted for another Mii
+        self.misses = 0  # entries converted and rendered
+        self._pending = {}  # key -> Event, entries being produced right now
+        self._lock = threading.Lock()
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f).get('miis', {})
+            except (ValueError, OSError):
+                self.index = {}
+
+    def entry_path(self, key: str) -> Path:
+        return self.store_dir / key.split('-', 1)[0] / key
+
+    def complete(self, key: str) -> bool:
+        """True once the entry has its .mnms and both renders"""
+        entry = self.entry_path(key)
+        return all((entry / name).exists() for name in (MNMS_NAME,) + RENDER_NAMES)
+
+    def provide(self, key: str, raw: bytes, downloader: "RenderDownloader",
+                converted: Optional[Tuple[bytes, str, str]] = None) -> bool:
+        """
+        Make sure the entry for key is complete, returns False if a render failed.
+        Only one thread produces a given entry; the others wait for it and share the result.
+        converted=(studio_data, face_url, body_url) saves converting raw again.
+        """
+        with self._lock:
+            event = self._pending.get(key)
+            if event is None:
+                if self.complete(key):
+                    self.hits += 1
+                    return True
+                event = self._pending[key] = threading.Event()
+                producer = True
+            else:
+                producer = False
+        if not producer:
+            event.wait()
+            with self._lock:
+                ok = self.complete(key)
+                self.hits += int(ok)
+            return ok
+        try:
+            return self._produce(key, raw, downloader, converted)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def _produce(self, key: str, raw: bytes, downloader: "RenderDownloader",
+                 converted: Optional[Tuple[bytes, str, str]]) -> bool:
+        entry = self.entry_path(key)
+        entry.mkdir(parents=True, exist_ok=True)
+        studio_data, face_url, body_url = converted or convert_mii_data(raw)
+        _write_atomic(entry / MNMS_NAME, studio_data)
+        ok = True
+        for url, name in zip((face_url, body_url), RENDER_NAMES):
+            if (entry / name).exists():
+                continue
+            # Downloaded next to the entry first, so an interrupted download never looks complete
+            tmp_file = entry / f"{name}.{threading.get_ident()}.tmp"
+            if downloader.download(url, tmp_file):
+                os.replace(tmp_file, entry / name)
+            else:
+                ok = False
+                if tmp_file.exists():
+                    tmp_file.unlink()
+        with self._lock:
+            self.misses += 1
+        return ok
+
+    def place(self, key: str, output, folder_name: str, mnms_name: str) -> int:
+        """Link (or write) an entry's files into an output backend, returns the number of renders placed"""
+        entry = self.entry_path(key)
+        images = 0
+        for source, name in ((MNMS_NAME, mnms_name), (RENDER_NAMES[0], f"{folder_name}/face.png"),
+                             (RENDER_NAMES[1], f"{folder_name}/body.png")):
+            source_path = entry / source
+            if not source_path.exists():
+                continue
+            path = output.path(name)
+            if path is not None:
+                link_or_copy(source_path, path)
+            else:
+                output.write(name, source_path.read_bytes())
+            images += int(source != MNMS_NAME)
+        return images
+
+    def record(self, key: str, profile: Dict, save_file: Union[str, Path], mii_index: int):
+        """Note that a save holds this Mii (kept in index.json)"""
+        seen = [str(Path(save_file).resolve()), mii_index]
+        with self._lock:
+            info = self.index.setdefault(key, {'mii_sysid': profile.get('mii_sysid'),
+                                               'tomodachi_life_mii_sysid': profile.get('tomodachi_life_mii_sysid'),
+                                               'nickname': profile.get('nickname'), 'saves': []})
+            if seen not in info['saves']:
+                info['saves'].append(seen)
+
+    def save_index(self):
+        """Write index.json atomically"""
+        with self._lock:
+            data = json.dumps({'miis': self.index}, ensure_ascii=False, indent=2)
+        _write_atomic(self.index_file, data.encode('utf-8'))
+
+
+def scan_saves(saves, region: str = "EU", max_miis: int = 100) -> Tuple[Counter, Dict[str, str]]:
+    """How often each store key occurs in the saves, and a nickname for each key"""
+    counts = Counter()
+    nicknames = {}
+    for save in saves:
+        extractor = CompleteMiiExtractor(str(save), region)
+        with open(save, 'rb') as f:
+            extractor.data = f.read()
+        names = extractor.read_mii_names()
+        for mii_index in range(max_miis):
+            # Same occupancy test as CompleteMiiExtractor.iter_miis
+            if mii_index in names or extractor._read_byte(0x1D80 + mii_index * 0x660) != 0:
+                offset = get_mii_offset(mii_index, region)
+                profile = extractor.read_profile(mii_index)
+                key = mii_key(extractor.data[offset:offset + 0x60], profile)
+                counts[key] += 1
+                nicknames.setdefault(key, profile['nickname'])
+    return counts, nicknames
+
+
+def main():
+    script_dir = Path(__file__).parent
+    argv = sys.argv[1:]
+    store_dir = Path(pop_option(argv, "--store", str(script_dir / ".mii_store")))
+    region = pop_option(argv, "--region", "EU")
+    max_miis = int(pop_option(argv, "--max-miis", "100"))
+
+    if not argv:
+        print("Usage: python mii_store.py <save files or folders...> [options]")
+        print("  --store DIR: Mii store folder (default: .mii_store next to this script)")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --max-miis: Maximum number of Miis per save (default: 100)")
+        sys.exit(1)
+
+    saves = find_saves(argv)
+    counts, nicknames = scan_saves(saves, region, max_miis)
+    store = MiiStore(store_dir)
+    total = sum(counts.values())
+    shared = [key for key, count in counts.items() if count > 1]
+    print("=" * 60)
+    print("Tomodachi Life Data Extractor - Mii Store")
+    print("=" * 60)
+    print(f"Saves: {len(saves)}, Miis: {total}, unique: {len(counts)}")
+    print(f"Miis in more than one place: {len(shared)} ({sum(counts[key] for key in shared)} copies)")
+    print(f"Already stored: {sum(1 for key in counts if store.complete(key))} of {len(counts)} "
+          f"(store: {store_dir}, {len(store.index)} Miis indexed)")
+    for key, count in counts.most_common(10):
+        if count < 2:
+            break
+        print(f"  {count:>4}x {key} ({nicknames[key]})")
+
+
+if __name__ == "__main__":
+    main()
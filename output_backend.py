@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Output backends for extracted Miis.
+
+FolderOutput is the default layout (one folder per Mii on disk). ArchiveOutput
+streams the same files into a single zip or tar archive as they are produced,
+which is much friendlier to object storage than thousands of small files. Zip
+members are stored uncompressed for images and .mnms files and deflated for
+JSON; the zip central directory (or the tar headers) can be listed without
+extracting anything.
+"""
+
+import io
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+ARCHIVE_FORMATS = {'zip': '.zip', 'tar': '.tar'}
+
+# Already compressed (or too small to benefit), stored as-is in zip archives
+STORED_SUFFIXES = ('.png', '.mnms')
+
+
+class FolderOutput:
+    """Default backend: files are written under a folder, one subfolder per Mii"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.location = self.root
+
+    def path(self, name: str) -> Optional[Path]:
+        """Local path for a member, so files can be written (or hardlinked) in place"""
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def write(self, name: str, data: bytes) -> int:
+        """Write one member, returns its size"""
+        with open(self.path(name), 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class ArchiveOutput:
+    """Streams every member into one zip or tar archive (thread-safe)"""
+
+    def __init__(self, archive_file: Union[str, Path], archive_format: str = 'zip'):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {archive_format} (use {', '.join(ARCHIVE_FORMATS)})")
+        self.location = Path(archive_file)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        self.archive_format = archive_format
+        self._lock = threading.Lock()
+        if archive_format == 'zip':
+            self._archive = zipfile.ZipFile(self.location, 'w', allowZip64=True)
+        else:
+            self._archive = tarfile.open(self.location, 'w', format=tarfile.PAX_FORMAT)
+
+    def path(self, name: str) -> Optional[Path]:
+        """Archive members have no local path; callers hand over bytes instead"""
+        return None
+
+    def write(self, name: str, data: bytes) -> int:
+        """Append one member, returns its (uncompressed) size"""
+        with self._lock:
+            if self.archive_format == 'zip':
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED if name.endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                self._archive.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                info.mode = 0o644
+                self._archive.addfile(info, io.BytesIO(data))
+        return len(data)
+
+    def close(self):
+        with self._lock:
+            self._archive.close()
+
+
+def open_output(output_folder: Union[str, Path], archive_format: Optional[str] = None):
+    """FolderOutput for output_folder, or an archive next to it (output_folder + .zip/.tar)"""
+    output_folder = Path(output_folder)
+    if archive_format is None:
+        return FolderOutput(output_folder)
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {archive_format} (use {', '.join(ARCHIVE_FORMATS)})")
+    return ArchiveOutput(output_folder.with_name(output_folder.name + ARCHIVE_FORMATS[archive_format]),
+                         archive_format)
+
+
+def list_archive(archive_file: Union[str, Path]) -> Dict[str, int]:
+    """Member names and sizes of an output archive, read from its index without extracting"""
+    archive_file = Path(archive_file)
+    if zipfile.is_zipfile(archive_file):
+        with zipfile.ZipFile(archive_file) as archive:
+            return {info.filename: info.file_size for info in archive.infolist()}
+    with tarfile.open(archive_file) as archive:
+        return {info.name: info.size for info in archive.getmembers()}
+
+
+def read_member(archive_file: Union[str, Path], name: str) -> bytes:
+    """Read a single member (e.g. _summary.json or one Mii's JSON) from an output archive"""
+    archive_file = Path(archive_file)
+    if zipfile.is_zipfile(archive_file):
+        with zipfile.ZipFile(archive_file) as archive:
+            return archive.read(name)
+    with tarfile.open(archive_file) as archive:
+        member = archive.extractfile(name)
+        if member is None:
+            raise KeyError(name)
+        return member.read()
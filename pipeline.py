@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Single-process streaming pipeline: extract -> convert -> download -> write.
+
+Each stage runs in its own worker thread(s) and hands Miis to the next stage
+through a bounded queue, so a Mii moves on as soon as it is decoded and the
+stages overlap across Miis instead of running one after the other.
+"""
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import json_output
+import profiling
+from checkpoint_journal import CheckpointJournal, load_mii_json, save_id
+from convert_all_miis import convert_mii_data, get_mii_offset
+from extract_full_mii_data import CompleteMiiExtractor, build_summary, mii_json_bytes, mii_json_name, safe_folder_name
+from mii_store import MiiStore, mii_key
+from output_backend import open_output
+from render_cache import RenderCache
+from render_downloader import DEFAULT_CONCURRENCY, RenderDownloader
+from text_index import TEXT_INDEX_NAME, build_text_index
+
+DEFAULT_QUEUE_SIZE = 16
+
+_DONE = object()
+
+
+class MiiJob:
+    """One Mii travelling through the pipeline"""
+
+    def __init__(self, mii_index: int, data: Dict, raw: bytes):
+        self.mii_index = mii_index
+        self.data = data
+        self.raw = raw
+        self.nickname = data.get('profile', {}).get('nickname', f'Mii_{mii_index}')
+        self.folder_name = safe_folder_name(self.nickname, mii_index)
+        self.mnms_name = f"{self.folder_name}/{self.folder_name.lower()}.mnms"
+        self.studio_data = None
+        self.face_url = None
+        self.body_url = None
+        self.images_ok = 0
+        self.error = None
+        self.reused = False  # completed by an earlier run (resume, watch mode)
+        self.store_key = None  # MiiStore key, when converted Miis are shared across saves
+        self.stored = False  # .mnms and renders placed from the Mii store
+
+
+class Stage:
+    """A pool of worker threads moving jobs from an inbox queue to an outbox queue"""
+
+    def __init__(self, name: str, func: Callable[[MiiJob], None], inbox: queue.Queue,
+                 outbox: Optional[queue.Queue] = None, workers: int = 1):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self._alive = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            job = self.inbox.get()
+            if job is _DONE:
+                # Let sibling workers see it too; the last one out closes the next stage
+                self.inbox.put(_DONE)
+                with self._lock:
+                    self._alive -= 1
+                    last = self._alive == 0
+                if last and self.outbox is not None:
+                    self.outbox.put(_DONE)
+                return
+
+            start = time.perf_counter()
+            if job.error is None:
+                try:
+                    self.func(job)
+                except Exception as e:
+                    job.error = f"{self.name} failed: {e}"
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - start
+                self.processed += 1
+            if self.outbox is not None:
+                self.outbox.put(job)
+
+
+def run_pipeline(save_file: str, output_folder: Path, region: str = "EU", max_miis: int = 100,
+                 concurrency: int = DEFAULT_CONCURRENCY, cache: Optional[RenderCache] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, journal: Optional[CheckpointJournal] = None,
+                 resume: bool = False, archive_format: Optional[str] = None, pretty: bool = True,
+                 compact: bool = False, previous: Optional[Tuple[str, Set[int]]] = None,
+                 store: Optional[MiiStore] = None) -> Dict:
+    """
+    Extract, convert and render every Mii of a save in one process, returns the summary.
+    Completed Miis are recorded in the journal; with resume, Miis the journal has
+    as complete (outputs intact) are kept instead of being processed again.
+    previous=(save id, unchanged Mii indexes) does the same across save versions:
+    Miis that did not change since that save keep the outputs it completed (watch mode).
+    With archive_format ('zip' or 'tar') everything goes into one archive next to
+    output_folder instead of per-Mii folders (no journal, nothing to resume).
+    pretty=False writes JSON without indentation, compact=True the compact output profile.
+    With a MiiStore, each distinct Mii is converted and rendered once across all saves
+    and its .mnms and renders are linked in from the store.
+    """
+    output = open_output(output_folder, archive_format)
+    if archive_format is not None:
+        journal = None
+        resume = False
+
+    extractor = CompleteMiiExtractor(save_file, region)
+    extractor.read_file()
+    all_data = {
+        'region': extractor.region,
+        'file_path': str(extractor.file_path),
+        'file_size': len(extractor.data),
+        'total_miis': 0,
+        'miis': {}
+    }
+    total_size = 0
+    success_count = 0
+    fail_count = 0
+    started = time.perf_counter()
+    save = save_id(save_file) if journal is not None else None
+    journal_stage = 'pipeline:compact' if compact else 'pipeline'
+    reused = set()
+
+    def reuse(mii_index: int) -> Optional[Dict]:
+        if journal is None:
+            return None
+        if resume and journal.is_done(save, mii_index, journal_stage):
+            source = save
+        elif (previous is not None and mii_index in previous[1]
+              and journal.is_done(previous[0], mii_index, journal_stage)):
+            source = previous[0]
+        else:
+            return None
+        outputs = journal.outputs(source, mii_index, journal_stage)
+        mii_data = load_mii_json(outputs[0], extractor.lookup_tables())
+        if mii_data is not None:
+            reused.add(mii_index)
+            if source != save:
+                # Carried over: the outputs now also stand for this version of the save
+                journal.record(save, mii_index, journal_stage, outputs)
+        return mii_data
+
+    def convert(job: MiiJob):
+        if job.reused:
+            return
+        if store is not None:
+            job.store_key = mii_key(job.raw, job.data.get('profile', {}))
+            if store.complete(job.store_key):
+                return  # converted and rendered for another save already
+        job.studio_data, job.face_url, job.body_url = convert_mii_data(job.raw)
+
+    def fetch_render(url: str, name: str) -> bool:
+        path = output.path(name)
+        if path is not None:
+            return downloader.download(url, path)
+        content = downloader.fetch(url, Path(name).name)
+        if content is None:
+            return False
+        output.write(name, content)
+        return True
+
+    def download(job: MiiJob):
+        if job.reused:
+            return
+        if store is not None:
+            converted = (job.studio_data, job.face_url, job.body_url) if job.studio_data is not None else None
+            store.provide(job.store_key, job.raw, downloader, converted)
+            job.images_ok = store.place(job.store_key, output, job.folder_name, job.mnms_name)
+            job.stored = True
+            store.record(job.store_key, job.data.get('profile', {}), save_file, job.mii_index)
+            return
+        job.images_ok = (int(fetch_render(job.face_url, f"{job.folder_name}/face.png")) +
+                         int(fetch_render(job.body_url, f"{job.folder_name}/body.png")))
+
+    def write(job: MiiJob):
+        nonlocal total_size, success_count, fail_count
+        all_data['miis'][str(job.mii_index)] = job.data
+        if job.reused:
+            total_size += journal.outputs(save, job.mii_index, journal_stage)[0].stat().st_size
+            success_count += 1
+            return
+        json_name = mii_json_name(job.mii_index, job.data)
+        total_size += output.write(json_name, mii_json_bytes(job.data, all_data, pretty, compact))
+        if job.studio_data is not None and not job.stored:
+            output.write(job.mnms_name, job.studio_data)
+
+        if job.error:
+            print(f"  ✗ Mii {job.mii_index} ({job.nickname}): {job.error}")
+            fail_count += 1
+        elif job.images_ok == 2:
+            print(f"  ✓ Mii {job.mii_index} ({job.nickname}): {job.folder_name}/ with .json, .mnms, face.png, body.png")
+            success_count += 1
+            if journal is not None:
+                journal.record(save, job.mii_index, journal_stage,
+                               [output.path(name) for name in (json_name, job.mnms_name,
+                                                               f"{job.folder_name}/face.png",
+                                                               f"{job.folder_name}/body.png")])
+        elif job.images_ok == 1:
+            print(f"  ⚠ Mii {job.mii_index} ({job.nickname}): some images failed to download")
+            success_count += 1  # Partial success
+        else:
+            print(f"  ✗ Mii {job.mii_index} ({job.nickname}): images failed to download")
+            fail_count += 1
+
+    convert_queue = queue.Queue(queue_size)
+    download_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+
+    profiling.stage('pipeline')
+    with RenderDownloader(concurrency, cache=cache) as downloader:
+        stages = [
+            Stage("convert", convert, convert_queue, download_queue),
+            Stage("download", download, download_queue, write_queue, workers=max(1, concurrency)),
+            Stage("write", write, write_queue)
+        ]
+        for stage in stages:
+            stage.start()
+
+        # Decode stage: runs on this thread and feeds the others as it goes
+        decode_seconds = 0.0
+        decode_start = time.perf_counter()
+        for mii_index, mii_data in extractor.iter_miis(max_miis, reuse if resume or previous else None):
+            offset = get_mii_offset(mii_index, region)
+            job = MiiJob(mii_index, mii_data, extractor.data[offset:offset + 0x60])
+            job.reused = mii_index in reused
+            decode_seconds += time.perf_counter() - decode_start
+            convert_queue.put(job)
+            decode_start = time.perf_counter()
+        convert_queue.put(_DONE)
+
+        for stage in stages:
+            stage.join()
+    if store is not None:
+        store.save_index()
+
+    # Summary lists Miis in save order even though downloads finish out of order
+    profiling.stage('summary')
+    all_data['miis'] = {key: all_data['miis'][key] for key in sorted(all_data['miis'], key=int)}
+    all_data['total_miis'] = len(all_data['miis'])
+    summary_data = build_summary(all_data, total_size, extractor.lookup_tables() if compact else None)
+    output.write("_summary.json", json_output.dumps(summary_data, pretty))
+    output.write(TEXT_INDEX_NAME, build_text_index(all_data))
+    output.close()
+    if journal is not None:
+        journal.compact({save})  # the folder now holds this save's outputs
+
+    elapsed = time.perf_counter() - started
+    if archive_format is not None:
+        print(f"\nArchive: {output.location}")
+    print(f"\nConverted: {success_count}, Failed: {fail_count}, Total: {all_data['total_miis']} in {elapsed:.2f}s")
+    if store is not None:
+        print(f"Mii store: {store.hits} shared, {store.misses} converted and rendered")
+    print("Stage busy time: " + ", ".join([f"decode {decode_seconds:.2f}s"] +
+                                          [f"{stage.name} {stage.busy_seconds:.2f}s" for stage in stages]))
+    return summary_data
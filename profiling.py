@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Built-in CPU profiler and memory tracer for the command-line entry points.
+
+--profile-out FILE runs the whole job under cProfile and writes the merged
+pstats to FILE (view with `python -m pstats FILE`). Worker threads started
+during the run get a profiler of their own that is merged in, and subprocesses
+launched through child_command() run under cProfile too, so their time ends
+up in the same file instead of disappearing behind the process boundary.
+
+--trace-memory starts tracemalloc and reports the peak traced memory and the
+top allocation sites of each stage. Stages are marked in the code with
+stage(name), which ends the previous stage; it does nothing unless tracing is on.
+
+cProfile, pstats and tracemalloc are only imported when one of the options is given.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from typing import Callable, List, Optional
+
+from cli_options import pop_flag, pop_option
+
+PROFILE_OPTION = "--profile-out"
+TRACE_OPTION = "--trace-memory"
+TOP_SITES = 5
+
+# Since Python 3.12 cProfile hooks sys.monitoring, which sees every thread but
+# allows only one active profiler, so per-thread profilers are not needed (or possible)
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+_profiler = None
+_tracer = None
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+class Profiler:
+    """cProfile for the main thread, threads started while it runs, and profiled child processes"""
+
+    def __init__(self):
+        import cProfile
+        self.main = cProfile.Profile()
+        self.thread_profiles = []
+        self.child_files = []
+        self._lock = threading.Lock()
+        self._original_run = None
+
+    def start(self):
+        import cProfile
+        if PER_THREAD_PROFILES:
+            original_run = self._original_run = threading.Thread.run
+            profiler = self
+
+            def run(thread):
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    original_run(thread)
+                finally:
+                    profile.disable()
+                    with profiler._lock:
+                        profiler.thread_profiles.append(profile)
+
+            threading.Thread.run = run
+        self.main.enable()
+
+    def stop(self):
+        self.main.disable()
+        if self._original_run is not None:
+            threading.Thread.run = self._original_run
+            self._original_run = None
+
+    def dump(self, path: str):
+        """Merge every profile into one pstats file, returns the pstats.Stats"""
+        import pstats
+        stats = pstats.Stats(self.main)
+        with self._lock:
+            for profile in self.thread_profiles:
+                stats.add(profile)
+        for child_file in self.child_files:
+            try:
+                stats.add(child_file)
+            except (OSError, EOFError, TypeError, ValueError):
+                pass  # the child died before writing its profile
+            finally:
+                if os.path.exists(child_file):
+                    os.unlink(child_file)
+        stats.dump_stats(path)
+        stats.files = [path]  # header for print_stats, instead of whichever child file came first
+        return stats
+
+
+class MemoryTracer:
+    """tracemalloc peaks and top allocation sites, per stage"""
+
+    def __init__(self, top: int = TOP_SITES):
+        self.top = top
+        self.stages = []  # (name, peak bytes, retained bytes, top StatisticDiffs)
+        self._current = None
+        self._snapshot = None
+        self._ignored_files = set()
+
+    def _own_allocation(self, diff) -> bool:
+        # Allocations made by the tracing and profiling machinery itself
+        filename = diff.traceback[0].filename
+        return filename in self._ignored_files or filename.startswith("<frozen importlib")
+
+    def start(self):
+        import cProfile
+        import pstats
+        import tracemalloc
+        self._ignored_files = {tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__}
+        tracemalloc.start()
+        self.stage("startup")
+
+    def stage(self, name: str):
+        """End the current stage and start a new one"""
+        import tracemalloc
+        self.finish()
+        self._current = name
+        self._snapshot = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def finish(self):
+        import tracemalloc
+        if self._current is None:
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        diffs = [diff for diff in after.compare_to(self._snapshot, 'lineno') if not self._own_allocation(diff)]
+        retained = sum(diff.size_diff for diff in diffs)
+        self.stages.append((self._current, peak, retained, diffs[:self.top]))
+        self._current = None
+        self._snapshot = None
+
+    def stop(self):
+        import tracemalloc
+        self.finish()
+        tracemalloc.stop()
+
+    def report(self) -> str:
+        lines = ["Memory by stage (tracemalloc):"]
+        for name, peak, retained, diffs in self.stages:
+            lines.append(f"  {name}: peak {_mb(peak)}, {'+' if retained >= 0 else '-'}{_mb(abs(retained))} retained")
+            for diff in diffs:
+                if diff.size_diff == 0:
+                    continue
+                frame = diff.traceback[0]
+                lines.append(f"    {diff.size_diff / 1024:+10.1f} KB  {os.path.basename(frame.filename)}:{frame.lineno}"
+                             f" ({diff.count_diff:+,} blocks)")
+        return "\n".join(lines)
+
+
+def stage(name: str):
+    """Mark the start of a stage for --trace-memory (ends the previous one)"""
+    if _tracer is None:
+        return
+    if _profiler is not None:
+        _profiler.main.disable()  # keep the snapshots out of the profile
+    _tracer.stage(name)
+    if _profiler is not None:
+        _profiler.main.enable()
+
+
+def child_command(command: List[str]) -> List[str]:
+    """
+    Rewrite a [python, script, args...] command so the child process is profiled
+    as well when --profile-out is active; returns the command unchanged otherwise.
+    """
+    if _profiler is None or len(command) < 2 or command[0] != sys.executable:
+        return command
+    fd, path = tempfile.mkstemp(prefix="child-", suffix=".prof")
+    os.close(fd)
+    _profiler.child_files.append(path)
+    return [command[0], "-m", "cProfile", "-o", path] + list(command[1:])
+
+
+def run_main(main: Callable[[], None], argv: Optional[List[str]] = None):
+    """Run an entry point's main(), honouring --profile-out FILE and --trace-memory"""
+    global _profiler, _tracer
+    argv = sys.argv if argv is None else argv
+    profile_out = pop_option(argv, PROFILE_OPTION, None)
+    trace_memory = pop_flag(argv, TRACE_OPTION)
+    if not profile_out and not trace_memory:
+        return main()
+
+    if trace_memory:
+        _tracer = MemoryTracer()
+        _tracer.start()
+    if profile_out:
+        _profiler = Profiler()
+        _profiler.start()
+    try:
+        return main()
+    finally:
+        # Also reached on sys.exit(), so a failing run still leaves its profile behind
+        if _profiler is not None:
+            _profiler.stop()
+        if _tracer is not None:
+            _tracer.stop()
+        if _profiler is not None:
+            stats = _profiler.dump(profile_out)
+            _profiler = None
+            print(f"\nProfile written to: {profile_out} (view with: python -m pstats {profile_out})")
+            stats.sort_stats("cumulative").print_stats(15)
+        if _tracer is not None:
+            print("\n" + _tracer.report())
+            _tracer = None
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Relationship graph of one or many islands, read straight from the save.
+
+The relationship block at 0x299F0 holds one 0x100-byte row per Mii: 100
+relationship values followed (at +0x64) by 100 relationship types. Every
+island of a batch goes into one CSR adjacency (node = island * 100 + slot)
+held in flat arrays, so degree stats, connected components, reciprocity
+against the transpose and BFS are linear passes over a few buffers instead
+of walks over per-Mii dicts. Each island is also kept as a dense 100 x 100
+block, whose columns are the rows of the transpose, sliced in C. Only occupied
+slots are nodes; cells pointing at empty slots or at the Mii itself are
+counted but left out of the graph.
+
+Usage: python relationship_graph.py <save files or folders...> [--region EU] [--top N]
+                                    [--from A --to B] [--json FILE]
+"""
+
+import operator
+import sys
+import time
+from array import array
+from collections import deque
+from itertools import compress
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import json_output
+from cli_options import find_saves, pop_option
+from extract_full_mii_data import RELATIONSHIP_TYPES, CompleteMiiExtractor
+
+SLOTS = 100  # columns of a relationship row, and nodes per island
+RELATIONSHIP_BASE = 0x299F0
+ROW_SIZE = 0x100
+TYPES_OFFSET = 0x64
+
+_ONES = bytes.maketrans(bytes(range(256)), b"\x00" + b"\x01" * 255)  # any non-zero byte -> 1
+_DIGITS = bytes.maketrans(b"\x00\x01", b"01")  # 0/1 bytes -> '0'/'1', for int(..., 2)
+
+
+def _bits(cells: bytes) -> int:
+    """0/1 bytes as an int with bit i set for cells[i]"""
+    return int(cells.translate(_DIGITS)[::-1], 2)
+
+
+class RelationshipGraph:
+    """CSR adjacency of the relationships of a batch of islands"""
+
+    def __init__(self):
+        self.islands = []  # island names, island i owns nodes i * SLOTS ... i * SLOTS + 99
+        self.names = []  # nickname of every node ('' for empty slots)
+        self.occupied = bytearray()
+        self.indptr = array('L', [0])  # row u is indices[indptr[u]:indptr[u + 1]], sorted by target
+        self.indices = array('L')
+        self.values = array('B')
+        self.types = array('B')
+        # The same edges as one dense SLOTS x SLOTS block per island (0/1 cells, values, types);
+        # block[slot::SLOTS] is a row of the transpose, sliced in C
+        self.cell_blocks = []
+        self.value_blocks = []
+        self.type_blocks = []
+        self.dangling = 0  # cells pointing at empty slots
+        self.self_loops = 0
+        self._transpose = None
+
+    @classmethod
+    def from_saves(cls, saves: List, region: str = "EU") -> 'RelationshipGraph':
+        graph = cls()
+        for save in saves:
+            with open(save, 'rb') as f:
+                graph.add_island(f.read(), Path(save).name, region)
+        return graph
+
+    @property
+    def node_count(self) -> int:
+        return len(self.islands) * SLOTS
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def add_island(self, data: bytes, name: str, region: str = "EU"):
+        """Append the relationship rows of one save"""
+        extractor = CompleteMiiExtractor(name, region)
+        extractor.data = data
+        names = extractor.read_mii_names()
+        base = len(self.islands) * SLOTS
+        occupied = bytearray(SLOTS)
+        for slot in range(SLOTS):
+            # Same occupancy test as CompleteMiiExtractor.iter_miis
+            occupied[slot] = slot in names or extractor._read_byte(0x1D80 + slot * 0x660) != 0
+            self.names.append(names.get(slot, ''))
+        self.islands.append(name)
+        self.occupied += occupied
+
+        empty = bytes(SLOTS)
+        cell_rows, value_rows, type_rows = [], [], []
+        for slot in range(SLOTS):
+            cells = values = types = empty
+            if occupied[slot]:
+                row = RELATIONSHIP_BASE + slot * ROW_SIZE
+                values = data[row:row + SLOTS].ljust(SLOTS, b'\0')
+                types = data[row + TYPES_OFFSET:row + TYPES_OFFSET + SLOTS].ljust(SLOTS, b'\0')
+                cells = bytes(map(operator.or_, values, types)).translate(_ONES)
+                present = SLOTS - cells.count(0)
+                self_loop = cells[slot]
+                self.self_loops += self_loop
+                keep = bytearray(occupied)
+                keep[slot] = 0
+                cells = bytes(map(operator.and_, cells, keep))
+                self.dangling += present - (SLOTS - cells.count(0)) - self_loop
+                values = bytes(map(operator.mul, values, cells))
+                types = bytes(map(operator.mul, types, cells))
+                # compress() keeps the entries whose cell is 1, in C
+                self.indices.extend(compress(range(base, base + SLOTS), cells))
+                self.values.extend(compress(values, cells))
+                self.types.extend(compress(types, cells))
+            self.indptr.append(len(self.indices))
+            cell_rows.append(cells)
+            value_rows.append(values)
+            type_rows.append(types)
+        self.cell_blocks.append(b''.join(cell_rows))
+        self.value_blocks.append(b''.join(value_rows))
+        self.type_blocks.append(b''.join(type_rows))
+        self._transpose = None
+
+    def node(self, island: int, slot: int) -> int:
+        return island * SLOTS + slot
+
+    def label(self, node: int) -> str:
+        island, slot = divmod(node, SLOTS)
+        name = self.names[node] or f"Mii {slot}"
+        return f"{self.islands[island]}/{name}" if len(self.islands) > 1 else name
+
+    def neighbors(self, node: int) -> array:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def out_degrees(self) -> array:
+        indptr = self.indptr
+        return array('L', map(operator.sub, indptr[1:], indptr[:-1]))
+
+    def in_degrees(self) -> array:
+        """Non-empty cells of each column of the dense blocks"""
+        return array('L', [SLOTS - block[slot::SLOTS].count(0)
+                           for block in self.cell_blocks for slot in range(SLOTS)])
+
+    def transpose(self) -> Tuple[array, array, array, array]:
+        """(indptr, indices, values, types) of the transposed adjacency, read off the dense columns"""
+        if self._transpose is None:
+            indptr, indices, values, types = array('L', [0]), array('L'), array('B'), array('B')
+            for island, cells in enumerate(self.cell_blocks):
+                base = island * SLOTS
+                value_block, type_block = self.value_blocks[island], self.type_blocks[island]
+                for slot in range(SLOTS):
+                    column = cells[slot::SLOTS]
+                    indices.extend(compress(range(base, base + SLOTS), column))
+                    values.extend(compress(value_block[slot::SLOTS], column))
+                    types.extend(compress(type_block[slot::SLOTS], column))
+                    indptr.append(len(indices))
+            self._transpose = (indptr, indices, values, types)
+        return self._transpose
+
+    def degree_stats(self, top: int = 10) -> Dict:
+        """Out/in degree distribution over occupied Miis and the most connected ones"""
+        out_degrees, in_degrees = self.out_degrees(), self.in_degrees()
+        nodes = [node for node in range(self.node_count) if self.occupied[node]]
+        if not nodes:
+            return {'miis': 0}
+        total = sorted(nodes, key=lambda node: out_degrees[node] + in_degrees[node], reverse=True)
+        return {
+            'miis': len(nodes),
+            'mean_out_degree': sum(out_degrees[node] for node in nodes) / len(nodes),
+            'max_out_degree': max(out_degrees[node] for node in nodes),
+            'max_in_degree': max(in_degrees[node] for node in nodes),
+            'isolated': sum(1 for node in nodes if out_degrees[node] + in_degrees[node] == 0),
+            'most_connected': [{'mii': self.label(node), 'out': out_degrees[node], 'in': in_degrees[node]}
+                               for node in total[:top]],
+        }
+
+    def components(self) -> List[List[int]]:
+        """
+        Weakly connected components of occupied Miis, largest first. Each island is
+        searched on 100-bit adjacency masks (row | column), one OR per visited Mii.
+        """
+        components = []
+        for island, cells in enumerate(self.cell_blocks):
+            base = island * SLOTS
+            adjacency = [_bits(cells[slot * SLOTS:(slot + 1) * SLOTS]) | _bits(cells[slot::SLOTS])
+                         for slot in range(SLOTS)]
+            remaining = _bits(bytes(self.occupied[base:base + SLOTS]))
+            while remaining:
+                component = frontier = remaining & -remaining
+                while frontier:
+                    reached = 0
+                    while frontier:
+                        lowest = frontier & -frontier
+                        reached |= adjacency[lowest.bit_length() - 1]
+                        frontier ^= lowest
+                    frontier = reached & ~component
+                    component |= frontier
+                remaining &= ~component
+                components.append([base + slot for slot in range(SLOTS) if component >> slot & 1])
+        return sorted(components, key=len, reverse=True)
+
+    def reciprocity(self, examples: int = 10) -> Dict:
+        """
+        Compare every row with the same row of the transpose (a column of the
+        dense block): pairs that point at each other, one-sided relationships,
+        and mutual pairs whose two sides disagree on the type.
+        """
+        mutual = mismatched = value_gap = 0  # every mutual pair is seen from both of its rows
+        mismatch_examples = []
+        for island, cells in enumerate(self.cell_blocks):
+            base = island * SLOTS
+            value_block, type_block = self.value_blocks[island], self.type_blocks[island]
+            for slot in range(SLOTS):
+                row = slice(slot * SLOTS, (slot + 1) * SLOTS)
+                both = bytes(map(operator.and_, cells[row], cells[slot::SLOTS]))
+                count = SLOTS - both.count(0)
+                if not count:
+                    continue
+                mutual += count
+                value_gap += sum(map(operator.mul, both,
+                                     map(abs, map(operator.sub, value_block[row], value_block[slot::SLOTS]))))
+                differ = bytes(map(operator.and_, both, map(operator.ne, type_block[row], type_block[slot::SLOTS])))
+                mismatched += SLOTS - differ.count(0)
+                if len(mismatch_examples) < examples:
+                    for target in compress(range(SLOTS), differ):
+                        if slot < target:
+                            mismatch_examples.append((base + slot, base + target,
+                                                      type_block[row][target], type_block[slot::SLOTS][target]))
+        edges = self.edge_count
+        mutual //= 2
+        return {
+            'edges': edges,
+            'mutual_pairs': mutual,
+            'one_sided': edges - 2 * mutual,
+            'reciprocity': (2 * mutual / edges) if edges else 0.0,
+            'mean_value_gap': (value_gap / 2 / mutual) if mutual else 0.0,
+            'type_mismatches': mismatched // 2,
+            'mismatch_examples': [{'a': self.label(a), 'b': self.label(b),
+                                   'a_says': RELATIONSHIP_TYPES.get(a_type, f"Unknown ({a_type})"),
+                                   'b_says': RELATIONSHIP_TYPES.get(b_type, f"Unknown ({b_type})")}
+                                  for a, b, a_type, b_type in mismatch_examples[:examples]],
+        }
+
+    def shortest_path(self, source: int, target: int, undirected: bool = False) -> Optional[List[int]]:
+        """BFS over the CSR rows (and the transpose when undirected), None if unreachable"""
+        t_indptr, t_indices = self.transpose()[:2] if undirected else (None, None)
+        previous = {source: source}
+        frontier = deque([source])
+        while frontier:
+            node = frontier.popleft()
+            if node == target:
+                path = [node]
+                while node != source:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1]
+            neighbors = self.neighbors(node)
+            if undirected:
+                neighbors = list(neighbors) + list(t_indices[t_indptr[node]:t_indptr[node + 1]])
+            for neighbor in neighbors:
+                if neighbor not in previous:
+                    previous[neighbor] = node
+                    frontier.append(neighbor)
+        return None
+
+    def edge_type(self, source: int, target: int) -> str:
+        rel_type = self.types[self.indptr[source] + list(self.neighbors(source)).index(target)]
+        return RELATIONSHIP_TYPES.get(rel_type, f"Unknown ({rel_type})")
+
+
+def _find_mii(graph: RelationshipGraph, value: str) -> int:
+    """Node of a Mii of the first island, by slot number or nickname"""
+    if value.isdigit():
+        if int(value) >= SLOTS:
+            raise ValueError(f"slot {value} is out of range (0-{SLOTS - 1})")
+        return graph.node(0, int(value))
+    for slot in range(SLOTS):
+        if graph.names[slot].lower() == value.lower():
+            return slot
+    raise ValueError(f"no Mii named {value} in {graph.islands[0]}")
+
+
+def main():
+    argv = sys.argv[1:]
+    region = pop_option(argv, "--region", "EU")
+    top = int(pop_option(argv, "--top", "10"))
+    path_from = pop_option(argv, "--from", None)
+    path_to = pop_option(argv, "--to", None)
+    json_file = pop_option(argv, "--json", None)
+
+    if not argv or (path_from is None) != (path_to is None):
+        print("Usage: python relationship_graph.py <save files or folders...> [options]")
+        print("  --region: EU, US, JP, or KR (default: EU)")
+        print("  --top N: Number of most connected Miis to list (default: 10)")
+        print("  --from A --to B: Shortest relationship path between two Miis of the first save")
+        print("                   (slot numbers or nicknames)")
+        print("  --json: Also write the statistics to a JSON file")
+        sys.exit(1)
+
+    saves = find_saves(argv)
+    started = time.perf_counter()
+    graph = RelationshipGraph.from_saves(saves, region)
+    built = time.perf_counter() - started
+    degrees = graph.degree_stats(top)
+    components = graph.components()
+    reciprocity = graph.reciprocity(top)
+    elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"Relationship graph: {len(graph.islands)} island(s), {degrees['miis']} Miis, {graph.edge_count} relationships")
+    print("=" * 60)
+    print(f"Built in {built * 1000:.1f} ms, analysed in {(elapsed - built) * 1000:.1f} ms")
+    if graph.dangling or graph.self_loops:
+        print(f"Left out: {graph.dangling} pointing at empty slots, {graph.self_loops} pointing at the Mii itself")
+    if degrees['miis']:
+        print(f"\nDegree: mean {degrees['mean_out_degree']:.1f} out, max {degrees['max_out_degree']} out / "
+              f"{degrees['max_in_degree']} in, {degrees['isolated']} without relationships")
+        print("Most connected:")
+        for entry in degrees['most_connected']:
+            print(f"  {entry['mii']}: {entry['out']} out, {entry['in']} in")
+    sizes = [len(component) for component in components]
+    print(f"\nComponents: {len(components)} (largest {sizes[:5]})")
+    print(f"Reciprocity: {reciprocity['reciprocity']:.1%} "
+          f"({reciprocity['mutual_pairs']} mutual pairs, {reciprocity['one_sided']} one-sided, "
+          f"mean value gap {reciprocity['mean_value_gap']:.1f})")
+    print(f"Type mismatches in mutual pairs: {reciprocity['type_mismatches']}")
+    for mismatch in reciprocity['mismatch_examples']:
+        print(f"  {mismatch['a']} says {mismatch['a_says']}, {mismatch['b']} says {mismatch['b_says']}")
+
+    result = {'islands': graph.islands, 'edges': graph.edge_count, 'dangling': graph.dangling,
+              'self_loops': graph.self_loops, 'degrees': degrees, 'component_sizes': sizes,
+              'reciprocity': reciprocity}
+
+    if path_from is not None:
+        try:
+            source, target = _find_mii(graph, path_from), _find_mii(graph, path_to)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        path = graph.shortest_path(source, target)
+        if path is None:
+            print(f"\nNo relationship path from {graph.label(source)} to {graph.label(target)}")
+        else:
+            steps = [graph.label(path[0])]
+            for a, b in zip(path, path[1:]):
+                steps.append(f"-({graph.edge_type(a, b)})-> {graph.label(b)}")
+            print(f"\nShortest path ({len(path) - 1} step(s)): " + " ".join(steps))
+        result['path'] = None if path is None else [graph.label(node) for node in path]
+
+    if json_file:
+        json_output.dump(result, json_file)
+        print(f"✓ Statistics written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for Mii Studio render images.
+
+Render URLs are a pure function of the encoded Studio data and the
+type/width/instanceCount parameters, so the SHA-256 of the full URL is used as
+the cache key. Entries are kept in least-recently-used order in index.json and
+evicted once the cache grows past its size limit. Cached images are hardlinked
+into the Mii folders (copied when hardlinks are not possible).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def url_key(url: str) -> str:
+    """Cache key for a render URL"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def link_or_copy(source: Path, dest: Path):
+    """Hardlink source to dest, falling back to a copy (other filesystem, no link support)"""
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+class RenderCache:
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_file = self.cache_dir / "index.json"
+        self.entries = OrderedDict()  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _load_index(self):
+        """Load the LRU index, rebuilding it from the files on disk if it is missing or stale"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        order = []
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    order = json.load(f).get('entries', [])
+            except (ValueError, OSError):
+                order = []
+        if not order:
+            # Oldest modification time first
+            files = sorted(self.cache_dir.glob("*/*.png"), key=lambda p: p.stat().st_mtime)
+            order = [p.stem for p in files]
+        for key in order:
+            path = self._entry_path(key)
+            if path.exists():
+                size = path.stat().st_size
+                self.entries[key] = size
+                self.total_bytes += size
+
+    def save_index(self):
+        """Write the LRU index atomically"""
+        with self._lock:
+            data = {'max_bytes': self.max_bytes, 'total_bytes': self.total_bytes, 'entries': list(self.entries)}
+        tmp_file = self.index_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, self.index_file)
+
+    def fetch(self, url: str, dest: Path) -> bool:
+        """Place the cached image for url at dest, returns False on a cache miss"""
+        key = url_key(url)
+        with self._lock:
+            if key not in self.entries:
+                self.misses += 1
+                return False
+            self.entries.move_to_end(key)
+        path = self._entry_path(key)
+        try:
+            link_or_copy(path, Path(dest))
+        except FileNotFoundError:
+            # Removed behind our back, treat as a miss
+            with self._lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def read(self, url: str) -> Optional[bytes]:
+        """Cached image bytes for url, None on a cache miss"""
+        key = url_key(url)
+        with self._lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def store(self, url: str, content: bytes, dest: Optional[Path] = None):
+        """Add an image to the cache (and place it at dest)"""
+        key = url_key(url)
+        path = self._entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_file = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_file, path)
+
+        with self._lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+            self.entries[key] = len(content)
+            self.total_bytes += len(content)
+            self._evict()
+
+        if dest is not None:
+            if path.exists():
+                link_or_copy(path, Path(dest))
+            else:
+                # Evicted straight away (larger than the whole cache)
+                with open(dest, 'wb') as f:
+                    f.write(content)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (lock held)"""
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
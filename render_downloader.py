@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Concurrent Mii Studio render downloads over a pooled HTTP session
+(requests is only imported once a session is created)
+"""
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+from fetch_scheduler import DEFAULT_RATE, DEFAULT_RETRIES, FetchError, FetchScheduler
+from render_cache import RenderCache
+
+DEFAULT_CONCURRENCY = 8
+
+
+def create_session(pool_size: int = DEFAULT_CONCURRENCY) -> "requests.Session":
+    """Create a session whose connection pool can keep one connection per worker alive"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RenderDownloader:
+    """
+    Downloads render images with a shared keep-alive session and a bounded thread pool.
+    Requests go through a FetchScheduler (rate limit, retries, deadlines).
+    With a RenderCache, cached renders are linked into place without any request.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = 30,
+                 session: Optional["requests.Session"] = None, cache: Optional[RenderCache] = None,
+                 rate: float = DEFAULT_RATE, max_retries: int = DEFAULT_RETRIES,
+                 scheduler: Optional[FetchScheduler] = None):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.session = session or create_session(self.concurrency)
+        self.cache = cache
+        self.scheduler = scheduler or FetchScheduler(self.session, rate=rate, max_retries=max_retries,
+                                                     timeout=timeout, max_in_flight=self.concurrency)
+        self.stats = self.scheduler.stats
+
+    def download(self, url: str, output_path: Path) -> bool:
+        """Download one image from URL and save to file"""
+        if self.cache is not None and self.cache.fetch(url, output_path):
+            return True
+        try:
+            content = self.scheduler.fetch(url)
+
+            if self.cache is not None:
+                self.cache.store(url, content, output_path)
+            else:
+                with open(output_path, 'wb') as f:
+                    f.write(content)
+
+            return True
+        except (FetchError, OSError) as e:
+            print(f"    ✗ Failed to download {Path(output_path).name}: {e}")
+            return False
+
+    def fetch(self, url: str, name: str = "render") -> Optional[bytes]:
+        """Get one image's bytes (from the cache when possible), None if the download failed"""
+        if self.cache is not None:
+            content = self.cache.read(url)
+            if content is not None:
+                return content
+        try:
+            content = self.scheduler.fetch(url)
+            if self.cache is not None:
+                self.cache.store(url, content)
+            return content
+        except (FetchError, OSError) as e:
+            print(f"    ✗ Failed to download {name}: {e}")
+            return None
+
+    def _download_job(self, url: str, path: Path, on_done: Optional[Callable[[Path, bool], None]]) -> bool:
+        ok = self.download(url, path)
+        if on_done is not None:
+            on_done(Path(path), ok)
+        return ok
+
+    def download_all(self, jobs: List[Tuple[str, Path]], max_queued: Optional[int] = None,
+                     on_done: Optional[Callable[[Path, bool], None]] = None) -> Dict[Path, bool]:
+        """
+        Download (url, output_path) jobs concurrently, returns {output_path: success}.
+        At most max_queued jobs (default 4x concurrency) are submitted ahead of the
+        workers, so a slow network holds back the producer instead of piling up work.
+        on_done(output_path, success) is called from the worker as each job finishes.
+        """
+        if not jobs:
+            return {}
+        from concurrent.futures import ThreadPoolExecutor
+        slots = threading.BoundedSemaphore(max_queued or self.concurrency * 4)
+        futures = []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(jobs))) as pool:
+            for url, path in jobs:
+                slots.acquire()
+                future = pool.submit(self._download_job, url, path, on_done)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append((Path(path), future))
+            return {path: future.result() for path, future in futures}
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
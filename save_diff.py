@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Block-level diff of two Tomodachi Life saves (e.g. two snapshots of the same island).
+
+Each Mii slot is split into the regions the extractor reads: the profile block
+(profile, status, personality), the food block, the relationship row and the
+CFSD appearance block. Regions are compared as memoryviews, so an unchanged
+slot costs a few memcmp calls, and only regions that differ get decoded.
+Changed fields are reported with their old and new values, changed
+relationship cells as value/type transitions.
+
+Usage: python save_diff.py <old_save> <new_save> [region] [max_miis] [--json FILE]
+"""
+
+import sys
+import time
+from typing import Any, Dict, Iterator, Tuple, Union
+
+import json_output
+from cli_options import pop_option
+from extract_full_mii_data import RELATIONSHIP_TYPES, CompleteMiiExtractor
+
+MII_BLOCK_SIZE = 0x660
+RELATIONSHIP_ROW_SIZE = 0x100
+CFSD_SIZE = 0x60
+
+SaveInput = Union[str, bytes, bytearray, memoryview]
+
+
+def mii_regions(extractor: CompleteMiiExtractor, mii_index: int) -> Dict[str, Tuple[int, int]]:
+    """(offset, size) of each region of one Mii slot, as read by the extractor"""
+    profile_base = extractor.get_base_offset(mii_index)
+    food_base = extractor.get_food_offset(mii_index)
+    return {
+        'profile': (profile_base - 0x1A, MII_BLOCK_SIZE),  # 0x1C70 for mii 0, covers status and personality
+        'food': (food_base - 0x26, 0x26 + 0xE),  # checktummy ... last current favorite
+        'relationships': (0x299F0 + mii_index * RELATIONSHIP_ROW_SIZE, RELATIONSHIP_ROW_SIZE),
+        'appearance': (extractor.get_cfsd_offset(mii_index), CFSD_SIZE),
+    }
+
+
+def _load(save: SaveInput, region: str) -> CompleteMiiExtractor:
+    if isinstance(save, (bytes, bytearray, memoryview)):
+        extractor = CompleteMiiExtractor("<memory>", region)
+        extractor.data = bytes(save)
+    else:
+        extractor = CompleteMiiExtractor(save, region)
+        with open(save, 'rb') as f:
+            extractor.data = f.read()
+    return extractor
+
+
+def _nickname(extractor: CompleteMiiExtractor, mii_index: int) -> str:
+    return extractor._read_unicode_string(extractor.get_base_offset(mii_index), 10)
+
+
+def _occupied(extractor: CompleteMiiExtractor, mii_index: int) -> bool:
+    """Same test as CompleteMiiExtractor.iter_miis: a nickname or a non-zero energy byte"""
+    name = _nickname(extractor, mii_index)
+    return bool(name and name.strip()) or extractor._read_byte(0x1D80 + mii_index * 0x660) != 0
+
+
+def _flatten(data: Dict, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """Dotted paths to the leaf values of a section (food {id, name} entries count as one value)"""
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and not ('id' in value and 'name' in value):
+            yield from _flatten(value, path + ".")
+        else:
+            yield path, value
+
+
+def _describe(value: Any) -> str:
+    if isinstance(value, dict) and 'id' in value and 'name' in value:
+        return f"{value['name']} (#{value['id']})"
+    return repr(value) if isinstance(value, str) else str(value)
+
+
+class SaveDiff:
+    """Result of diff_saves(): slot changes, field changes and relationship transitions"""
+
+    def __init__(self, region: str):
+        self.region = region
+        self.identical = False
+        self.added = []  # slots occupied only in the new save
+        self.removed = []  # slots occupied only in the old save
+        self.changes = []  # {'mii_index', 'nickname', 'field', 'old', 'new'}
+        self.relationships = []  # {'mii_index', 'target', 'old_value', 'new_value', 'old_type', 'new_type'}
+        self.regions_compared = 0
+        self.regions_changed = 0
+        self.seconds = 0.0
+        self.names = {}  # nicknames in the new save, for the report
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changes or self.relationships)
+
+    def to_dict(self) -> Dict:
+        return {
+            'region': self.region,
+            'identical': self.identical,
+            'added': self.added,
+            'removed': self.removed,
+            'changes': self.changes,
+            'relationships': self.relationships,
+            'regions_compared': self.regions_compared,
+            'regions_changed': self.regions_changed,
+        }
+
+    def report(self) -> str:
+        names = self.names
+        lines = []
+        for mii_index in self.added:
+            lines.append(f"+ Mii {mii_index} ({names.get(mii_index, '?')}) added")
+        for mii_index in self.removed:
+            lines.append(f"- Mii {mii_index} removed")
+        current = None
+        for change in self.changes:
+            if change['mii_index'] != current:
+                current = change['mii_index']
+                lines.append(f"Mii {current} ({change['nickname']}):")
+            if change['field'] == 'appearance':
+                lines.append(f"  appearance: {change['changed_bytes']} byte(s) of the Mii data changed")
+            else:
+                lines.append(f"  {change['field']}: {_describe(change['old'])} -> {_describe(change['new'])}")
+        if self.relationships:
+            lines.append("Relationships:")
+        for rel in self.relationships:
+            old_type = RELATIONSHIP_TYPES.get(rel['old_type'], f"Unknown ({rel['old_type']})")
+            new_type = RELATIONSHIP_TYPES.get(rel['new_type'], f"Unknown ({rel['new_type']})")
+            source = names.get(rel['mii_index'], f"Mii {rel['mii_index']}")
+            target = names.get(rel['target'], f"Mii {rel['target']}")
+            lines.append(f"  {source} -> {target}: {old_type} {rel['old_value']} -> {new_type} {rel['new_value']}")
+        return "\n".join(lines)
+
+
+def diff_saves(a: SaveInput, b: SaveInput, region: str = "EU", max_miis: int = 100) -> SaveDiff:
+    """
+    Compare two saves (paths or bytes) region by region and decode only what differs.
+    Returns a SaveDiff; bool(diff) is False when nothing the extractor reads has changed.
+    """
+    started = time.perf_counter()
+    old, new = _load(a, region), _load(b, region)
+    diff = SaveDiff(old.region)
+    if old.data == new.data:
+        diff.identical = True
+        diff.seconds = time.perf_counter() - started
+        return diff
+
+    old_view, new_view = memoryview(old.data), memoryview(new.data)
+    for mii_index in range(max_miis):
+        changed = []
+        for name, (offset, size) in mii_regions(old, mii_index).items():
+            diff.regions_compared += 1
+            if old_view[offset:offset + size] != new_view[offset:offset + size]:
+                changed.append(name)
+        if not changed:
+            continue
+        diff.regions_changed += len(changed)
+
+        was_occupied, is_occupied = _occupied(old, mii_index), _occupied(new, mii_index)
+        if was_occupied != is_occupied:
+            (diff.added if is_occupied else diff.removed).append(mii_index)
+            continue
+        if not is_occupied:
+            continue  # bytes of an empty slot
+
+        regions = mii_regions(old, mii_index)
+        nickname = _nickname(new, mii_index)
+        sections = []
+        if 'profile' in changed:
+            sections += [('profile', CompleteMiiExtractor.read_profile),
+                         ('status', CompleteMiiExtractor.read_status),
+                         ('personality', CompleteMiiExtractor.read_personality)]
+        if 'food' in changed:
+            sections.append(('food_preferences', CompleteMiiExtractor.read_food_preferences))
+        for section, read in sections:
+            before = dict(_flatten(read(old, mii_index), section + "."))
+            for field, value in _flatten(read(new, mii_index), section + "."):
+                if before.get(field) != value:
+                    diff.changes.append({'mii_index': mii_index, 'nickname': nickname, 'field': field,
+                                         'old': before.get(field), 'new': value})
+
+        if 'appearance' in changed:
+            offset, size = regions['appearance']
+            old_block, new_block = bytes(old_view[offset:offset + size]), bytes(new_view[offset:offset + size])
+            diff.changes.append({'mii_index': mii_index, 'nickname': nickname, 'field': 'appearance',
+                                 'old': old_block.hex(), 'new': new_block.hex(),
+                                 'changed_bytes': sum(1 for x, y in zip(old_block, new_block) if x != y)})
+
+        if 'relationships' in changed:
+            offset, size = regions['relationships']
+            # Padded like relationship_graph.add_island: bytes past the end of a shorter save read as 0
+            old_row = bytes(old_view[offset:offset + size]).ljust(size, b'\0')
+            new_row = bytes(new_view[offset:offset + size]).ljust(size, b'\0')
+            for target in range(100):
+                old_value, new_value = old_row[target], new_row[target]
+                old_type, new_type = old_row[0x64 + target], new_row[0x64 + target]
+                if old_value != new_value or old_type != new_type:
+                    diff.relationships.append({'mii_index': mii_index, 'target': target,
+                                               'old_value': old_value, 'new_value': new_value,
+                                               'old_type': old_type, 'new_type': new_type})
+
+    if diff.added or diff.relationships:
+        diff.names = new.read_mii_names()
+    diff.seconds = time.perf_counter() - started
+    return diff
+
+
+def main():
+    argv = sys.argv[1:]
+    json_file = pop_option(argv, "--json", None)
+    if len(argv) < 2:
+        print("Usage: python save_diff.py <old_save> <new_save> [region] [max_miis] [--json FILE]")
+        print("  old_save, new_save: Two saves of the same island")
+        print("  region: Optional - EU, US, JP, or KR (default: EU)")
+        print("  max_miis: Optional - Number of Mii slots to compare (default: 100)")
+        print("  --json: Optional - Also write the changes to a JSON file")
+        sys.exit(1)
+
+    region = argv[2] if len(argv) > 2 else "EU"
+    max_miis = int(argv[3]) if len(argv) > 3 else 100
+    diff = diff_saves(argv[0], argv[1], region, max_miis)
+
+    if diff.identical:
+        print("✓ Saves are identical")
+    elif not diff:
+        print(f"✓ No Mii data changed ({diff.regions_compared} regions compared, "
+              f"changes are outside the Mii data)")
+    else:
+        print(diff.report())
+        print(f"\n{len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changes)} field changes, "
+              f"{len(diff.relationships)} relationship changes "
+              f"({diff.regions_changed}/{diff.regions_compared} regions differ)")
+    print(f"Compared in {diff.seconds * 1000:.2f} ms")
+
+    if json_file:
+        json_output.dump(diff.to_dict(), json_file)
+        print(f"✓ Changes written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
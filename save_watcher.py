@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Watch the SaveFile folder for updated saves (extract_and_convert_all.py --watch).
+
+SaveWatcher reports a save once it has been written and left alone for the
+debounce time, so a save that is still being copied is never picked up half
+written. It uses inotify on Linux and falls back to polling sizes and mtimes
+elsewhere (or with poll=True, e.g. for network shares inotify can't see).
+
+SaveSnapshot keeps a hash of every region of every Mii slot (the regions
+save_diff.py compares), so the next version of the save only needs the Miis
+whose blocks changed to be processed again.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
+
+from extract_full_mii_data import CompleteMiiExtractor
+from save_diff import RELATIONSHIP_ROW_SIZE, mii_regions
+
+SAVE_PATTERNS = ('*.txt', '*.sav')
+DEFAULT_DEBOUNCE = 0.3  # seconds without writes before a save counts as complete
+DEFAULT_POLL_INTERVAL = 0.25
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) of a file, None if it is gone"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class _Inotify:
+    """Names of files written or moved into a folder, from the kernel"""
+
+    def __init__(self, folder: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(folder)), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, length = IN_EVENT.unpack_from(buffer, offset)
+            offset += IN_EVENT.size
+            names.add(os.fsdecode(buffer[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Polling:
+    """Names of files whose size or mtime changed since the last look"""
+
+    def __init__(self, folder: Path, interval: float):
+        self.folder = folder
+        self.interval = interval
+        self.seen = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        seen = {}
+        for path in self.folder.iterdir():
+            signature = _signature(path)
+            if signature is not None:
+                seen[path.name] = signature
+        return seen
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        names = {name for name, signature in current.items() if self.seen.get(name) != signature}
+        self.seen = current
+        return names
+
+    def close(self):
+        pass
+
+
+class SaveWatcher:
+    """Yields save files in a folder as they land, once they stopped changing"""
+
+    def __init__(self, folder: Union[str, Path], patterns: Tuple[str, ...] = SAVE_PATTERNS,
+                 debounce: float = DEFAULT_DEBOUNCE, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 poll: bool = False):
+        self.folder = Path(folder)
+        self.patterns = patterns
+        self.debounce = debounce
+        self.backend = None
+        if not poll:
+            try:
+                self.backend = _Inotify(self.folder)
+            except (OSError, AttributeError):
+                pass  # not Linux, or out of watches
+        if self.backend is None:
+            self.backend = _Polling(self.folder, poll_interval)
+        self.method = "inotify" if isinstance(self.backend, _Inotify) else f"polling every {poll_interval}s"
+
+    def _wanted(self, name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns)
+
+    def changes(self) -> Iterator[Path]:
+        """Block and yield each save that was written, debounced (runs until interrupted)"""
+        pending = {}  # name -> (time of the last write, signature at that time)
+        while True:
+            for name in self.backend.wait(self.debounce if pending else None):
+                if self._wanted(name):
+                    pending[name] = (time.monotonic(), _signature(self.folder / name))
+            now = time.monotonic()
+            for name, (last_write, signature) in list(pending.items()):
+                if now - last_write < self.debounce:
+                    continue
+                current = _signature(self.folder / name)
+                if current is None:
+                    del pending[name]  # deleted or moved away again
+                elif current != signature:
+                    pending[name] = (now, current)  # written without an event reaching us yet
+                else:
+                    del pending[name]
+                    yield self.folder / name
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SaveSnapshot:
+    """Block hashes of every Mii slot in one version of a save"""
+
+    def __init__(self, save_file: Union[str, Path], region: str = "EU", max_miis: int = 100):
+        with open(save_file, 'rb') as f:
+            data = f.read()
+        self.path = Path(save_file).resolve()
+        self.size = len(data)
+        self.save = hashlib.sha256(data).hexdigest()[:16]  # same id as checkpoint_journal.save_id
+        extractor = CompleteMiiExtractor(str(save_file), region)
+        extractor.data = data
+        view = memoryview(data)
+        self.blocks = {}  # mii index -> region hashes
+        for mii_index in range(max_miis):
+            self.blocks[mii_index] = tuple(hashlib.blake2b(view[offset:offset + size], digest_size=16).digest()
+                                           for offset, size in mii_regions(extractor, mii_index).values())
+        self.names = extractor.read_mii_names()
+        self.targets = {}  # mii index -> Miis its relationship row points at
+        for mii_index in range(max_miis):
+            row = 0x299F0 + mii_index * RELATIONSHIP_ROW_SIZE
+            values, types = data[row:row + 100], data[row + 0x64:row + 0xC8]
+            self.targets[mii_index] = {target for target in range(len(values))
+                                       if values[target] or (target < len(types) and types[target])}
+
+    def unchanged_since(self, previous: Optional['SaveSnapshot']) -> Set[int]:
+        """
+        Mii slots whose outputs for the previous snapshot still hold: none of
+        their blocks changed and none of their relationship targets was renamed.
+        Empty when the save was replaced by another file or its size changed,
+        since every Mii's JSON records the save's path and size.
+        """
+        if previous is None or previous.path != self.path or previous.size != self.size:
+            return set()
+        renamed = {mii_index for mii_index in set(self.names) | set(previous.names)
+                   if self.names.get(mii_index) != previous.names.get(mii_index)}
+        return {mii_index for mii_index, blocks in self.blocks.items()
+                if previous.blocks.get(mii_index) == blocks and not self.targets[mii_index] & renamed}
@@ -0,0 +1,58 @@
+"""AsyncRunner on synthetic saves: a failing stage must not hang the run, and outputs never collide"""
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from async_runner import AsyncRunner, output_names
+from synthetic_save import write_save
+
+
+class _BrokenDownloads(AsyncRunner):
+    def _fetch_render(self, state, url, name):
+        raise RuntimeError("render server gone")
+
+
+class AsyncRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        self.save = write_save(self.out / "saves" / "savedataArc.txt", slots=3, density=1.0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_saves(self, runner: AsyncRunner, saves):
+        try:
+            return asyncio.run(asyncio.wait_for(runner.run(saves, max_miis=3), timeout=60))
+        finally:
+            runner.close()
+
+    def test_failing_downloads_still_finish_the_save(self):
+        runner = _BrokenDownloads(decode_workers=1, convert_workers=1, download_concurrency=2, report_interval=60)
+        states = self.run_saves(runner, [(str(self.save), self.out / "save", "EU")])
+        self.assertEqual((states[0].success_count, states[0].fail_count, states[0].error), (0, 3, None))
+        self.assertTrue((self.out / "save" / "_summary.json").exists())
+
+    def test_failing_output_marks_the_save_failed(self):
+        blocker = self.out / "blocker"
+        blocker.write_bytes(b"")  # a file where the output folder should go
+        runner = AsyncRunner(decode_workers=1, convert_workers=1, report_interval=60)
+        states = self.run_saves(runner, [(str(self.save), blocker / "save", "EU")])
+        self.assertIn("decode failed", states[0].error)
+        self.assertEqual(states[0].success_count, 0)
+
+    def test_output_names_are_unique(self):
+        saves = [Path("a/savedataArc.txt"), Path("b/savedataArc.txt"), Path("c/other.sav"),
+                 Path("a/savedataArc.sav")]
+        self.assertEqual(output_names(saves), ["a_savedataArc", "b_savedataArc", "other", "a_savedataArc_2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
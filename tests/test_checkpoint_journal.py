@@ -0,0 +1,75 @@
+"""CheckpointJournal: resume checks and compaction once a save is finished"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from checkpoint_journal import JOURNAL_NAME, CheckpointJournal
+
+
+class CheckpointJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        self.path = self.out / JOURNAL_NAME
+        self.output = self.out / "mii.json"
+        self.output.write_text("{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reopen(self, resume: bool = True) -> CheckpointJournal:
+        journal = CheckpointJournal(self.path, resume)
+        journal.close()  # nothing recorded, so the file is left as it is
+        return journal
+
+    def lines(self) -> int:
+        return len(self.path.read_text(encoding='utf-8').splitlines())
+
+    def test_resume_checks_outputs(self):
+        journal = CheckpointJournal(self.path)
+        journal.record("save", 0, "extract", [self.output])
+        journal.close()
+        self.assertTrue(self.reopen().is_done("save", 0, "extract"))
+        self.assertFalse(self.reopen(resume=False).is_done("save", 0, "extract"))
+        self.output.write_text("changed")
+        self.assertFalse(self.reopen().is_done("save", 0, "extract"))
+
+    def test_repeated_runs_do_not_grow_the_journal(self):
+        for _ in range(5):
+            journal = CheckpointJournal(self.path)
+            for mii in range(3):
+                journal.record("save", mii, "extract", [self.output])
+            journal.close()
+        self.assertEqual(self.lines(), 3)
+
+    def test_compact_keeps_only_the_finished_save(self):
+        journal = CheckpointJournal(self.path)
+        journal.record("old", 0, "pipeline", [self.output])
+        journal.record("new", 0, "pipeline", [self.output])
+        journal.record("new", 0, "convert", [self.output])
+        journal.compact({"new"})
+        journal.record("new", 1, "pipeline", [self.output])  # still appends after compacting
+        self.assertFalse(journal.is_done("old", 0, "pipeline"))
+        journal.close()
+        self.assertEqual(self.lines(), 3)
+        self.assertEqual(sorted(self.reopen().units), [("new", 0, "convert"), ("new", 0, "pipeline"),
+                                                 ("new", 1, "pipeline")])
+
+    def test_other_stages_of_the_save_survive_a_run_without_resume(self):
+        journal = CheckpointJournal(self.path)
+        journal.record("save", 0, "extract", [self.output])
+        journal.close()
+        journal = CheckpointJournal(self.path)
+        journal.record("save", 0, "render", [self.output])
+        journal.close()
+        self.assertEqual(sorted(self.reopen().units),
+                         [("save", 0, "extract"), ("save", 0, "render")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""FetchScheduler, TokenBucket and FetchStats against the local render stand-in (429s, 5xx and latency)"""
+
+import sys
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from fetch_scheduler import LATENCY_BUCKETS_MS, FetchError, FetchScheduler, FetchStats, TokenBucket
+from render_downloader import create_session
+from render_stand_in import StandInServer
+
+
+class FetchSchedulerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer().start()
+        cls.session = create_session(8)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.session.close()
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+
+    def scheduler(self, **options) -> FetchScheduler:
+        options = {'rate': 0, 'backoff_base': 0.01, 'backoff_max': 0.05, **options}
+        return FetchScheduler(self.session, **options)
+
+    def flaky(self, suffix: str = "", **query) -> str:
+        """A /flaky URL whose failure count is this test's own"""
+        key = self.id().rsplit('.', 1)[-1] + suffix
+        return self.server.url(f"flaky/{key}?" + "&".join(f"{name}={value}" for name, value in query.items()))
+
+    def test_429_with_retry_after_waits_at_least_that_long(self):
+        scheduler = self.scheduler()
+        started = time.monotonic()
+        content = scheduler.fetch(self.flaky(fail=2, status=429, retry_after=0.2, size=100))
+        elapsed = time.monotonic() - started
+        self.assertEqual(len(content), 100)
+        self.assertGreaterEqual(elapsed, 0.4)
+        stats = scheduler.stats.to_dict()
+        self.assertEqual((stats['attempts'], stats['retries'], stats['successes'], stats['failures']), (3, 2, 1, 0))
+        self.assertEqual(stats['status_counts'], {'429': 2, '200': 1})
+        self.assertEqual(stats['bytes'], 100 + 2 * len(b'error'))
+
+    def test_429_without_retry_after_uses_backoff(self):
+        scheduler = self.scheduler()
+        started = time.monotonic()
+        scheduler.fetch(self.flaky(fail=3, status=429))
+        # Three backoffs of at most backoff_max each
+        self.assertLess(time.monotonic() - started, 3 * 0.05 + 0.5)
+        self.assertEqual((scheduler.stats.attempts, scheduler.stats.retries), (4, 3))
+
+    def test_5xx_is_retried(self):
+        for status in (500, 502, 503, 504):
+            scheduler = self.scheduler()
+            scheduler.fetch(self.flaky(str(status), fail=1, status=status))
+            self.assertEqual(scheduler.stats.status_counts, {str(status): 1, '200': 1})
+            self.assertEqual(scheduler.stats.retries, 1)
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = self.scheduler(max_retries=2)
+        with self.assertRaises(FetchError) as raised:
+            scheduler.fetch(self.flaky(fail=10, status=503))
+        self.assertIn("gave up after 3 attempts", str(raised.exception))
+        self.assertEqual((scheduler.stats.attempts, scheduler.stats.retries, scheduler.stats.failures), (3, 2, 1))
+
+    def test_other_errors_fail_without_retry(self):
+        scheduler = self.scheduler()
+        with self.assertRaises(FetchError):
+            scheduler.fetch(self.server.url("status/404"))
+        self.assertEqual((scheduler.stats.attempts, scheduler.stats.retries, scheduler.stats.failures), (1, 0, 1))
+
+    def test_deadline_stops_retrying(self):
+        scheduler = self.scheduler(deadline=0.5)
+        started = time.monotonic()
+        with self.assertRaises(FetchError) as raised:
+            scheduler.fetch(self.flaky(fail=10, status=429, retry_after=1))
+        self.assertIn("deadline passed", str(raised.exception))
+        # The 1 s Retry-After would overrun the deadline, so it gives up without sleeping
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual((scheduler.stats.attempts, scheduler.stats.retries), (1, 0))
+
+    def test_slow_responses_time_out_and_count_as_errors(self):
+        scheduler = self.scheduler(timeout=0.1, max_retries=1)
+        with self.assertRaises(FetchError):
+            scheduler.fetch(self.server.render_urls(1, delay=0.5)[0])
+        self.assertEqual(scheduler.stats.status_counts, {'error': 2})
+        self.assertEqual(scheduler.stats.retries, 1)
+
+    def test_backoff_bounds(self):
+        scheduler = self.scheduler(backoff_base=0.5, backoff_max=4.0)
+        for attempt in range(8):
+            delays = [scheduler._backoff(attempt, None) for _ in range(200)]
+            bound = min(4.0, 0.5 * 2 ** attempt)
+            self.assertGreaterEqual(min(delays), 0)
+            self.assertLessEqual(max(delays), bound)
+            self.assertGreater(max(delays), bound / 2)  # full jitter spreads over the whole range
+        self.assertGreaterEqual(scheduler._backoff(0, "2"), 2.0)
+        self.assertLessEqual(scheduler._backoff(0, "soon"), 0.5)
+
+    def test_rate_limit(self):
+        scheduler = self.scheduler(rate=20, burst=1)
+        started = time.monotonic()
+        for url in self.server.render_urls(11):
+            scheduler.fetch(url)
+        elapsed = time.monotonic() - started
+        # One token up front, then one every 50 ms
+        self.assertGreaterEqual(elapsed, 10 / 20 - 0.02)
+        arrivals = self.server.arrivals
+        gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        self.assertGreaterEqual(min(gaps), 1 / 20 - 0.01)
+
+    def test_latency_histogram(self):
+        scheduler = self.scheduler()
+        scheduler.fetch(self.server.render_urls(1, delay=0)[0])
+        scheduler.fetch(self.server.render_urls(1, delay=0.15)[0])
+        histogram = scheduler.stats.to_dict()['latency_histogram']
+        self.assertEqual(len(histogram), len(LATENCY_BUCKETS_MS) + 1)
+        self.assertEqual(histogram['<=50ms'], 1)
+        self.assertEqual(histogram['<=250ms'], 1)
+        self.assertEqual(sum(histogram.values()), 2)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=5)
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.01)
+        for _ in range(10):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 10 / 50 - 0.01)
+
+    def test_deadline(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(deadline=time.monotonic() + 0.1))
+
+    def test_zero_rate_never_waits(self):
+        bucket = TokenBucket(rate=0)
+        self.assertTrue(all(bucket.acquire(deadline=time.monotonic()) for _ in range(100)))
+
+
+class FetchStatsTest(unittest.TestCase):
+    def test_counters_and_buckets(self):
+        stats = FetchStats()
+        for latency, status, size in ((0.01, 200, 10), (0.05, 429, 0), (0.3, None, 0), (20.0, 200, 5)):
+            stats.record_attempt(latency, status, size)
+        stats.record_retry()
+        stats.record_result(True)
+        stats.record_result(False)
+        data = stats.to_dict()
+        self.assertEqual((data['attempts'], data['retries'], data['successes'], data['failures'], data['bytes']),
+                         (4, 1, 1, 1, 15))
+        self.assertEqual(data['status_counts'], {'200': 2, '429': 1, 'error': 1})
+        histogram = data['latency_histogram']
+        self.assertEqual((histogram['<=50ms'], histogram['<=500ms'], histogram['>10000ms']), (2, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
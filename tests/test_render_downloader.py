@@ -0,0 +1,75 @@
+"""RenderDownloader against the local render stand-in: pooled connections and the concurrency cap"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from render_downloader import RenderDownloader
+from render_stand_in import StandInServer
+
+
+class RenderDownloaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _jobs(self, count, delay=0.02, size=1000):
+        return [(url, self.out / f"{i}.png") for i, url in enumerate(self.server.render_urls(count, delay, size))]
+
+    def test_downloads_reuse_pooled_connections(self):
+        jobs = self._jobs(40)
+        with RenderDownloader(concurrency=4, rate=0) as downloader:
+            results = downloader.download_all(jobs)
+        self.assertTrue(all(results.values()))
+        self.assertEqual(len(results), 40)
+        self.assertTrue(all(path.stat().st_size == 1000 for _, path in jobs))
+        self.assertEqual(self.server.total_requests(), 40)
+        # One keep-alive connection per worker at most, not one per download
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_concurrency_caps_requests_in_flight(self):
+        for concurrency in (1, 3, 6):
+            self.server.reset()
+            with RenderDownloader(concurrency=concurrency, rate=0) as downloader:
+                downloader.download_all(self._jobs(concurrency * 5, delay=0.05))
+            self.assertLessEqual(self.server.peak_in_flight, concurrency)
+            self.assertEqual(self.server.peak_in_flight, concurrency)
+
+    def test_failed_download_reported_without_file(self):
+        missing = self.out / "missing.png"
+        jobs = self._jobs(3) + [(self.server.url("status/404"), missing)]
+        finished = []
+        with RenderDownloader(concurrency=2, rate=0) as downloader:
+            results = downloader.download_all(jobs, on_done=lambda path, ok: finished.append((path, ok)))
+        self.assertEqual(results[missing], False)
+        self.assertFalse(missing.exists())
+        self.assertEqual(sum(results.values()), 3)
+        self.assertEqual(sorted(finished), sorted(results.items()))
+
+    def test_fetch_returns_bytes(self):
+        with RenderDownloader(concurrency=1, rate=0) as downloader:
+            content = downloader.fetch(self.server.render_urls(1, size=321)[0])
+            self.assertEqual(len(content), 321)
+            self.assertTrue(content.startswith(b'\x89PNG'))
+            self.assertIsNone(downloader.fetch(self.server.url("status/404")))
+
+
+if __name__ == "__main__":
+    unittest.main()
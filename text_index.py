@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the names, pronunciations and catchphrases of extracted Miis.
+
+Every extraction writes _text_index.bin next to _summary.json. Each distinct
+string is normalized (NFKC, case folded, accents dropped, hiragana folded to
+katakana, whitespace collapsed) and the 3 characters starting at each of its
+positions (fewer at the end) point at the string; each string points at the
+(Mii, field) pairs using it. A term of up to 3 characters is the range of
+grams starting with it, a longer one intersects its trigrams (rarest first)
+and checks the few strings left. Japanese and Korean text needs no word
+splitting this way, and かな matches カナ.
+
+All terms of a query must match. Results are ranked by the field they matched
+(nickname first, catchphrases last) and how well: the whole string, the start
+of a word, or anywhere, with shorter strings ahead of longer ones.
+
+    python text_index.py search "ぴか" extracted_miis
+    python text_index.py search "hello wor" all_saves.bin --prefix --top 20
+
+Usage: python text_index.py build <index file> <extraction folders or index files...>
+       python text_index.py search <query> <extraction folders or index files...> [--prefix] [--top N] [--json FILE]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import json_output
+from cli_options import pop_flag, pop_option
+
+TEXT_INDEX_NAME = "_text_index.bin"
+INDEX_VERSION = 1
+
+# (field name, section of the Mii JSON, ranking weight)
+TEXT_FIELDS = (
+    ('nickname', 'profile', 10),
+    ('firstname', 'profile', 8),
+    ('lastname', 'profile', 8),
+    ('pronunciation_nickname', 'profile', 6),
+    ('pronunciation_firstname', 'profile', 5),
+    ('pronunciation_lastname', 'profile', 5),
+    ('catchphrase', 'catchphrases', 3),
+    ('happy_phrase', 'catchphrases', 2),
+    ('sad_phrase', 'catchphrases', 2),
+    ('mad_phrase', 'catchphrases', 2),
+    ('worried_phrase', 'catchphrases', 2),
+)
+FIELD_NAMES = [name for name, _, _ in TEXT_FIELDS]
+GRAM = 3
+
+_KATAKANA = {code: code + 0x60 for code in list(range(0x3041, 0x3097)) + [0x309D, 0x309E]}
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Search form of a string: width, case, accents, hiragana/katakana and spacing folded"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    # Only Latin-style combining accents are dropped; dakuten and Hangul recompose under NFC
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if not 0x300 <= ord(c) <= 0x36F)
+    text = unicodedata.normalize('NFC', text).translate(_KATAKANA)
+    return _SPACES.sub(' ', text).strip()
+
+
+def grams(text: str) -> Set[str]:
+    """The GRAM characters starting at each position; every shorter substring is a prefix of one"""
+    return {text[start:start + GRAM] for start in range(len(text))}
+
+
+def mii_texts(mii_data: Dict) -> Iterator[Tuple[int, str]]:
+    """(field number, text) of every non-empty text field of a Mii's JSON"""
+    sections = {'profile': mii_data.get('profile', {}),
+                'catchphrases': mii_data.get('status', {}).get('catchphrases', {})}
+    for field, (name, section, _) in enumerate(TEXT_FIELDS):
+        text = sections[section].get(name)
+        if isinstance(text, str) and text.strip():
+            yield field, text
+
+
+def _match_quality(term: str, text: str, prefix: bool) -> int:
+    """3 for the whole string, 2 for the start of a word, 1 anywhere, 0 for no (prefix) match"""
+    if text == term:
+        return 3
+    if text.startswith(term) or f" {term}" in text:
+        return 2
+    return int(not prefix and term in text)
+
+
+class TextIndex:
+    def __init__(self):
+        self.sources = []  # save file path of each extraction
+        self.docs = []  # [source number, Mii index, nickname]
+        self.strings = []  # distinct original strings
+        self.occurrences = []  # string id -> doc * len(TEXT_FIELDS) + field (array while building)
+        self.postings = {}  # gram -> string ids (built) or (start, end) into self.posting_ids (loaded)
+        self.posting_ids = array('I')
+        self._gram_list = None  # sorted grams, for prefix ranges
+        self._string_ids = {}  # original string -> id, while building
+        self._normalized = {}  # string id -> normalized string, filled on demand
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_source(self, source: str) -> int:
+        self.sources.append(source)
+        return len(self.sources) - 1
+
+    def add_mii(self, source: int, mii_index: int, nickname: str, texts):
+        """Index one Mii's (field number, text) pairs"""
+        doc = len(self.docs)
+        self.docs.append([source, mii_index, nickname])
+        for field, text in texts:
+            string = self._string_ids.get(text)
+            if string is None:
+                string = self._string_ids[text] = len(self.strings)
+                self.strings.append(text)
+                self.occurrences.append(array('I'))
+                for gram in grams(normalize(text)):
+                    self.postings.setdefault(gram, array('I')).append(string)
+                self._gram_list = None
+            self.occurrences[string].append(doc * len(TEXT_FIELDS) + field)
+
+    def add_extraction(self, all_data: Dict):
+        """Index every Mii of an extraction (all_data as built by the extractor)"""
+        source = self.add_source(all_data['file_path'])
+        for mii_id, mii_data in all_data['miis'].items():
+            self.add_mii(source, int(mii_id), mii_data.get('profile', {}).get('nickname', f'Mii_{mii_id}'),
+                         mii_texts(mii_data))
+
+    def add_index(self, other: "TextIndex"):
+        """Merge a loaded index into this one"""
+        sources = [self.add_source(source) for source in other.sources]
+        texts = [[] for _ in other.docs]
+        for string, text in enumerate(other.strings):
+            for occurrence in other.occurrences[string]:
+                doc, field = divmod(occurrence, len(TEXT_FIELDS))
+                texts[doc].append((field, text))
+        for (source, mii_index, nickname), doc_texts in zip(other.docs, texts):
+            self.add_mii(sources[source], mii_index, nickname, sorted(doc_texts))
+
+    def to_bytes(self) -> bytes:
+        """One JSON header line, then the strings, grams, posting and occurrence arrays (little-endian)"""
+        gram_list = sorted(self.postings)
+        posting_ids, gram_ends = array('I'), array('I')
+        for gram in gram_list:
+            posting_ids.extend(self._gram_ids(gram))
+            gram_ends.append(len(posting_ids))
+        occurrences, string_ends = array('I'), array('I')
+        for string in range(len(self.strings)):
+            occurrences.extend(self.occurrences[string])
+            string_ends.append(len(occurrences))
+        sections = [self._text_blob(self.strings), self._text_blob(gram_list)]
+        for numbers in (gram_ends, posting_ids, string_ends, occurrences):
+            if sys.byteorder == 'big':
+                numbers.byteswap()
+            sections.append(numbers.tobytes())
+        header = {'version': INDEX_VERSION, 'fields': FIELD_NAMES, 'sources': self.sources, 'docs': self.docs,
+                  'sections': [len(section) for section in sections]}
+        return json.dumps(header, ensure_ascii=True).encode('ascii') + b'\n' + b''.join(sections)
+
+    @staticmethod
+    def _text_blob(texts: List[str]) -> bytes:
+        return '\0'.join(texts).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = "index") -> "TextIndex":
+        end = data.index(b'\n')
+        header = json.loads(data[:end])
+        if header.get('version') != INDEX_VERSION or header.get('fields') != FIELD_NAMES:
+            raise ValueError(f"{name} was built by another version, build it again")
+        sections = []
+        start = end + 1
+        for size in header['sections']:
+            sections.append(data[start:start + size])
+            start += size
+        strings_blob, grams_blob, *numbers = sections
+        gram_ends, posting_ids, string_ends, occurrences = [array('I', section) for section in numbers]
+        if sys.byteorder == 'big':
+            for section in (gram_ends, posting_ids, string_ends, occurrences):
+                section.byteswap()
+        index = cls()
+        index.sources = header['sources']
+        index.docs = header['docs']
+        index.strings = strings_blob.decode('utf-8').split('\0') if string_ends else []
+        gram_list = grams_blob.decode('utf-8').split('\0') if gram_ends else []
+        index.postings = dict(zip(gram_list, zip([0] + gram_ends[:-1].tolist(), gram_ends)))
+        index._gram_list = gram_list
+        index.posting_ids = posting_ids
+        starts = [0] + string_ends[:-1].tolist()
+        index.occurrences = [occurrences[start:end] for start, end in zip(starts, string_ends)]
+        return index
+
+    @classmethod
+    def load(cls, path: Path) -> "TextIndex":
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read(), str(path))
+
+    def save(self, path: Path):
+        """Write the index atomically"""
+        tmp_file = path.with_name(path.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_file, path)
+
+    def _gram_ids(self, gram: str):
+        ids = self.postings.get(gram)
+        if ids is None:
+            return ()
+        if isinstance(ids, tuple):
+            return self.posting_ids[ids[0]:ids[1]]
+        return ids
+
+    def normalized(self, string: int) -> str:
+        text = self._normalized.get(string)
+        if text is None:
+            text = self._normalized[string] = normalize(self.strings[string])
+        return text
+
+    def _term_strings(self, term: str) -> List[int]:
+        """Ids of the strings whose normalized form contains term"""
+        if len(term) < GRAM:
+            if self._gram_list is None:
+                self._gram_list = sorted(self.postings)
+            start = bisect_left(self._gram_list, term)
+            end = bisect_left(self._gram_list, term + '\U0010FFFF')
+            return sorted(set().union(*(self._gram_ids(gram) for gram in self._gram_list[start:end])))
+        if len(term) == GRAM:
+            return list(self._gram_ids(term))
+        postings = sorted((self._gram_ids(term[start:start + GRAM]) for start in range(len(term) - GRAM + 1)),
+                          key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(ids)
+        return [string for string in sorted(candidates) if term in self.normalized(string)]
+
+    def search(self, query: str, top: Optional[int] = 10, prefix: bool = False) -> List[Tuple[float, int, List]]:
+        """
+        Ranked (score, doc, [(field, text)]) of the Miis matching every term of query.
+        With prefix, a term only matches at the start of a word.
+        """
+        terms = normalize(query).split(' ')
+        if not terms[0]:
+            return []
+        scores = None  # doc -> score so far
+        matched = {}  # doc -> {(field, string)}
+        for term in dict.fromkeys(terms):
+            term_scores = {}
+            for string in self._term_strings(term):
+                text = self.normalized(string)
+                quality = _match_quality(term, text, prefix)
+                if not quality:
+                    continue
+                # Whole string beats word start beats anywhere; shorter strings rank ahead within each
+                quality += len(term) / len(text)
+                for occurrence in self.occurrences[string]:
+                    doc, field = divmod(occurrence, len(TEXT_FIELDS))
+                    if scores is not None and doc not in scores:
+                        continue
+                    score = TEXT_FIELDS[field][2] * quality
+                    if score > term_scores.get(doc, 0):
+                        term_scores[doc] = score
+                    matched.setdefault(doc, set()).add((field, string))
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if top is not None:
+            ranked = ranked[:top]
+        return [(round(score, 3), doc, [(FIELD_NAMES[field], self.strings[string])
+                                        for field, string in sorted(matched[doc])])
+                for doc, score in ranked]
+
+    def describe(self, doc: int) -> Dict:
+        source, mii_index, nickname = self.docs[doc]
+        return {'save': self.sources[source], 'mii_index': mii_index, 'nickname': nickname}
+
+
+def build_text_index(all_data: Dict) -> bytes:
+    """_text_index.bin contents for one extraction"""
+    index = TextIndex()
+    index.add_extraction(all_data)
+    return index.to_bytes()
+
+
+def _extraction_data(folder: Path) -> Dict:
+    """all_data of an extraction folder without an index, read back from its per-Mii files"""
+    from compact_profile import load_mii, load_summary
+
+    summary = load_summary(folder / "_summary.json")
+    tables = summary.get('lookup_tables')
+    miis = {}
+    for mii_id, entry in summary['miis'].items():
+        json_file = folder / entry['filename']
+        if json_file.exists():
+            miis[mii_id] = load_mii(json_file, tables)
+    return {'file_path': summary.get('save_file_path', str(folder)), 'miis': miis}
+
+
+def load_indexes(paths: List[Path]) -> Tuple[List[TextIndex], int]:
+    """Index of every index file or extraction folder (and subfolder), plus how many had to be built"""
+    from mii_index import extraction_folders
+
+    indexes = []
+    built = 0
+    for path in paths:
+        if path.is_file():
+            indexes.append(TextIndex.load(path))
+            continue
+        for folder in extraction_folders(path):
+            index_file = folder / TEXT_INDEX_NAME
+            if index_file.exists():
+                try:
+                    indexes.append(TextIndex.load(index_file))
+                    continue
+                except ValueError as e:
+                    print(f"⚠ {e}")
+            index = TextIndex()
+            index.add_extraction(_extraction_data(folder))
+            index.save(index_file)
+            indexes.append(index)
+            built += 1
+    return indexes, built
+
+
+def main():
+    argv = sys.argv[1:]
+    prefix = pop_flag(argv, "--prefix")
+    top = int(pop_option(argv, "--top", "10"))
+    json_file = pop_option(argv, "--json", None)
+    command = argv[0] if argv else None
+    if command not in ('build', 'search') or len(argv) < 3:
+        print("Usage: python text_index.py build <index file> <extraction folders or index files...>")
+        print("       python text_index.py search <query> <extraction folders or index files...> [options]")
+        print("  A folder without _summary.json stands for each of its subfolders that has one;")
+        print(f"  extractions without {TEXT_INDEX_NAME} are indexed from their Mii files first")
+        print("  --prefix: Terms only match at the start of a word")
+        print("  --top N: Number of Miis to list (default: 10)")
+        print("  --json: Also write the results to a JSON file")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if command == 'build':
+        index_file = Path(argv[1])
+        indexes, built = load_indexes([Path(path) for path in argv[2:]])
+        index = TextIndex()
+        for part in indexes:
+            index.add_index(part)
+        index.save(index_file)
+        print(f"✓ {index_file}: {len(index)} Miis from {len(index.sources)} extraction(s) ({built} indexed "
+              f"from Mii files), {len(index.strings)} strings, {len(index.postings)} grams, "
+              f"{os.path.getsize(index_file):,} bytes in {time.perf_counter() - started:.2f}s")
+        return
+
+    query = argv[1]
+    indexes, _ = load_indexes([Path(path) for path in argv[2:]])
+    loaded = time.perf_counter()
+    results = []
+    for index in indexes:
+        results.extend((score, index.describe(doc), fields) for score, doc, fields in index.search(query, top, prefix))
+    results.sort(key=lambda result: -result[0])
+    results = results[:top]
+    searched = sum(len(index) for index in indexes)
+    print(f"{len(results)} match(es) for {query!r} among {searched:,} Miis "
+          f"(search {(time.perf_counter() - loaded) * 1000:.1f} ms, load {(loaded - started) * 1000:.0f} ms):")
+    matches = []
+    for score, mii, fields in results:
+        mii['score'] = score
+        mii['matched'] = {field: text for field, text in fields}
+        matches.append(mii)
+        print(f"  {score:>6.2f}  {mii['save']}/Mii {mii['mii_index']} ({mii['nickname']}): "
+              + ", ".join(f"{field}={text!r}" for field, text in fields))
+
+    if json_file:
+        json_output.dump({'query': query, 'prefix': prefix, 'matches': matches}, json_file)
+        print(f"✓ Results written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Lightweight wall-time instrumentation for the extractor.
+
+A Timings object collects total seconds and call counts per named section.
+Code marks the end of each section with lap(name) (time since the previous
+lap), or wraps a block in section(name), and helper methods can be wrapped to
+count their calls. When instrumentation is off, callers use the module-level
+no-op lap() and NULL_SECTION instead, so the cost is one empty function call.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+ENV_VAR = "MII_TIMINGS"
+
+
+def no_lap(name: Optional[str] = None):
+    """Stand-in for Timings.lap when instrumentation is off"""
+
+
+NULL_SECTION = contextlib.nullcontext()
+
+
+def no_section(name: str):
+    """Stand-in for Timings.section when instrumentation is off"""
+    return NULL_SECTION
+
+
+class Timings:
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + calls
+
+    def lap(self, name: Optional[str] = None):
+        """Charge the time since the previous lap (on this thread) to name; lap() just starts the clock"""
+        now = time.perf_counter()
+        last = getattr(self._local, 'last', None)
+        if name is not None and last is not None:
+            self.add(name, now - last)
+        self._local.last = now
+
+    @contextlib.contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Wrap func so every call is timed and counted under name"""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return timed
+
+    def to_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {'calls': self.calls[name], 'seconds': self.seconds[name]}
+                    for name in sorted(self.seconds, key=self.seconds.get, reverse=True)}
+
+    def report(self, title: str = "Timings") -> str:
+        """Summary table, slowest first"""
+        entries = self.to_dict()
+        lines = [f"{title}:", f"  {'section':<28}{'calls':>9}{'total':>12}{'per call':>12}"]
+        for name, entry in entries.items():
+            per_call = entry['seconds'] / entry['calls'] if entry['calls'] else 0.0
+            lines.append(f"  {name:<28}{entry['calls']:>9,}{entry['seconds'] * 1000:>10.2f}ms"
+                         f"{per_call * 1e6:>10.1f}µs")
+        return "\n".join(lines)
+
+    def write_json(self, path: Union[str, Path]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def timings_from_env() -> Optional[str]:
+    """MII_TIMINGS=1 prints the table, MII_TIMINGS=<file>.json writes JSON; None when unset"""
+    value = os.environ.get(ENV_VAR, "")
+    return value if value not in ("", "0") else None